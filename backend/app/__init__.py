@@ -22,12 +22,14 @@ def create_app():
     from app.routes.transcript import transcript_bp
     from app.routes.plugins import plugins_bp
     from app.routes.voice import voice_bp
+    from app.routes.diagnostics import diagnostics_bp
 
     app.register_blueprint(chat_bp, url_prefix='/api')
     app.register_blueprint(config_bp, url_prefix='/api/config')
     app.register_blueprint(transcript_bp, url_prefix='/api/transcript')
     app.register_blueprint(plugins_bp, url_prefix='/api/plugins')
     app.register_blueprint(voice_bp, url_prefix='/api/voice')
+    app.register_blueprint(diagnostics_bp, url_prefix='/api/diagnostics')
 
     # Health check
     @app.route('/api/health')
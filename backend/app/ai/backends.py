@@ -0,0 +1,94 @@
+"""
+Execution Backends
+Alternatives to eager PyTorch for HuggingFaceConnector: torch.compile of
+the eager model, or an ONNX export with a past-key-values decoder run on
+ONNX Runtime CPU. Both keep transformers' generate() interface.
+"""
+
+import os
+import shutil
+
+import torch
+
+from config import Config
+
+
+BACKENDS = ('eager', 'compile', 'onnx')
+
+
+def compile_model(model):
+    """
+    Compile the model's forward pass with torch.compile
+
+    Compilation happens lazily on the first call, so the warmup pass pays
+    for it instead of the first request. Dynamic shapes avoid recompiling
+    for every prompt length.
+
+    Returns:
+        The original forward, to restore if compilation fails
+    """
+    eager_forward = model.forward
+    model.forward = torch.compile(eager_forward, dynamic=True)
+    return eager_forward
+
+
+def onnx_export_dir(model_name):
+    """Directory holding the cached ONNX export of a model"""
+    safe_name = model_name.strip('/').replace('/', '--')
+    return os.path.join(Config.ONNX_CACHE_DIR, safe_name)
+
+
+def load_onnx_model(model_name, is_seq2seq, token=None):
+    """
+    Load an ONNX Runtime model, exporting and caching it on first use
+
+    Causal models are exported as a merged decoder with past key values;
+    seq2seq models as encoder plus decoder-with-past.
+
+    Args:
+        model_name: HuggingFace model name or path
+        is_seq2seq: Whether the model is encoder-decoder
+        token: Optional HuggingFace token
+
+    Returns:
+        optimum ORTModel usable with generate()
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM, ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("optimum package not installed. Run: pip install -r requirements-onnx.txt")
+
+    model_class = ORTModelForSeq2SeqLM if is_seq2seq else ORTModelForCausalLM
+    export_dir = onnx_export_dir(model_name)
+
+    if os.path.exists(os.path.join(export_dir, 'config.json')):
+        print(f"Loading cached ONNX export from {export_dir}")
+        return model_class.from_pretrained(
+            export_dir,
+            use_cache=True,
+            provider='CPUExecutionProvider'
+        )
+
+    print(f"Exporting {model_name} to ONNX (first start only)...")
+    model = model_class.from_pretrained(
+        model_name,
+        export=True,
+        use_cache=True,
+        # optimum 1.20 (the release for transformers 4.41) predates the `token` argument
+        use_auth_token=token,
+        provider='CPUExecutionProvider'
+    )
+
+    # Workers may export at the same time: write privately, then rename into place
+    staging_dir = f"{export_dir}.tmp-{os.getpid()}"
+    try:
+        model.save_pretrained(staging_dir)
+        if not os.path.exists(export_dir):
+            os.rename(staging_dir, export_dir)
+            print(f"ONNX export cached in {export_dir}")
+    except OSError as e:
+        print(f"Error caching ONNX export: {e}")
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return model
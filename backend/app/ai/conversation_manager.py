@@ -3,16 +3,23 @@ Conversation Manager
 Handles conversation context, history, and personalization
 """
 
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
 
 class ConversationManager:
     """Manages conversation state and context"""
 
+    MAX_CACHED_PROMPTS = 1024
+
     def __init__(self):
         self.conversations = {}  # Store conversations by session ID
+        self._system_prompts = OrderedDict()  # System prompts by prefix key, least recently used first
+        self._lock = threading.Lock()
 
-    def process_message(self, message, conversation_history, personality='assistant', user_preferences=None):
+    def process_message(self, message, conversation_history, personality='assistant', user_preferences=None,
+                        agent=None, agent_greeting=None):
         """
         Process a user message and prepare context for AI
 
@@ -21,12 +28,14 @@ class ConversationManager:
             conversation_history: List of previous messages
             personality: AI personality type
             user_preferences: User preferences dict
+            agent: Routed agent dict, if the conversation was routed
+            agent_greeting: Greeting the agent opened the conversation with
 
         Returns:
             dict: Processed context
         """
         # Get personality system message
-        system_message = self._get_personality_prompt(personality, user_preferences)
+        prefix_key, system_message = self.get_system_prompt(personality, user_preferences, agent, agent_greeting)
 
         # Process and clean message
         processed_message = self._preprocess_message(message)
@@ -34,6 +43,7 @@ class ConversationManager:
         return {
             'message': processed_message,
             'system_message': system_message,
+            'prefix_key': prefix_key,
             'history': conversation_history,
             'metadata': {
                 'personality': personality,
@@ -42,6 +52,59 @@ class ConversationManager:
             }
         }
 
+    def get_system_prompt(self, personality='assistant', user_preferences=None, agent=None, agent_greeting=None):
+        """
+        Get the system prompt and the key identifying it
+
+        Prompts are built once per key and reused, so the model layer can
+        cache the key/value states of the prompt prefix under the same key.
+        The key holds every input of the prompt template, so two prompts
+        share a key only if their text is the same.
+
+        Returns:
+            tuple: (prefix key, system prompt)
+        """
+        user_name = user_preferences.get('name', 'User') if user_preferences else 'User'
+        tone = user_preferences.get('tone', 'professional') if user_preferences else 'professional'
+
+        if agent:
+            prefix_key = (
+                'agent', agent.get('name'), agent.get('title'), agent.get('department'),
+                agent_greeting, user_name, tone
+            )
+        else:
+            prefix_key = ('personality', personality, user_name, tone)
+
+        with self._lock:
+            system_message = self._system_prompts.get(prefix_key)
+            if system_message is not None:
+                self._system_prompts.move_to_end(prefix_key)
+                return prefix_key, system_message
+
+        if agent:
+            system_message = self._get_agent_prompt(agent, agent_greeting, user_name, tone)
+        else:
+            system_message = self._get_personality_prompt(personality, user_preferences)
+
+        with self._lock:
+            self._system_prompts[prefix_key] = system_message
+            # Dynamic agents and user names are open-ended: drop the least recently used
+            while len(self._system_prompts) > self.MAX_CACHED_PROMPTS:
+                self._system_prompts.popitem(last=False)
+
+        return prefix_key, system_message
+
+    def _get_agent_prompt(self, agent, agent_greeting, user_name, tone):
+        """Get system prompt for a routed agent, including its opening greeting"""
+        prompt = (
+            f"You are {agent['name']}, {agent.get('title', 'an assistant')} "
+            f"with {agent.get('department', 'our team')}, speaking with {user_name}. "
+            f"Be {tone}, clear, and concise."
+        )
+        if agent_greeting:
+            prompt += f' You opened the call with: "{agent_greeting}"'
+        return prompt
+
     def _get_personality_prompt(self, personality, user_preferences=None):
         """Get system prompt based on personality type"""
         user_name = user_preferences.get('name', 'User') if user_preferences else 'User'
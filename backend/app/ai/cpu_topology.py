@@ -0,0 +1,108 @@
+"""
+CPU Topology
+Splits the machine's cores between gunicorn workers so each worker's torch
+uses its own share instead of every worker spinning threads on all cores
+"""
+
+import os
+
+from config import Config
+
+# Layout applied to this process, reported by the diagnostics endpoint
+_applied_layout = None
+
+
+def available_cores():
+    """Cores this process may run on (respects container/cgroup affinity)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_layout(slot, worker_count, cores=None):
+    """
+    Compute the thread counts and core set for one worker
+
+    Args:
+        slot: Worker slot number, 0 <= slot < worker_count
+        worker_count: Number of processes sharing the machine
+        cores: Cores to divide (defaults to available_cores())
+
+    Returns:
+        dict: Layout with intra_op_threads, inter_op_threads and cores
+    """
+    cores = cores if cores is not None else available_cores()
+    worker_count = max(1, worker_count)
+
+    per_worker = Config.CPU_THREADS_PER_WORKER or max(1, len(cores) // worker_count)
+    per_worker = min(per_worker, len(cores))
+
+    # More workers than cores: slots wrap around and share
+    first = (slot * per_worker) % len(cores)
+    worker_cores = [cores[(first + i) % len(cores)] for i in range(per_worker)]
+
+    return {
+        'slot': slot,
+        'worker_count': worker_count,
+        'available_cores': len(cores),
+        'intra_op_threads': per_worker,
+        'inter_op_threads': max(1, Config.CPU_INTEROP_THREADS),
+        'cores': worker_cores,
+        'pinned': False
+    }
+
+
+def apply_layout(slot, worker_count):
+    """
+    Configure this process's threading before torch does any work
+
+    Must run before the model is loaded: torch only accepts a new
+    inter-op thread count before its first parallel operation.
+
+    Args:
+        slot: Worker slot number
+        worker_count: Number of processes sharing the machine
+
+    Returns:
+        dict: The applied layout
+    """
+    global _applied_layout
+    layout = plan_layout(slot, worker_count)
+    threads = str(layout['intra_op_threads'])
+
+    # Native libraries read these when their thread pools start
+    os.environ['OMP_NUM_THREADS'] = threads
+    os.environ['MKL_NUM_THREADS'] = threads
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+    if Config.CPU_PIN_WORKERS and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, layout['cores'])
+            layout['pinned'] = True
+        except OSError as e:
+            print(f"Error pinning worker to cores {layout['cores']}: {e}")
+
+    import torch
+    torch.set_num_threads(layout['intra_op_threads'])
+    try:
+        torch.set_num_interop_threads(layout['inter_op_threads'])
+    except RuntimeError as e:
+        # Already set, or parallel work has started in this process
+        print(f"Error setting inter-op threads: {e}")
+
+    _applied_layout = layout
+    return layout
+
+
+def get_layout():
+    """Report the applied layout and the thread counts torch is actually using"""
+    import torch
+
+    return {
+        'applied': _applied_layout is not None,
+        'layout': _applied_layout,
+        'pid': os.getpid(),
+        'torch_intra_op_threads': torch.get_num_threads(),
+        'torch_inter_op_threads': torch.get_num_interop_threads(),
+        'affinity': available_cores()
+    }
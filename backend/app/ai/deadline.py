@@ -0,0 +1,128 @@
+"""
+Latency Deadlines
+Per-request generation time budgets: voice turns must answer before Twilio
+gives up on the webhook, so a shorter reply beats a late one
+"""
+
+import re
+import time
+
+import torch
+from transformers import StoppingCriteria
+
+from config import Config
+
+SENTENCE_END = re.compile(r'[.!?]["\')\]]?\s*$')
+
+
+class LatencyDeadline:
+    """
+    Time budget for one generation
+
+    After SOFT_DEADLINE_FRACTION of the budget has passed, generation stops
+    at the next sentence end. At the hard deadline it stops regardless;
+    a token is not started if the recent step time says it would finish
+    past the deadline.
+    """
+
+    def __init__(self, budget_seconds, soft_fraction=None):
+        """
+        Initialize deadline, starting the clock now
+
+        Args:
+            budget_seconds: Total time allowed for generation
+            soft_fraction: Share of the budget after which a sentence end stops generation
+        """
+        soft_fraction = soft_fraction if soft_fraction is not None else Config.SOFT_DEADLINE_FRACTION
+        self.start = time.monotonic()
+        self.budget = max(0.0, budget_seconds)
+        self.soft = self.start + self.budget * soft_fraction
+        self.hard = self.start + self.budget
+        self.hit = False  # True once the deadline ended generation early
+        self.token_cap = None  # Token limit set by max_new_tokens when below the configured one
+
+    def remaining(self):
+        """Seconds left before the hard deadline"""
+        return max(0.0, self.hard - time.monotonic())
+
+    def max_new_tokens(self, seconds_per_token, limit):
+        """
+        Cap the number of new tokens to what the remaining budget can decode
+
+        Args:
+            seconds_per_token: Recent decode time per token, or None if unknown
+            limit: Configured maximum of new tokens
+
+        Returns:
+            int: Token limit for this generation (at least 1)
+        """
+        if not seconds_per_token:
+            return limit
+        cap = max(1, min(limit, int(self.remaining() / seconds_per_token)))
+        self.token_cap = cap if cap < limit else None
+        return cap
+
+    def truncated(self, new_tokens):
+        """
+        Check whether the budget cut a generation short
+
+        Args:
+            new_tokens: Tokens generated, counted the way the token limit was
+        """
+        return self.hit or (self.token_cap is not None and new_tokens >= self.token_cap)
+
+    def should_stop(self, text, step_seconds=0.0):
+        """
+        Check whether generation should stop after the latest token
+
+        Args:
+            text: Decoded text of the latest token(s)
+            step_seconds: Duration of the latest decode step
+        """
+        now = time.monotonic()
+        if now + step_seconds >= self.hard or (now >= self.soft and SENTENCE_END.search(text)):
+            self.hit = True
+            return True
+        return False
+
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """transformers stopping criteria enforcing one LatencyDeadline per batch row"""
+
+    def __init__(self, deadlines, tokenizer):
+        """
+        Args:
+            deadlines: LatencyDeadline per batch row (None for rows without one)
+            tokenizer: Tokenizer used to check for sentence ends
+        """
+        self.deadlines = deadlines
+        self.tokenizer = tokenizer
+        self._last_step = time.monotonic()
+
+    def __call__(self, input_ids, scores, **kwargs):
+        now = time.monotonic()
+        step_seconds = now - self._last_step
+        self._last_step = now
+
+        stop = []
+        for row, deadline in zip(input_ids, self.deadlines):
+            if deadline is None:
+                stop.append(False)
+                continue
+            # Two tokens catch punctuation split from a closing quote
+            text = self.tokenizer.decode(row[-2:], skip_special_tokens=True)
+            stop.append(deadline.should_stop(text, step_seconds))
+
+        return torch.tensor(stop, dtype=torch.bool, device=input_ids.device)
+
+
+def trim_to_sentence(text):
+    """Cut a reply stopped mid-sentence back to its last complete sentence, if it has one"""
+    text = text.strip()
+    if SENTENCE_END.search(text):
+        return text
+
+    boundary = None
+    for match in re.finditer(r'[.!?]["\')\]]?(?=\s)', text):
+        boundary = match.end()
+    return text[:boundary] if boundary else text
@@ -0,0 +1,291 @@
+"""
+Inference Server
+Lets one local process own the model while web workers send generation
+requests to it over a Unix socket
+
+Run standalone with:
+    python -m app.ai.inference_server
+
+or let gunicorn start it (see gunicorn.conf.py) by setting
+INFERENCE_SERVER_SOCKET.
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from config import Config
+from app.ai.metrics import PhaseTimings
+from app.ai.model_connector import ERROR_RESPONSE, ModelConnector, get_local_model_connector
+from app.ai.priority_gate import Overloaded
+
+
+class InferenceRequestHandler(socketserver.StreamRequestHandler):
+    """Handles one newline-delimited JSON request per connection"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            op = request.get('op')
+            connector = self.server.get_connector()
+
+            prompt = request.get('prompt')
+            history = request.get('history')
+            kwargs = _decode_kwargs(request.get('kwargs', {}))
+
+            # The client asked for this call's phase timings
+            timings = PhaseTimings() if request.get('timings') else None
+            if timings is not None:
+                kwargs['timings'] = timings
+
+            if op == 'generate':
+                response = connector.generate_response(prompt, history, **kwargs)
+                self._send(_with_timings({'response': response}, timings))
+            elif op == 'stream':
+                for text in connector.generate_stream(prompt, history, **kwargs):
+                    self._send({'token': text})
+                self._send(_with_timings({'done': True}, timings))
+            elif op == 'release':
+                connector.release_conversation(request.get('conversation_id'))
+                self._send({'ok': True})
+            elif op == 'warm_prefix':
+                connector.warm_prefix(_decode_key(request.get('prefix_key')), request.get('system_message'))
+                self._send({'ok': True})
+            elif op == 'stats':
+                self._send({'stats': connector.get_stats()})
+            elif op == 'metrics':
+                self._send({'metrics': connector.get_metrics()})
+            elif op == 'ping':
+                self._send({'ok': True, 'model': Config.AI_MODEL_NAME})
+            else:
+                self._send({'error': f"Unknown op: {op}"})
+
+        except BrokenPipeError:
+            # Client went away mid-stream
+            pass
+        except Overloaded as e:
+            # Let the worker answer with 503 / apology TwiML instead of a generic error
+            self._send({'error': str(e), 'overloaded': True, 'lane': e.lane, 'retry_after': e.retry_after})
+        except Exception as e:
+            print(f"Error in inference server: {e}")
+            try:
+                self._send({'error': str(e)})
+            except OSError:
+                pass
+
+    def _send(self, message):
+        self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server that owns the only model instance on the box
+
+    The socket is bound before the model loads so workers can connect
+    right away; their requests wait until loading has finished. Each
+    connection is handled on its own thread, so with INFERENCE_BATCHING
+    requests from all workers are decoded together.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        super().__init__(socket_path, InferenceRequestHandler)
+        self.socket_path = socket_path
+        self._connector = None
+        self._load_error = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._load, name='inference-model-loader', daemon=True).start()
+
+    def _load(self):
+        try:
+            self._connector = get_local_model_connector()
+        except Exception as e:
+            print(f"Error loading model in inference server: {e}")
+            self._load_error = e
+        finally:
+            self._ready.set()
+
+    def get_connector(self):
+        """Block until the model is loaded and return its connector"""
+        self._ready.wait()
+        if self._load_error is not None:
+            raise RuntimeError(f"Model failed to load: {self._load_error}")
+        return self._connector
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class InferenceClient(ModelConnector):
+    """Model connector stub that forwards generation to the inference server"""
+
+    def __init__(self, socket_path=None):
+        super().__init__()
+        self.socket_path = socket_path or Config.INFERENCE_SERVER_SOCKET
+        self.timeout = Config.INFERENCE_SERVER_TIMEOUT
+
+    def generate_response(self, prompt, conversation_history=None, **kwargs):
+        """Generate response on the inference server"""
+        timings = kwargs.pop('timings', None)
+        try:
+            for message in self._request({
+                'op': 'generate',
+                'prompt': prompt,
+                'history': conversation_history,
+                'kwargs': kwargs,
+                'timings': timings is not None
+            }):
+                _raise_for_error(message)
+                if timings is not None and 'timings' in message:
+                    timings.load_dict(message['timings'])
+                return message['response']
+
+            raise RuntimeError("Inference server closed the connection")
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"Error with inference server: {e}")
+            return ERROR_RESPONSE
+
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """Stream response chunks from the inference server"""
+        timings = kwargs.pop('timings', None)
+        produced = False
+        try:
+            for message in self._request({
+                'op': 'stream',
+                'prompt': prompt,
+                'history': conversation_history,
+                'kwargs': kwargs,
+                'timings': timings is not None
+            }):
+                _raise_for_error(message)
+                if message.get('done'):
+                    if timings is not None and 'timings' in message:
+                        timings.load_dict(message['timings'])
+                    return
+                produced = True
+                yield message['token']
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"Error with inference server: {e}")
+            if not produced:
+                yield ERROR_RESPONSE
+
+    def release_conversation(self, conversation_id):
+        """Drop per-conversation state held by the server"""
+        self._send_command({'op': 'release', 'conversation_id': conversation_id})
+
+    def warm_prefix(self, prefix_key, system_message):
+        """Ask the server to pre-compute a system prompt prefix"""
+        self._send_command({
+            'op': 'warm_prefix',
+            'prefix_key': prefix_key,
+            'system_message': system_message
+        })
+
+    def get_stats(self):
+        """Fetch cache statistics from the server"""
+        try:
+            for message in self._request({'op': 'stats'}):
+                return message.get('stats', {})
+        except Exception as e:
+            print(f"Error with inference server: {e}")
+        return {}
+
+    def get_metrics(self):
+        """Fetch phase timing histograms from the server, where generation runs"""
+        try:
+            for message in self._request({'op': 'metrics'}):
+                return message.get('metrics', {})
+        except Exception as e:
+            print(f"Error with inference server: {e}")
+        return {}
+
+    def _send_command(self, payload):
+        try:
+            for _ in self._request(payload):
+                break
+        except Exception as e:
+            print(f"Error with inference server: {e}")
+
+    def _request(self, payload):
+        """Send one request and yield each JSON line of the reply"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+
+            with sock.makefile('r', encoding='utf-8') as reader:
+                for line in reader:
+                    yield json.loads(line)
+
+
+def _raise_for_error(message):
+    """Turn an error reply from the server back into an exception"""
+    if 'error' not in message:
+        return
+    if message.get('overloaded'):
+        raise Overloaded(message['lane'], message['retry_after'])
+    raise RuntimeError(message['error'])
+
+
+def _with_timings(message, timings):
+    """Attach a call's phase timings to its final reply message"""
+    if timings is not None:
+        message['timings'] = timings.to_dict()
+    return message
+
+
+def _decode_kwargs(kwargs):
+    """Restore values JSON cannot carry as-is"""
+    if kwargs.get('prefix_key') is not None:
+        kwargs['prefix_key'] = _decode_key(kwargs['prefix_key'])
+    return kwargs
+
+
+def _decode_key(key):
+    # Prefix keys are tuples, which JSON turns into lists
+    return tuple(key) if isinstance(key, list) else key
+
+
+def serve(socket_path=None):
+    """Run the inference server until interrupted"""
+    socket_path = socket_path or Config.INFERENCE_SERVER_SOCKET
+    if not socket_path:
+        raise ValueError("INFERENCE_SERVER_SOCKET is not configured")
+
+    if Config.CPU_TOPOLOGY_ENABLED:
+        # The only process running the model gets every core
+        from app.ai.cpu_topology import apply_layout
+        apply_layout(0, 1)
+
+    server = InferenceServer(socket_path)
+    print(f"Inference server listening on {socket_path}")
+
+    # Clean up the socket file when gunicorn terminates us
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,136 @@
+"""
+Keyword Automaton
+Aho-Corasick matcher that finds every configured keyword in a message in a
+single pass, however many keywords there are
+"""
+
+import sys
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class KeywordAutomaton:
+    """
+    Multi-keyword matcher with word-boundary awareness
+
+    Keywords are added with a category and a value (e.g. the agent keys a
+    routing keyword points to), then compiled into a deterministic automaton.
+    A match must start at the beginning of a word, so 'bug' does not fire
+    inside 'debug'. Whole-word keywords must also end at a word boundary
+    ('inn' matches "the inn" but not "inner"); the others may run on into
+    the rest of the word, so 'enroll' still matches "enrollment".
+    """
+
+    def __init__(self):
+        self._transitions = [{}]
+        self._outputs = [[]]
+        self._keywords = []  # (keyword, category, value, whole_word)
+        self._compiled = False
+
+    def add(self, keyword, category, value=None, whole_word=False):
+        """
+        Add a keyword
+
+        Args:
+            keyword: Text to find (matched case-insensitively)
+            category: Group the keyword belongs to (e.g. 'keyword', 'department')
+            value: Payload returned with each match (defaults to the keyword)
+            whole_word: Require a word boundary after the match too
+        """
+        keyword = keyword.lower()
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions[state][char] = next_state
+                self._transitions.append({})
+                self._outputs.append([])
+            state = next_state
+
+        self._outputs[state].append(len(self._keywords))
+        self._keywords.append((keyword, category, keyword if value is None else value, whole_word))
+        self._compiled = False
+
+    def compile(self):
+        """Build failure links and fold them into the transitions"""
+        trie = [dict(transitions) for transitions in self._transitions]
+        outputs = [list(output) for output in self._outputs]
+        failure = [0] * len(trie)
+        transitions = [dict() for _ in trie]
+
+        # Breadth-first, so a state's failure target is always finished before it
+        queue = []
+        for char, state in trie[0].items():
+            transitions[0][char] = state
+            queue.append(state)
+
+        for state in queue:
+            # Inherit the failure state's moves, then override with our own edges
+            transitions[state] = dict(transitions[failure[state]])
+            for char, next_state in trie[state].items():
+                transitions[state][char] = next_state
+                failure[next_state] = transitions[failure[state]].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[failure[next_state]]
+                queue.append(next_state)
+
+        self._delta = transitions
+        self._matches = [tuple(output) for output in outputs]
+        self._compiled = True
+        return self
+
+    def search(self, text):
+        """
+        Find every keyword occurrence in one pass over the text
+
+        Args:
+            text: Message to scan (lowercased here)
+
+        Returns:
+            list: (start, end, keyword, category, value) tuples in order of
+                where each match ends
+        """
+        if not self._compiled:
+            self.compile()
+
+        text = text.lower()
+        delta = self._delta
+        matches = self._matches
+        keywords = self._keywords
+        length = len(text)
+        hits = []
+
+        state = 0
+        for end, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if not matches[state]:
+                continue
+
+            for index in matches[state]:
+                keyword, category, value, whole_word = keywords[index]
+                start = end - len(keyword) + 1
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(keyword[0]):
+                    continue
+                if whole_word and end + 1 < length and _is_word_char(text[end + 1]) and _is_word_char(keyword[-1]):
+                    continue
+                hits.append((start, end + 1, keyword, category, value))
+
+        return hits
+
+    def memory_bytes(self):
+        """Approximate memory held by the compiled automaton"""
+        if not self._compiled:
+            self.compile()
+        return (
+            sum(sys.getsizeof(transitions) for transitions in self._delta)
+            + sum(sys.getsizeof(matches) for matches in self._matches)
+            + sys.getsizeof(self._delta)
+        )
+
+    def __len__(self):
+        return len(self._keywords)
@@ -0,0 +1,160 @@
+"""
+KV Cache Store
+Keeps transformer key/value states between turns so a conversation only
+prefills the tokens that changed since its previous turn, and shares the
+states of common system prompt prefixes between conversations
+"""
+
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+
+class KVCacheEntry:
+    """Token ids together with the key/value states computed for them"""
+
+    def __init__(self, token_ids, past_key_values):
+        self.token_ids = token_ids
+        self.past_key_values = past_key_values
+        self.size_bytes = cache_size_bytes(past_key_values)
+
+    def match(self, token_ids):
+        """
+        Find how much of this entry can be reused for a new prompt
+
+        Args:
+            token_ids: 1-D tensor of the new prompt's token ids
+
+        Returns:
+            tuple: (reusable length, past_key_values cropped to that length)
+            or (0, None) if nothing can be reused
+        """
+        limit = min(len(self.token_ids), len(token_ids))
+        if limit == 0:
+            return 0, None
+
+        mismatch = (self.token_ids[:limit] != token_ids[:limit].to(self.token_ids.device)).nonzero()
+        length = int(mismatch[0]) if len(mismatch) else limit
+
+        # Always leave at least one prompt token to run through the model
+        length = min(length, len(token_ids) - 1)
+        if length <= 0:
+            return 0, None
+
+        return length, crop_cache(self.past_key_values, length)
+
+
+class KVCacheStore:
+    """
+    Memory-bounded LRU of KV caches
+
+    Keyed by conversation id or CallSid for turn-to-turn reuse, or by
+    system prompt prefix key for states shared between conversations.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else Config.KV_CACHE_MAX_MB * 1024 * 1024
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def lookup(self, conversation_id, token_ids):
+        """
+        Get reusable KV states for a conversation's new prompt
+
+        Args:
+            conversation_id: Conversation id or CallSid
+            token_ids: 1-D tensor of the full new prompt
+
+        Returns:
+            tuple: (reused token count, cropped past_key_values or None)
+        """
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                self._entries.move_to_end(conversation_id)
+
+        length, past = entry.match(token_ids) if entry is not None else (0, None)
+
+        with self._lock:
+            if length:
+                self.hits += 1
+                self.reused_tokens += length
+            else:
+                self.misses += 1
+
+        return length, past
+
+    def contains(self, key):
+        """Check whether states are held for a key"""
+        with self._lock:
+            return key in self._entries
+
+    def store(self, conversation_id, token_ids, past_key_values):
+        """
+        Remember the KV states at the end of a turn
+
+        Args:
+            conversation_id: Conversation id or CallSid
+            token_ids: 1-D tensor of the tokens covered by past_key_values
+            past_key_values: Tuple of per-layer (key, value) tensors
+        """
+        entry = KVCacheEntry(token_ids, past_key_values)
+        if entry.size_bytes > self.max_bytes:
+            self.release(conversation_id)
+            return
+
+        with self._lock:
+            previous = self._entries.pop(conversation_id, None)
+            if previous is not None:
+                self._total_bytes -= previous.size_bytes
+
+            self._entries[conversation_id] = entry
+            self._total_bytes += entry.size_bytes
+
+            # Evict least recently used conversations until under the cap
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.size_bytes
+
+    def release(self, conversation_id):
+        """Drop a conversation's cache (e.g. when the call ends)"""
+        with self._lock:
+            entry = self._entries.pop(conversation_id, None)
+            if entry is not None:
+                self._total_bytes -= entry.size_bytes
+
+    def get_stats(self):
+        """Return cache occupancy and hit statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self._total_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'reused_tokens': self.reused_tokens
+            }
+
+
+def cache_size_bytes(past_key_values):
+    """Total memory held by a tuple-of-(key, value) cache"""
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for layer in past_key_values
+        for tensor in layer
+    )
+
+
+def crop_cache(past_key_values, length):
+    """Keep the first `length` positions of every layer's key/value states"""
+    return tuple(
+        tuple(tensor[:, :, :length] for tensor in layer)
+        for layer in past_key_values
+    )
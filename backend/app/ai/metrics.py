@@ -0,0 +1,250 @@
+"""
+Generation Metrics
+Per-call phase timings (build, tokenize, queue, prefill, decode,
+detokenize) and token counts, aggregated into histograms per process
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+from transformers import StoppingCriteria
+
+# Display order; connectors may record other phases (e.g. 'request' for OpenAI)
+PHASES = ('gate', 'build', 'tokenize', 'queue', 'prefill', 'decode', 'detokenize', 'request')
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+# Timings of the call running on each thread, for code that does not receive them directly
+_active = threading.local()
+
+
+class PhaseTimings:
+    """
+    Timings and token counts of one generation call
+
+    Phases nest: time spent in an inner phase is not counted in the outer
+    one, so 'build' is string assembly only, without the tokenizer calls
+    made while building.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases = {}  # Phase name -> seconds
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.first_token_at = None
+        self.cached = False  # Answered by the response cache
+        self.truncated = False  # Cut short by the latency budget
+        self.total = None
+        self._stack = []
+
+    def add(self, name, seconds):
+        """Add time to a phase"""
+        self.phases[name] = self.phases.get(name, 0.0) + max(0.0, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as one phase, excluding nested phases"""
+        start = time.monotonic()
+        self._stack.append(0.0)
+        try:
+            yield self
+        finally:
+            nested = self._stack.pop()
+            elapsed = time.monotonic() - start
+            self.add(name, elapsed - nested)
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    @contextmanager
+    def activate(self):
+        """Make these timings the ones track() records into on this thread"""
+        previous = getattr(_active, 'timings', None)
+        _active.timings = self
+        try:
+            yield self
+        finally:
+            _active.timings = previous
+
+    def mark_first_token(self, at=None):
+        """Record when the first new token was produced (ends prefill)"""
+        if self.first_token_at is None:
+            self.first_token_at = at if at is not None else time.monotonic()
+
+    def split_generation(self, started, finished=None, queued_until=None):
+        """
+        Attribute a generation to queue, prefill and decode time
+
+        Args:
+            started: When generation was requested
+            finished: When it ended (defaults to now)
+            queued_until: When a scheduler started working on it, if it was queued
+        """
+        finished = finished if finished is not None else time.monotonic()
+        if queued_until is not None:
+            self.add('queue', queued_until - started)
+            started = queued_until
+
+        first = self.first_token_at if self.first_token_at is not None else finished
+        self.add('prefill', first - started)
+        self.add('decode', finished - first)
+
+    def finish(self):
+        """Stop the call's wall clock"""
+        if self.total is None:
+            self.total = time.monotonic() - self.started
+
+    def to_dict(self):
+        """JSON-serializable summary in milliseconds"""
+        ordered = sorted(self.phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES))
+        return {
+            'phases_ms': {name: round(self.phases[name] * 1000, 2) for name in ordered},
+            'total_ms': round((self.total if self.total is not None else time.monotonic() - self.started) * 1000, 2),
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cached': self.cached,
+            'truncated': self.truncated
+        }
+
+    def load_dict(self, data):
+        """Fill in timings measured in another process (see to_dict)"""
+        for name, ms in data.get('phases_ms', {}).items():
+            self.add(name, ms / 1000)
+        self.input_tokens = data.get('input_tokens', 0)
+        self.output_tokens = data.get('output_tokens', 0)
+        self.cached = data.get('cached', False)
+        self.truncated = data.get('truncated', False)
+
+
+@contextmanager
+def track(name):
+    """Time a block as a phase of the call active on this thread, if any"""
+    timings = getattr(_active, 'timings', None)
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+class FirstTokenMarker(StoppingCriteria):
+    """transformers stopping criteria that never stops, only notes when the first token arrived"""
+
+    def __init__(self, callbacks):
+        """
+        Args:
+            callbacks: Functions called once, when the first new token has been generated
+        """
+        self.callbacks = callbacks
+        self.fired = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if not self.fired:
+            self.fired = True
+            now = time.monotonic()
+            for callback in self.callbacks:
+                callback(now)
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and estimated percentiles"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 2),
+            'mean': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': round(self.max, 2),
+            'buckets': [
+                {'le': bound, 'count': count}
+                for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts)
+            ]
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe aggregation of PhaseTimings from every generation call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+        self._total = Histogram(LATENCY_BUCKETS_MS)
+        self._input_tokens = Histogram(TOKEN_BUCKETS)
+        self._output_tokens = Histogram(TOKEN_BUCKETS)
+        self.calls = 0
+        self.cached_calls = 0
+
+    def record(self, timings):
+        """Add one finished call"""
+        timings.finish()
+        with self._lock:
+            self.calls += 1
+            if timings.cached:
+                # Cache hits carry no model phases; keep them out of the latency histograms
+                self.cached_calls += 1
+                return
+
+            for name, seconds in timings.phases.items():
+                if name not in self._phases:
+                    self._phases[name] = Histogram(LATENCY_BUCKETS_MS)
+                self._phases[name].observe(seconds * 1000)
+            self._total.observe(timings.total * 1000)
+            self._input_tokens.observe(timings.input_tokens)
+            self._output_tokens.observe(timings.output_tokens)
+
+    def snapshot(self):
+        """Histograms of phase durations (ms) and token counts"""
+        with self._lock:
+            ordered = sorted(self._phases, key=lambda name: PHASES.index(name) if name in PHASES else len(PHASES))
+            return {
+                'calls': self.calls,
+                'cached_calls': self.cached_calls,
+                'phases_ms': {name: self._phases[name].snapshot() for name in ordered},
+                'total_ms': self._total.snapshot(),
+                'input_tokens': self._input_tokens.snapshot(),
+                'output_tokens': self._output_tokens.snapshot()
+            }
+
+
+# Global registry (one per process)
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    """Get the process-wide metrics registry"""
+    return _registry
@@ -3,9 +3,25 @@ AI Model Connector
 Abstraction layer for different AI models (HuggingFace, OpenAI, etc.)
 """
 
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
 import torch
-from transformers import AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+import torch.nn.functional as F
+from transformers import AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer, StoppingCriteriaList, TextIteratorStreamer
 from config import Config
+from app.ai.backends import compile_model, load_onnx_model
+from app.ai.deadline import DeadlineStoppingCriteria, LatencyDeadline, trim_to_sentence
+from app.ai.kv_cache import KVCacheStore
+from app.ai.metrics import FirstTokenMarker, PhaseTimings, get_registry, track
+from app.ai.token_cache import TokenCache
+from app.ai.quantization import quantize_dynamic_int8, resolve_precision
+
+
+# Returned to callers whenever generation fails
+ERROR_RESPONSE = "I apologize, but I encountered an error processing your request."
 
 
 class ModelConnector:
@@ -18,6 +34,26 @@ class ModelConnector:
         """Generate AI response - to be implemented by subclasses"""
         raise NotImplementedError
 
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """Generate AI response as a stream of text chunks"""
+        yield self.generate_response(prompt, conversation_history, **kwargs)
+
+    def release_conversation(self, conversation_id):
+        """Free any per-conversation state held by the connector"""
+        pass
+
+    def warm_prefix(self, prefix_key, system_message):
+        """Pre-compute model state for a system prompt prefix"""
+        pass
+
+    def get_stats(self):
+        """Return statistics of the connector's caches"""
+        return {}
+
+    def get_metrics(self):
+        """Return phase timing and token count histograms of generation calls"""
+        return get_registry().snapshot()
+
 
 class HuggingFaceConnector(ModelConnector):
     """HuggingFace model connector using transformers library"""
@@ -26,52 +62,181 @@ class HuggingFaceConnector(ModelConnector):
         super().__init__()
         self.model_name = Config.AI_MODEL_NAME
         self.tokenizer = None
+        self.token_cache = None
         self.model = None
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.draft_model = None
+        self.load_timings = {}
+        self.seconds_per_token = None  # Moving average of recent decode speed
+        self.backend = Config.MODEL_BACKEND
+        # ONNX Runtime serves on CPU in fp32
+        self.device = 'cuda' if torch.cuda.is_available() and self.backend != 'onnx' else 'cpu'
+        precision = Config.MODEL_PRECISION
+        if self.backend == 'onnx' and precision != 'fp32':
+            print(f"[WARNING] MODEL_PRECISION={precision} is not supported by the onnx backend, using fp32")
+            precision = 'fp32'
+        self.precision, self.torch_dtype = resolve_precision(precision, self.device)
         # Determine if this is a seq2seq model (like BlenderBot) or causal (like GPT)
         self.is_seq2seq = 'blenderbot' in self.model_name.lower() or 'bart' in self.model_name.lower() or 't5' in self.model_name.lower()
+        self.scheduler = None
         self.load_model()
 
+        # KV reuse, prefix states and the scheduler drive the PyTorch model step by step;
+        # an ONNX Runtime model only runs whole generate() calls
+        stepwise = self.backend != 'onnx'
+
+        # Keep past_key_values per conversation so new turns only prefill new tokens
+        self.kv_cache = KVCacheStore() if Config.KV_CACHE_ENABLED and not self.is_seq2seq and stepwise else None
+
+        # Share pre-computed system prompt states between conversations
+        self.prefix_cache = None
+        if Config.PREFIX_CACHE_ENABLED and not self.is_seq2seq and stepwise:
+            self.prefix_cache = KVCacheStore(Config.PREFIX_CACHE_MAX_MB * 1024 * 1024)
+
+        # Share decode steps between concurrent requests
+        if Config.INFERENCE_BATCHING and stepwise:
+            self.scheduler = InferenceScheduler(self.model, self.tokenizer, self.is_seq2seq, self.device)
+
     def load_model(self):
         """Load the HuggingFace model"""
-        print(f"Loading model: {self.model_name} on {self.device}")
+        print(f"Loading model: {self.model_name} on {self.device} ({self.precision}, {self.backend})")
 
         try:
             # Only use token if provided and not None/empty
             token_param = Config.HUGGINGFACE_TOKEN if Config.HUGGINGFACE_TOKEN else None
+            started = time.perf_counter()
 
             self.tokenizer = AutoTokenizer.from_pretrained(
                 self.model_name,
                 token=token_param,
                 padding_side='left' if not self.is_seq2seq else 'right'
             )
+            tokenizer_loaded = time.perf_counter()
 
-            # Use Seq2Seq model for BlenderBot-style models, CausalLM for GPT-style
-            if self.is_seq2seq:
-                self.model = AutoModelForSeq2SeqLM.from_pretrained(
-                    self.model_name,
-                    token=token_param,
-                    torch_dtype=torch.float16 if self.device == 'cuda' else torch.float32,
-                    low_cpu_mem_usage=True
-                ).to(self.device)
-            else:
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    self.model_name,
-                    token=token_param,
-                    torch_dtype=torch.float16 if self.device == 'cuda' else torch.float32,
-                    low_cpu_mem_usage=True
-                ).to(self.device)
+            if self.backend == 'onnx':
+                self._load_onnx_model(token_param)
+
+            if self.backend != 'onnx':
+                # Use Seq2Seq model for BlenderBot-style models, CausalLM for GPT-style
+                model_class = AutoModelForSeq2SeqLM if self.is_seq2seq else AutoModelForCausalLM
+                self.model = self._load_pretrained(model_class, self.model_name, token_param)
+
+                # Dynamic int8 quantization of the Linear layers for CPU serving
+                if self.precision == 'int8':
+                    self.model = quantize_dynamic_int8(self.model)
+
+                if Config.DRAFT_MODEL_NAME and not self.is_seq2seq:
+                    self._load_draft_model(token_param)
+
+            eager_forward = compile_model(self.model) if self.backend == 'compile' else None
+            weights_loaded = time.perf_counter()
 
             # Set pad token if not set
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
 
-            print(f"Model loaded successfully on {self.device}")
+            self.token_cache = TokenCache(self.tokenizer)
+
+            # torch.compile fails lazily (e.g. no C compiler for inductor), so a compiled
+            # model is always run once here rather than failing on the first request
+            if Config.MODEL_WARMUP or eager_forward is not None:
+                try:
+                    self._warmup()
+                except Exception as e:
+                    if eager_forward is None:
+                        raise
+                    print(f"[WARNING] torch.compile failed, using eager mode: {e}")
+                    self.model.forward = eager_forward
+                    self.backend = 'eager'
+                    self._warmup()
+            warmed_up = time.perf_counter()
+
+            self.load_timings = {
+                'tokenizer_seconds': round(tokenizer_loaded - started, 3),
+                'weights_seconds': round(weights_loaded - tokenizer_loaded, 3),
+                'warmup_seconds': round(warmed_up - weights_loaded, 3),
+                'total_seconds': round(warmed_up - started, 3)
+            }
+
+            print(f"Model loaded successfully on {self.device} ({self.precision}, {self.backend})")
+            print(
+                f"Load timings: tokenizer {self.load_timings['tokenizer_seconds']}s, "
+                f"weights {self.load_timings['weights_seconds']}s, "
+                f"warmup {self.load_timings['warmup_seconds']}s, "
+                f"total {self.load_timings['total_seconds']}s"
+            )
 
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
 
+    def _load_onnx_model(self, token_param):
+        """Load the ONNX Runtime model, falling back to eager PyTorch if optimum is missing or the export fails"""
+        try:
+            self.model = load_onnx_model(self.model_name, self.is_seq2seq, token_param)
+        except ImportError as e:
+            print(f"[WARNING] {e}; using eager PyTorch")
+            self.backend = 'eager'
+            return
+        except Exception as e:
+            print(f"[WARNING] ONNX export or load failed, using eager PyTorch: {e}")
+            self.backend = 'eager'
+            return
+
+        if Config.DRAFT_MODEL_NAME:
+            print("[WARNING] DRAFT_MODEL_NAME is ignored with the onnx backend")
+
+    def _load_pretrained(self, model_class, model_name, token_param):
+        """
+        Load weights in their serving dtype directly onto the serving device
+
+        transformers memory-maps safetensors (and zip-format .bin) checkpoints,
+        low_cpu_mem_usage skips the random init of every layer, and on GPU
+        device_map places each tensor on the card as it is read instead of
+        building the whole model in CPU memory first.
+        """
+        load_kwargs = {'device_map': self.device} if self.device == 'cuda' else {}
+        return model_class.from_pretrained(
+            model_name,
+            token=token_param,
+            torch_dtype=self.torch_dtype,
+            low_cpu_mem_usage=True,
+            **load_kwargs
+        )
+
+    def _warmup(self):
+        """Run one short greedy generation so kernels and allocators are initialized"""
+        input_ids = self.tokenizer.encode(f"User: Hello{self.tokenizer.eos_token}Assistant:", return_tensors='pt').to(self.device)
+        assistant = {'assistant_model': self.draft_model} if self.draft_model is not None else {}
+
+        with torch.no_grad():
+            self.model.generate(
+                input_ids,
+                max_new_tokens=Config.MODEL_WARMUP_TOKENS,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                **assistant
+            )
+
+    def _load_draft_model(self, token_param):
+        """Load the small model that proposes tokens for assisted generation"""
+        if Config.INFERENCE_BATCHING:
+            # The scheduler decodes many requests per step; assisted generation is single-request
+            print("[WARNING] DRAFT_MODEL_NAME is ignored while INFERENCE_BATCHING is enabled")
+            return
+
+        print(f"Loading draft model: {Config.DRAFT_MODEL_NAME}")
+        self.draft_model = self._load_pretrained(AutoModelForCausalLM, Config.DRAFT_MODEL_NAME, token_param)
+
+        if self.precision == 'int8':
+            self.draft_model = quantize_dynamic_int8(self.draft_model)
+
+        # Tokens the draft proposes per step (adjusted by transformers as it goes)
+        self.draft_model.generation_config.num_assistant_tokens = Config.DRAFT_NUM_TOKENS
+
+        if Config.KV_CACHE_ENABLED or Config.PREFIX_CACHE_ENABLED:
+            print("[WARNING] KV and prefix cache reuse is bypassed while a draft model is loaded")
+
     def generate_response(self, prompt, conversation_history=None, **kwargs):
         """
         Generate response using HuggingFace model
@@ -84,59 +249,21 @@ class HuggingFaceConnector(ModelConnector):
         Returns:
             str: Generated response
         """
+        timings = kwargs.pop('timings', None) or PhaseTimings()
         try:
-            # Build conversation context
-            system_message = kwargs.get('system_message', None)
-            context = self._build_context(prompt, conversation_history, system_message)
-
-            if self.is_seq2seq:
-                # For Seq2Seq models (BlenderBot), use encoder-decoder architecture
-                inputs = self.tokenizer(
-                    context,
-                    return_tensors='pt',
-                    truncation=True,
-                    max_length=512
-                ).to(self.device)
-
-                with torch.no_grad():
-                    outputs = self.model.generate(
-                        **inputs,
-                        max_length=Config.MAX_LENGTH,
-                        temperature=kwargs.get('temperature', Config.TEMPERATURE),
-                        top_p=kwargs.get('top_p', Config.TOP_P),
-                        do_sample=True,
-                        num_return_sequences=1
-                    )
+            deadline = _make_deadline(kwargs)
+            inputs = self._encode(prompt, conversation_history, kwargs.get('system_message', None), timings)
+            output_ids = self._generate_ids(inputs, deadline=deadline, timings=timings, **kwargs)
 
+            with timings.phase('detokenize'):
                 response = self.tokenizer.decode(
-                    outputs[0],
+                    output_ids,
                     skip_special_tokens=True
                 ).strip()
-            else:
-                # For Causal LM models (GPT-style), use autoregressive generation
-                inputs = self.tokenizer.encode(
-                    context + self.tokenizer.eos_token,
-                    return_tensors='pt',
-                    truncation=True,
-                    max_length=1000
-                ).to(self.device)
 
-                with torch.no_grad():
-                    outputs = self.model.generate(
-                        inputs,
-                        max_length=inputs.shape[1] + Config.MAX_LENGTH,
-                        temperature=kwargs.get('temperature', Config.TEMPERATURE),
-                        top_p=kwargs.get('top_p', Config.TOP_P),
-                        do_sample=True,
-                        pad_token_id=self.tokenizer.pad_token_id,
-                        eos_token_id=self.tokenizer.eos_token_id,
-                        num_return_sequences=1
-                    )
-
-                response = self.tokenizer.decode(
-                    outputs[0][inputs.shape[1]:],
-                    skip_special_tokens=True
-                ).strip()
+                # Cut off mid-sentence by the deadline: end on the last full sentence
+                if deadline is not None and deadline.hit:
+                    response = trim_to_sentence(response)
 
             # Fallback if empty
             if not response:
@@ -146,28 +273,793 @@ class HuggingFaceConnector(ModelConnector):
 
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "I apologize, but I encountered an error processing your request."
+            return ERROR_RESPONSE
 
-    def _build_context(self, prompt, conversation_history, system_message=None):
-        """Build conversation context from history"""
-        context = ""
+        finally:
+            get_registry().record(timings)
 
-        # Add system instruction as first user message (DialoGPT doesn't have system role)
-        if system_message and not conversation_history:
-            context += f"System: {system_message}{self.tokenizer.eos_token}"
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """
+        Generate response token by token
 
-        if conversation_history:
-            # Get last N messages
-            recent_history = conversation_history[-Config.MAX_CONVERSATION_HISTORY:]
+        Args:
+            prompt: User's message
+            conversation_history: List of previous messages
+            **kwargs: Additional generation parameters
 
-            for msg in recent_history:
-                if msg['role'] == 'user':
-                    context += f"User: {msg['content']}{self.tokenizer.eos_token}"
-                elif msg['role'] == 'assistant':
-                    context += f"Assistant: {msg['content']}{self.tokenizer.eos_token}"
+        Yields:
+            str: Text chunks as soon as the model decodes them
+        """
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        timings = kwargs.pop('timings', None) or PhaseTimings()
+        deadline = _make_deadline(kwargs)
+        errors = []
+
+        def run_generation(inputs):
+            try:
+                # The streamer decodes text as tokens arrive, so detokenizing is part of 'decode' here
+                self._generate_ids(inputs, streamer=streamer, deadline=deadline, timings=timings, **kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        try:
+            try:
+                inputs = self._encode(prompt, conversation_history, kwargs.get('system_message', None), timings)
+            except Exception as e:
+                print(f"Error generating response: {e}")
+                yield ERROR_RESPONSE
+                return
+
+            worker = threading.Thread(target=run_generation, args=(inputs,), daemon=True)
+            worker.start()
+
+            produced = False
+            for text in streamer:
+                if text:
+                    produced = True
+                    yield text
+
+            worker.join()
+
+            if errors:
+                print(f"Error generating response: {errors[0]}")
+                if not produced:
+                    yield ERROR_RESPONSE
+            elif not produced:
+                yield "I'm here to help. Could you please rephrase that?"
+
+        finally:
+            get_registry().record(timings)
+
+    def _encode(self, prompt, conversation_history, system_message=None, timings=None):
+        """
+        Build the conversation context within the token budget and tokenize it
+
+        The system prompt and the latest turn are always kept; the newest
+        history that fits fills the rest of CONTEXT_TOKEN_BUDGET, so prefill
+        cost has a fixed upper bound. History and system segments come from
+        the token cache, so only the new prompt segment is run through the
+        tokenizer on a typical turn.
+
+        Args:
+            timings: Optional PhaseTimings receiving 'build' and 'tokenize' time
+
+        Returns:
+            Tensor of prompt token ids with shape (1, length)
+        """
+        timings = timings if timings is not None else PhaseTimings()
+        with timings.activate(), timings.phase('build'):
+            input_ids = self._build_input_ids(prompt, conversation_history, system_message)
+        timings.input_tokens = input_ids.shape[1]
+        return input_ids
+
+    def _build_input_ids(self, prompt, conversation_history, system_message):
+        """Context token ids for _encode; tokenizer calls are tracked as 'tokenize'"""
+        # Seq2Seq models (BlenderBot) see at most 512 tokens, causal models (GPT-style) 1000
+        max_length = min(Config.CONTEXT_TOKEN_BUDGET, 512 if self.is_seq2seq else 1000)
+        max_length -= self.tokenizer.num_special_tokens_to_add()
+
+        system_ids = []
+        # Add system instruction as first user message (DialoGPT doesn't have system role).
+        # It is kept on every turn, so each turn's context also extends the previous one
+        # and KV and prefix states can be reused.
+        if system_message:
+            system_ids = list(self.token_cache.encode('system', self._build_prefix(system_message)))
+        prompt_text = self._build_prompt(prompt)
+        with track('tokenize'):
+            prompt_ids = self.tokenizer.encode(prompt_text, add_special_tokens=False)
+
+        # An oversized latest turn keeps its end (the reply cue), an oversized system prompt its start
+        prompt_ids = prompt_ids[-max_length:]
+        system_ids = system_ids[:max_length - len(prompt_ids)]
+
+        history_ids = self._fit_history(conversation_history or [], max_length - len(system_ids) - len(prompt_ids))
+
+        token_ids = system_ids + history_ids + prompt_ids
+        with track('tokenize'):
+            token_ids = self.tokenizer.build_inputs_with_special_tokens(token_ids)
+            input_ids = torch.tensor([token_ids], dtype=torch.long, device=self.device)
+
+        return input_ids
+
+    def _generate_ids(self, inputs, streamer=None, deadline=None, timings=None, **kwargs):
+        """
+        Run generation for encoded inputs
+
+        Args:
+            inputs: Prompt token ids with shape (1, length)
+            streamer: Optional transformers streamer fed with new tokens
+            deadline: Optional LatencyDeadline bounding generation time
+            timings: Optional PhaseTimings receiving queue, prefill and decode time
+            **kwargs: Additional generation parameters
+
+        Returns:
+            Tensor of output token ids (new tokens only for causal models)
+        """
+        temperature = kwargs.get('temperature', Config.TEMPERATURE)
+        top_p = kwargs.get('top_p', Config.TOP_P)
+        do_sample = kwargs.get('do_sample', True)
+        timings = timings if timings is not None else PhaseTimings()
+        started = time.monotonic()
+
+        # Only plan for as many tokens as the remaining budget can decode
+        max_new_tokens = Config.MAX_LENGTH
+        criteria = [FirstTokenMarker([timings.mark_first_token])]
+        if deadline is not None:
+            max_new_tokens = deadline.max_new_tokens(self.seconds_per_token, Config.MAX_LENGTH)
+            criteria.append(DeadlineStoppingCriteria([deadline], self.tokenizer))
+        stopping = {'stopping_criteria': StoppingCriteriaList(criteria)}
+
+        # Greedy decoding takes no sampling parameters
+        sampling = {'do_sample': True, 'temperature': temperature, 'top_p': top_p} if do_sample else {'do_sample': False}
+
+        # The draft model verifies against the target's full context, so it cannot
+        # start from reused KV states (transformers passes them to both models)
+        assisted = self.draft_model is not None
+
+        # Reuse the KV states from this conversation's previous turn
+        conversation_id = kwargs.get('conversation_id')
+        keep_cache = self.kv_cache is not None and conversation_id is not None and not assisted
+        reused, past_key_values = 0, None
+        if keep_cache:
+            reused, past_key_values = self.kv_cache.lookup(conversation_id, inputs[0])
+
+        # Otherwise start from the shared system prompt states
+        prefix_key = kwargs.get('prefix_key')
+        if self.prefix_cache is not None and prefix_key is not None and kwargs.get('system_message') and not assisted:
+            self.warm_prefix(prefix_key, kwargs['system_message'])
+            prefix_reused, prefix_past = self.prefix_cache.lookup(prefix_key, inputs[0])
+            if prefix_reused > reused:
+                past_key_values = prefix_past
+
+        if self.scheduler:
+            request = GenerationRequest(
+                inputs[0],
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                do_sample=do_sample,
+                streamer=streamer,
+                past_key_values=past_key_values,
+                keep_cache=keep_cache,
+                deadline=deadline
+            )
+            output_ids = self.scheduler.submit(request).result()
+            if keep_cache and request.cache is not None:
+                self.kv_cache.store(conversation_id, *request.cache)
+            timings.truncated = deadline is not None and deadline.truncated(len(output_ids))
+            timings.mark_first_token(request.first_token_at)
+            timings.split_generation(started, queued_until=request.admitted_at)
+            # Seq2seq output starts with the decoder start token
+            timings.output_tokens = len(output_ids) - 1 if self.is_seq2seq else len(output_ids)
+            self._record_decode_speed(timings.first_token_at, timings.output_tokens)
+            return output_ids
+
+        if self.is_seq2seq:
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    inputs,
+                    max_length=max_new_tokens,
+                    num_return_sequences=1,
+                    streamer=streamer,
+                    **sampling,
+                    **stopping
+                )
+            # max_length counts the decoder start token too
+            timings.truncated = deadline is not None and deadline.truncated(outputs.shape[1])
+            timings.split_generation(started)
+            timings.output_tokens = outputs.shape[1] - 1
+            self._record_decode_speed(timings.first_token_at, timings.output_tokens)
+            return outputs[0]
+
+        cache_kwargs = {'past_key_values': past_key_values} if past_key_values is not None else {}
+        if assisted:
+            # Assisted generation: the draft proposes tokens, the model checks them in one pass
+            cache_kwargs['assistant_model'] = self.draft_model
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                inputs,
+                max_length=inputs.shape[1] + max_new_tokens,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                num_return_sequences=1,
+                streamer=streamer,
+                return_dict_in_generate=True,
+                **sampling,
+                **stopping,
+                **cache_kwargs
+            )
+
+        sequence = outputs.sequences[0]
+        timings.truncated = deadline is not None and deadline.truncated(len(sequence) - inputs.shape[1])
+        timings.split_generation(started)
+        timings.output_tokens = len(sequence) - inputs.shape[1]
+        self._record_decode_speed(timings.first_token_at, timings.output_tokens)
+        if keep_cache and outputs.past_key_values is not None:
+            past = _to_legacy_cache(outputs.past_key_values)
+            self.kv_cache.store(conversation_id, sequence[:past[0][0].shape[2]].cpu(), past)
+
+        return sequence[inputs.shape[1]:]
+
+    def _record_decode_speed(self, first_token_at, new_tokens):
+        """
+        Update the moving average of seconds per generated token
+
+        Measured from the first new token, so queue wait and prefill (which
+        the deadline's stopping criteria already bound in wall-clock time)
+        do not inflate the per-token estimate that caps later replies.
+
+        Args:
+            first_token_at: When the first new token was produced, or None
+            new_tokens: Tokens generated
+        """
+        if first_token_at is None or new_tokens < 2:
+            return
+        sample = (time.monotonic() - first_token_at) / (new_tokens - 1)
+        if self.seconds_per_token is None:
+            self.seconds_per_token = sample
+        else:
+            self.seconds_per_token = 0.8 * self.seconds_per_token + 0.2 * sample
+
+    def release_conversation(self, conversation_id):
+        """Drop the KV cache held for a conversation"""
+        if self.kv_cache is not None:
+            self.kv_cache.release(conversation_id)
+
+    def warm_prefix(self, prefix_key, system_message):
+        """
+        Tokenize a system prompt prefix and pre-compute its key/value states
+
+        Args:
+            prefix_key: Key from ConversationManager.get_system_prompt
+            system_message: The system prompt text
+        """
+        if self.prefix_cache is None or self.prefix_cache.contains(prefix_key):
+            return
+
+        token_ids = self.token_cache.encode('system', self._build_prefix(system_message))
+        input_ids = torch.tensor([token_ids], dtype=torch.long, device=self.device)
+
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+
+        self.prefix_cache.store(prefix_key, input_ids[0].cpu(), _to_legacy_cache(outputs.past_key_values))
+
+    def get_stats(self):
+        """Return load timings and statistics of the token, KV and prefix caches"""
+        stats = {'load_timings': self.load_timings}
+        if self.token_cache is not None:
+            stats['token_cache'] = self.token_cache.get_stats()
+        if self.kv_cache is not None:
+            stats['kv_cache'] = self.kv_cache.get_stats()
+        if self.prefix_cache is not None:
+            stats['prefix_cache'] = self.prefix_cache.get_stats()
+        return stats
+
+    def _fit_history(self, conversation_history, budget):
+        """
+        Select the newest history that fits in a token budget
+
+        Messages are dropped from the oldest end. With CONTEXT_SUMMARY_ENABLED
+        a compact summary of the dropped user messages takes their place if
+        it fits in the space left over.
+
+        Args:
+            conversation_history: List of previous messages
+            budget: Tokens left after the system prompt and latest turn
+
+        Returns:
+            list: Token ids of the summary and kept history
+        """
+        # Get last N messages
+        offset = max(0, len(conversation_history) - Config.MAX_CONVERSATION_HISTORY)
+        segments = [self._encode_message(msg) for msg in conversation_history[offset:]]
+
+        # suffix[i] is the token count of segments[i:]
+        suffix = [0] * (len(segments) + 1)
+        for i in range(len(segments) - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + len(segments[i])
+
+        start = self._history_start(offset, suffix, budget)
+
+        # The summary only uses space the kept history leaves free
+        summary_ids = []
+        if Config.CONTEXT_SUMMARY_ENABLED and start > 0:
+            summary_ids = self._summarize_dropped(conversation_history[:start], budget - suffix[start - offset])
+
+        kept = []
+        for token_ids in segments[start - offset:]:
+            kept.extend(token_ids)
+        return summary_ids + kept
+
+    def _history_start(self, offset, suffix, budget):
+        """
+        Index of the oldest history message that goes into the context
+
+        Args:
+            offset: Index of the first message considered
+            suffix: Token counts of the considered messages from each index to the end
+            budget: Tokens available for history
+        """
+        start = offset
+        while start - offset < len(suffix) - 1 and suffix[start - offset] > budget:
+            start += 1
+
+        if self.kv_cache is not None and start:
+            # Slide the window in whole steps so the cached prefix stays valid
+            # for several turns instead of changing on every message
+            step = max(1, Config.KV_CACHE_WINDOW_STEP)
+            start = min(offset + len(suffix) - 1, -(-start // step) * step)
+
+        return start
+
+    def _encode_message(self, msg):
+        """Token ids of one history message"""
+        eos = self.tokenizer.eos_token
+        if msg['role'] == 'user':
+            return self.token_cache.encode('user', f"User: {msg['content']}{eos}")
+        if msg['role'] == 'assistant':
+            return self.token_cache.encode('assistant', f"Assistant: {msg['content']}{eos}")
+        return ()
+
+    def _summarize_dropped(self, dropped, max_tokens):
+        """
+        Compact extractive summary of the user messages dropped from the context
+
+        Keeps the first sentence of each dropped user message, newest last,
+        within CONTEXT_SUMMARY_MAX_WORDS words and max_tokens tokens.
+
+        Returns:
+            list: Token ids of the summary segment, empty if nothing fits
+        """
+        points = []
+        words = 0
+        for msg in reversed(dropped):
+            if msg['role'] != 'user':
+                continue
+            point = msg['content'].strip().split('. ')[0].rstrip('.')
+            point_words = len(point.split())
+            if not point or words + point_words > Config.CONTEXT_SUMMARY_MAX_WORDS:
+                break
+            points.insert(0, point)
+            words += point_words
+
+        # Drop the oldest points until the summary fits
+        while points:
+            text = f"Summary: Earlier the user said: {'; '.join(points)}.{self.tokenizer.eos_token}"
+            summary_ids = self.token_cache.encode('summary', text)
+            if len(summary_ids) <= max_tokens:
+                return list(summary_ids)
+            points.pop(0)
+
+        return []
+
+    def _build_prompt(self, prompt):
+        """Render the latest user turn followed by the reply cue"""
+        eos = self.tokenizer.eos_token
+        prompt_text = f"User: {prompt}{eos}Assistant:"
+        if not self.is_seq2seq:
+            # Causal models get a trailing EOS before the reply starts
+            prompt_text += eos
+        return prompt_text
+
+    def _build_prefix(self, system_message):
+        """Render the system prompt segment that starts a context"""
+        return f"System: {system_message}{self.tokenizer.eos_token}"
+
+
+class GenerationRequest:
+    """A single generation job queued on the InferenceScheduler"""
+
+    def __init__(self, input_ids, max_new_tokens=None, temperature=None, top_p=None, do_sample=True,
+                 streamer=None, past_key_values=None, keep_cache=False, deadline=None):
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens or Config.MAX_LENGTH
+        self.temperature = temperature if temperature is not None else Config.TEMPERATURE
+        self.top_p = top_p if top_p is not None else Config.TOP_P
+        self.do_sample = do_sample
+        self.streamer = streamer
+        self.past_key_values = past_key_values  # Cached states for a prefix of input_ids
+        self.keep_cache = keep_cache
+        self.cache = None  # (token_ids, past_key_values) at the end of decoding
+        self.deadline = deadline  # Optional LatencyDeadline
+        self.last_token_at = time.monotonic()
+        self.admitted_at = None  # When the scheduler took the request off the queue
+        self.first_token_at = None
+        self.generated = []
+        self.future = Future()
+
+    def mark_first_token(self, at):
+        if self.first_token_at is None:
+            self.first_token_at = at
+
+    def sampling_key(self):
+        """Requests with the same key can share one seq2seq generate call"""
+        if self.streamer is not None:
+            # transformers streamers only accept a batch of one
+            return id(self)
+        return (self.max_new_tokens, self.temperature, self.top_p, self.do_sample)
+
+
+class InferenceScheduler:
+    """
+    Continuous-batching scheduler for HuggingFace models
+
+    Requests from all routes are queued here and decoded together by a
+    single background thread. For causal models each new request is
+    prefilled on its own and then joins the running, left-padded batch at
+    the next token boundary; finished sequences leave the batch at once so
+    their slot can be reused. Seq2seq models are micro-batched instead:
+    requests that arrive within the wait window share one generate call.
+    """
+
+    def __init__(self, model, tokenizer, is_seq2seq, device, max_batch_size=None, max_wait_ms=None):
+        """
+        Initialize scheduler and start its decode thread
+
+        Args:
+            model: Loaded HuggingFace model
+            tokenizer: Matching tokenizer (used for padding and EOS)
+            is_seq2seq: Whether the model is an encoder-decoder
+            device: Device the model lives on
+            max_batch_size: Maximum number of sequences decoded together
+            max_wait_ms: How long an idle scheduler waits to fill a batch
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.is_seq2seq = is_seq2seq
+        self.device = device
+        self.max_batch_size = max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE
+        wait_ms = max_wait_ms if max_wait_ms is not None else Config.INFERENCE_MAX_WAIT_MS
+        self.max_wait = wait_ms / 1000.0
+        self.eos_token_id = tokenizer.eos_token_id
+
+        self._queue = queue.Queue()
+
+        # Running causal batch, one row per active request
+        self._active = []
+        self._past = None
+        self._attention_mask = None
+        self._next_tokens = None
+        self._positions = None
+
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        """
+        Queue a generation request
+
+        Args:
+            request: GenerationRequest instance
+
+        Returns:
+            Future resolving to the generated token ids
+        """
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, input_ids, **params):
+        """
+        Queue a request and block until it has been decoded
 
-        context += f"User: {prompt}{self.tokenizer.eos_token}Assistant:"
-        return context
+        Args:
+            input_ids: 1-D tensor of prompt token ids
+            **params: GenerationRequest parameters
+
+        Returns:
+            Tensor of generated token ids (new tokens only for causal
+            models, the full decoder output for seq2seq models)
+        """
+        return self.submit(GenerationRequest(input_ids, **params)).result()
+
+    def _run(self):
+        """Scheduler loop: admit waiting requests, then run one decode step"""
+        while True:
+            pending = []
+            try:
+                pending = self._collect_pending()
+                with torch.no_grad():
+                    if self.is_seq2seq:
+                        self._run_seq2seq_batch(pending)
+                    else:
+                        self._admit(pending)
+                        if self._active:
+                            self._decode_step()
+            except Exception as e:
+                print(f"Error in inference scheduler: {e}")
+                self._fail_all(e, pending)
+
+    def _collect_pending(self):
+        """Take as many queued requests as there are free batch slots"""
+        free_slots = self.max_batch_size - len(self._active)
+        pending = []
+
+        if not self._active:
+            # Idle: block for the first request, then briefly wait for company
+            pending.append(self._queue.get())
+            wait_until = time.monotonic() + self.max_wait
+            while len(pending) < free_slots:
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        else:
+            # Busy: admit whatever is already waiting at this token boundary
+            while len(pending) < free_slots:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+        return pending
+
+    def _admit(self, pending):
+        """Prefill new causal requests and merge them into the running batch"""
+        for request in pending:
+            request.admitted_at = time.monotonic()
+            input_ids = request.input_ids.to(self.device).unsqueeze(0)
+            if request.streamer is not None:
+                # Streamers expect the prompt first, like model.generate sends it
+                request.streamer.put(input_ids.cpu())
+
+            # Only prefill the part of the prompt that is not cached yet
+            reused = request.past_key_values[0][0].shape[2] if request.past_key_values is not None else 0
+            outputs = self.model(
+                input_ids=input_ids[:, reused:],
+                past_key_values=request.past_key_values,
+                use_cache=True
+            )
+            request.past_key_values = None
+
+            past = _to_legacy_cache(outputs.past_key_values)
+            token = self._sample(outputs.logits[:, -1, :], [request])
+
+            if self._record(request, token.item()):
+                self._finish(request, past if request.keep_cache else None)
+                continue
+
+            self._merge(request, past, input_ids.shape[1], token)
+
+    def _merge(self, request, past, length, token):
+        """Left-pad the batch or the new row to a common length and stack them"""
+        mask = torch.ones((1, length), dtype=torch.long, device=self.device)
+        position = torch.tensor([length], dtype=torch.long, device=self.device)
+        next_token = token.view(1, 1)
+
+        if self._past is None:
+            self._past, self._attention_mask = past, mask
+            self._positions, self._next_tokens = position, next_token
+        else:
+            width = max(self._attention_mask.shape[1], length)
+            self._past = tuple(
+                (
+                    torch.cat([_left_pad(batch_key, width), _left_pad(new_key, width)]),
+                    torch.cat([_left_pad(batch_value, width), _left_pad(new_value, width)])
+                )
+                for (batch_key, batch_value), (new_key, new_value) in zip(self._past, past)
+            )
+            self._attention_mask = torch.cat([_left_pad(self._attention_mask, width), _left_pad(mask, width)])
+            self._positions = torch.cat([self._positions, position])
+            self._next_tokens = torch.cat([self._next_tokens, next_token])
+
+        self._active.append(request)
+
+    def _decode_step(self):
+        """Run one shared forward pass and retire finished sequences"""
+        attention_mask = torch.cat([
+            self._attention_mask,
+            torch.ones((len(self._active), 1), dtype=torch.long, device=self.device)
+        ], dim=1)
+
+        outputs = self.model(
+            input_ids=self._next_tokens,
+            past_key_values=self._past,
+            attention_mask=attention_mask,
+            position_ids=self._positions.unsqueeze(1),
+            use_cache=True
+        )
+
+        self._past = _to_legacy_cache(outputs.past_key_values)
+        self._attention_mask = attention_mask
+        self._positions = self._positions + 1
+
+        tokens = self._sample(outputs.logits[:, -1, :], self._active)
+        keep = []
+        for row, (request, token) in enumerate(zip(self._active, tokens.tolist())):
+            if self._record(request, token):
+                self._finish(request, self._row_cache(row) if request.keep_cache else None)
+            else:
+                keep.append(row)
+
+        self._next_tokens = tokens.unsqueeze(1)
+        if len(keep) < len(self._active):
+            self._retire(keep)
+
+    def _retire(self, keep):
+        """Drop finished rows and any padding columns no remaining row needs"""
+        if not keep:
+            self._reset_batch()
+            return
+
+        index = torch.tensor(keep, dtype=torch.long, device=self.device)
+        self._active = [self._active[row] for row in keep]
+        self._next_tokens = self._next_tokens.index_select(0, index)
+        self._positions = self._positions.index_select(0, index)
+
+        mask = self._attention_mask.index_select(0, index)
+        start = int(mask.any(dim=0).nonzero()[0])
+        self._attention_mask = mask[:, start:]
+        self._past = tuple(
+            (key.index_select(0, index)[:, :, start:], value.index_select(0, index)[:, :, start:])
+            for key, value in self._past
+        )
+
+    def _reset_batch(self):
+        self._active = []
+        self._past = None
+        self._attention_mask = None
+        self._next_tokens = None
+        self._positions = None
+
+    def _row_cache(self, row):
+        """Copy one row's KV states out of the batch, without its left padding"""
+        start = int(self._attention_mask[row].nonzero()[0])
+        return tuple(
+            (key[row:row + 1, :, start:].clone(), value[row:row + 1, :, start:].clone())
+            for key, value in self._past
+        )
+
+    def _record(self, request, token_id):
+        """
+        Append a sampled token to a request
+
+        Returns:
+            bool: True if the request has finished decoding
+        """
+        request.mark_first_token(time.monotonic())
+        if token_id == self.eos_token_id:
+            return True
+
+        request.generated.append(token_id)
+        if request.streamer is not None:
+            request.streamer.put(torch.tensor([token_id]))
+
+        if request.deadline is not None:
+            now = time.monotonic()
+            step_seconds, request.last_token_at = now - request.last_token_at, now
+            if request.deadline.should_stop(self.tokenizer.decode(request.generated[-2:]), step_seconds):
+                return True
+
+        return len(request.generated) >= request.max_new_tokens
+
+    def _finish(self, request, past=None):
+        """Resolve a finished request, attaching its final KV states if kept"""
+        generated = torch.tensor(request.generated, dtype=torch.long)
+
+        if past is not None:
+            token_ids = torch.cat([request.input_ids.cpu(), generated])
+            request.cache = (token_ids[:past[0][0].shape[2]], past)
+
+        if request.streamer is not None:
+            request.streamer.end()
+        request.future.set_result(generated)
+
+    def _sample(self, logits, requests):
+        """Sample one token per row using each request's own parameters"""
+        temperatures = torch.tensor([r.temperature for r in requests], dtype=logits.dtype, device=self.device)
+        top_ps = torch.tensor([r.top_p for r in requests], dtype=logits.dtype, device=self.device)
+        do_sample = torch.tensor([r.do_sample for r in requests], dtype=torch.bool, device=self.device)
+        return _sample_next_tokens(logits, temperatures.unsqueeze(1), top_ps.unsqueeze(1), do_sample)
+
+    def _run_seq2seq_batch(self, pending):
+        """Generate seq2seq requests in padded groups of matching parameters"""
+        groups = {}
+        for request in pending:
+            groups.setdefault(request.sampling_key(), []).append(request)
+
+        for requests in groups.values():
+            first = requests[0]
+            admitted_at = time.monotonic()
+            for request in requests:
+                request.admitted_at = admitted_at
+            batch = self.tokenizer.pad(
+                {'input_ids': [request.input_ids.tolist() for request in requests]},
+                return_tensors='pt'
+            ).to(self.device)
+
+            criteria = [FirstTokenMarker([request.mark_first_token for request in requests])]
+            if any(request.deadline is not None for request in requests):
+                deadlines = [request.deadline for request in requests]
+                criteria.append(DeadlineStoppingCriteria(deadlines, self.tokenizer))
+
+            # max_length matches the unbatched seq2seq path
+            outputs = self.model.generate(
+                **batch,
+                max_length=first.max_new_tokens,
+                temperature=first.temperature,
+                top_p=first.top_p,
+                do_sample=first.do_sample,
+                num_return_sequences=1,
+                streamer=first.streamer,
+                stopping_criteria=StoppingCriteriaList(criteria)
+            )
+
+            for request, output in zip(requests, outputs):
+                request.future.set_result(output)
+
+    def _fail_all(self, error, pending):
+        """Propagate a scheduler error to every waiting caller"""
+        for request in self._active + pending:
+            if not request.future.done():
+                if request.streamer is not None:
+                    request.streamer.end()
+                request.future.set_exception(error)
+        self._reset_batch()
+
+
+def _make_deadline(kwargs):
+    """Start the clock on a request's latency budget, if it has one"""
+    budget = kwargs.get('latency_budget')
+    return LatencyDeadline(budget) if budget is not None else None
+
+
+def _to_legacy_cache(past_key_values):
+    """Normalize a model's KV cache to the tuple-of-(key, value) layout"""
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def _left_pad(tensor, width):
+    """Zero-pad the sequence dimension of a mask (B, T) or KV tensor (B, H, T, D) on the left"""
+    if tensor.dim() == 2:
+        return F.pad(tensor, (width - tensor.shape[1], 0))
+    return F.pad(tensor, (0, 0, width - tensor.shape[2], 0))
+
+
+def _sample_next_tokens(logits, temperatures, top_ps, do_sample):
+    """Temperature and nucleus sampling with per-row parameters"""
+    greedy = logits.argmax(dim=-1)
+    if not bool(do_sample.any()):
+        return greedy
+
+    scaled = logits / temperatures.clamp(min=1e-5)
+    sorted_logits, sorted_indices = torch.sort(scaled, descending=True, dim=-1)
+    sorted_probs = sorted_logits.softmax(dim=-1)
+
+    # Drop a token once the probability mass ahead of it already exceeds top_p
+    remove = (sorted_probs.cumsum(dim=-1) - sorted_probs) > top_ps
+    sorted_logits = sorted_logits.masked_fill(remove, float('-inf'))
+
+    choice = torch.multinomial(sorted_logits.softmax(dim=-1), num_samples=1)
+    sampled = sorted_indices.gather(-1, choice).squeeze(-1)
+    return torch.where(do_sample, sampled, greedy)
 
 
 class OpenAIConnector(ModelConnector):
@@ -175,69 +1067,192 @@ class OpenAIConnector(ModelConnector):
 
     def __init__(self):
         super().__init__()
-        if not Config.OPENAI_API_KEY:
+        if not Config.OPENAI_API_KEY and not Config.OPENAI_BASE_URL:
             raise ValueError("OpenAI API key not configured")
 
-        try:
-            import openai
-            self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-            self.model = Config.OPENAI_MODEL
-        except ImportError:
-            raise ImportError("openai package not installed. Run: pip install openai")
+        from app.ai.openai_client import RetryingCaller, create_openai_client
+        self.client = create_openai_client()
+        self.caller = RetryingCaller()
+        self.model = Config.OPENAI_MODEL
 
     def generate_response(self, prompt, conversation_history=None, **kwargs):
         """Generate response using OpenAI API"""
+        timings = kwargs.pop('timings', None) or PhaseTimings()
         try:
-            messages = []
-
-            # System message
-            system_message = kwargs.get('system_message', 'You are a helpful AI assistant.')
-            messages.append({"role": "system", "content": system_message})
-
-            # Add conversation history
-            if conversation_history:
-                recent_history = conversation_history[-Config.MAX_CONVERSATION_HISTORY:]
-                for msg in recent_history:
-                    messages.append({
-                        "role": msg['role'],
-                        "content": msg['content']
-                    })
-
-            # Add current prompt
-            messages.append({"role": "user", "content": prompt})
-
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
+            deadline = _make_deadline(kwargs)
+            with timings.phase('build'):
+                messages = self._build_messages(prompt, conversation_history, **kwargs)
+
+            # Call OpenAI API (retried and, if enabled, hedged)
+            with timings.phase('request'):
+                response = self.caller.call(lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self._temperature(**kwargs),
+                    max_tokens=kwargs.get('max_tokens', Config.MAX_LENGTH),
+                    **self._timeout(deadline)
+                ), deadline)
+
+            if response.usage is not None:
+                timings.input_tokens = response.usage.prompt_tokens
+                timings.output_tokens = response.usage.completion_tokens
+
+            return response.choices[0].message.content
+
+        except Exception as e:
+            print(f"Error with OpenAI API: {e}")
+            return ERROR_RESPONSE
+
+        finally:
+            get_registry().record(timings)
+
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """
+        Generate response using OpenAI API, yielding deltas as they arrive
+
+        Time to the first delta is recorded as 'prefill' and the rest as
+        'decode'; each content delta is counted as one output token.
+        """
+        timings = kwargs.pop('timings', None) or PhaseTimings()
+        produced = False
+        try:
+            deadline = _make_deadline(kwargs)
+            with timings.phase('build'):
+                messages = self._build_messages(prompt, conversation_history, **kwargs)
+            started = time.monotonic()
+
+            # Retry opening the stream; once tokens flow a retry would repeat them
+            stream = self.caller.call_once(lambda: self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                temperature=kwargs.get('temperature', Config.TEMPERATURE),
-                max_tokens=kwargs.get('max_tokens', Config.MAX_LENGTH)
-            )
+                temperature=self._temperature(**kwargs),
+                max_tokens=kwargs.get('max_tokens', Config.MAX_LENGTH),
+                stream=True,
+                **self._timeout(deadline)
+            ), deadline)
 
-            return response.choices[0].message.content
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    timings.mark_first_token()
+                    timings.output_tokens += 1
+                    produced = True
+                    yield text
+                if deadline is not None and deadline.remaining() == 0:
+                    timings.truncated = True
+                    stream.close()
+                    break
+
+            timings.split_generation(started)
 
         except Exception as e:
             print(f"Error with OpenAI API: {e}")
-            return "I apologize, but I encountered an error processing your request."
+            if not produced:
+                yield ERROR_RESPONSE
+
+        finally:
+            get_registry().record(timings)
+
+    def _timeout(self, deadline):
+        """Per-request timeout that keeps the call inside the latency budget"""
+        if deadline is None:
+            return {}
+        return {'timeout': max(0.1, min(Config.OPENAI_READ_TIMEOUT, deadline.remaining()))}
+
+    def get_stats(self):
+        """Return retry, hedging and latency statistics"""
+        return {'openai': self.caller.get_stats()}
+
+    def _temperature(self, **kwargs):
+        """Sampling temperature, or 0 when deterministic decoding is requested"""
+        if not kwargs.get('do_sample', True):
+            return 0
+        return kwargs.get('temperature', Config.TEMPERATURE)
+
+    def _build_messages(self, prompt, conversation_history=None, **kwargs):
+        """Build the chat completion message list"""
+        messages = []
+
+        # System message
+        system_message = kwargs.get('system_message', 'You are a helpful AI assistant.')
+        messages.append({"role": "system", "content": system_message})
+
+        # Add conversation history
+        if conversation_history:
+            recent_history = conversation_history[-Config.MAX_CONVERSATION_HISTORY:]
+            for msg in recent_history:
+                messages.append({
+                    "role": msg['role'],
+                    "content": msg['content']
+                })
+
+        # Add current prompt
+        messages.append({"role": "user", "content": prompt})
+        return messages
 
 
 def get_model_connector():
     """Factory function to get the appropriate model connector"""
+    if Config.INFERENCE_SERVER_SOCKET:
+        # The model lives in the shared inference server process
+        from app.ai.inference_server import InferenceClient
+        return InferenceClient(Config.INFERENCE_SERVER_SOCKET)
+    return get_local_model_connector()
+
+
+def get_local_model_connector():
+    """Create a connector that runs the model in this process"""
     if Config.AI_MODEL_TYPE == 'huggingface':
-        return HuggingFaceConnector()
+        connector = HuggingFaceConnector()
     elif Config.AI_MODEL_TYPE == 'openai':
-        return OpenAIConnector()
+        connector = OpenAIConnector()
     else:
         raise ValueError(f"Unknown model type: {Config.AI_MODEL_TYPE}")
 
+    if Config.PRIORITY_GATE_ENABLED:
+        from app.ai.priority_gate import PriorityGatedConnector
+        connector = PriorityGatedConnector(connector)
+
+    # Cache hits are answered without queueing for the gate
+    if Config.RESPONSE_CACHE_ENABLED:
+        from app.ai.response_cache import CachedModelConnector
+        connector = CachedModelConnector(connector)
+    return connector
+
 
 # Global model instance (loaded once)
 _model_instance = None
+_model_lock = threading.Lock()
 
 
 def get_model():
     """Get or create global model instance"""
     global _model_instance
     if _model_instance is None:
-        _model_instance = get_model_connector()
+        # A request may arrive while the worker is still preloading
+        with _model_lock:
+            if _model_instance is None:
+                _model_instance = get_model_connector()
     return _model_instance
+
+
+def release_conversation(conversation_id):
+    """Free per-conversation model state without loading a model to do so"""
+    if _model_instance is not None:
+        _model_instance.release_conversation(conversation_id)
+
+
+def get_model_stats():
+    """Cache statistics of the loaded model, or None if none is loaded yet"""
+    if _model_instance is None:
+        return None
+    return _model_instance.get_stats()
+
+
+def get_model_metrics():
+    """Phase timing histograms of generation calls (from the inference server when it owns the model)"""
+    if _model_instance is None:
+        return get_registry().snapshot()
+    return _model_instance.get_metrics()
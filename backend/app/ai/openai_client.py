@@ -0,0 +1,203 @@
+"""
+OpenAI Client
+Pooled HTTP client for the OpenAI API (or any OpenAI-compatible server)
+with bounded timeouts, jittered retries and optional hedged requests
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import Config
+
+
+def create_openai_client():
+    """
+    Build an OpenAI client on a pooled, keep-alive HTTP connection pool
+
+    The SDK's own retries are disabled; RetryingCaller handles them so
+    retries and hedges share one latency budget.
+
+    Returns:
+        openai.OpenAI client
+    """
+    try:
+        import httpx
+        import openai
+    except ImportError:
+        raise ImportError("openai package not installed. Run: pip install openai")
+
+    timeout = httpx.Timeout(
+        Config.OPENAI_READ_TIMEOUT,
+        connect=Config.OPENAI_CONNECT_TIMEOUT
+    )
+    http_client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=Config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.OPENAI_MAX_CONNECTIONS
+        )
+    )
+
+    return openai.OpenAI(
+        # Local OpenAI-compatible stand-ins usually accept any key
+        api_key=Config.OPENAI_API_KEY or 'not-needed',
+        base_url=Config.OPENAI_BASE_URL or None,
+        timeout=timeout,
+        max_retries=0,
+        http_client=http_client
+    )
+
+
+def is_retryable(error):
+    """Timeouts, connection errors, rate limits and 5xx responses are worth retrying"""
+    try:
+        import openai
+    except ImportError:
+        return False
+
+    return isinstance(error, (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError
+    ))
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """
+        Latency at a percentile of the window
+
+        Args:
+            percent: Percentile between 0 and 100
+
+        Returns:
+            float: Seconds, or None until enough samples are collected
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+class RetryingCaller:
+    """
+    Runs an API call with jittered retries and an optional hedged duplicate
+
+    When hedging is enabled and a call is still running after the
+    configured latency percentile of recent calls, a second identical call
+    is started and whichever finishes first wins. The slower one finishes
+    in the background and its result is discarded.
+    """
+
+    def __init__(self):
+        self.max_retries = Config.OPENAI_MAX_RETRIES
+        self.backoff = Config.OPENAI_RETRY_BACKOFF_MS / 1000
+        self.hedge_enabled = Config.OPENAI_HEDGE_ENABLED
+        self.hedge_percentile = Config.OPENAI_HEDGE_PERCENTILE
+        self.latency = LatencyTracker()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self._lock = threading.Lock()  # Counters are bumped from request and hedge threads
+        self._executor = None
+        if self.hedge_enabled:
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.OPENAI_MAX_CONNECTIONS,
+                thread_name_prefix='openai-hedge'
+            )
+
+    def call(self, fn, deadline=None):
+        """
+        Call fn() with retries, hedging it when enabled
+
+        Args:
+            fn: Zero-argument callable making one API request
+            deadline: Optional LatencyDeadline; no retry starts after it
+
+        Returns:
+            The first successful result
+        """
+        return self._retry(self._hedged if self._executor else self._timed, fn, deadline)
+
+    def call_once(self, fn, deadline=None):
+        """Call fn() with retries but without hedging (e.g. to open a stream)"""
+        return self._retry(lambda f: f(), fn, deadline)
+
+    def _retry(self, runner, fn, deadline):
+        """Retry retryable errors with exponential backoff and full jitter"""
+        attempt = 0
+        while True:
+            try:
+                return runner(fn)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                attempt += 1
+                delay = random.uniform(0, self.backoff * (2 ** (attempt - 1)))
+                if deadline is not None and deadline.remaining() <= delay:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def get_stats(self):
+        """Return retry and hedging counters with recent latency percentiles"""
+        with self._lock:
+            counters = {'retries': self.retries, 'hedges': self.hedges, 'hedge_wins': self.hedge_wins}
+        return {
+            **counters,
+            'p50_seconds': self.latency.percentile(50),
+            'p95_seconds': self.latency.percentile(95)
+        }
+
+    def _timed(self, fn):
+        start = time.monotonic()
+        result = fn()
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _hedged(self, fn):
+        primary = self._executor.submit(self._timed, fn)
+
+        delay = self.latency.percentile(self.hedge_percentile)
+        if delay is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        hedge = self._executor.submit(self._timed, fn)
+        pending = {primary, hedge}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+
+        # Both attempts failed; surface the primary's error
+        return primary.result()
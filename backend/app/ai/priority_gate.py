@@ -0,0 +1,305 @@
+"""
+Priority Gate
+Orders generation requests by lane so live callers never wait behind web
+chat: emergency-routed calls first, then live voice turns, then chat.
+Under overload, requests that would wait too long are turned away at once
+instead of tying up a worker until they time out.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from config import Config
+from app.ai.metrics import LATENCY_BUCKETS_MS, Histogram, PhaseTimings
+from app.ai.model_connector import ModelConnector
+
+# Highest priority first
+LANES = ('emergency', 'voice', 'chat')
+DEFAULT_LANE = 'chat'
+
+
+class Overloaded(Exception):
+    """Raised when a request is refused because the generation queue is too long"""
+
+    def __init__(self, lane, retry_after):
+        """
+        Args:
+            lane: Lane the request was queued in
+            retry_after: Estimated seconds until a retry would be admitted
+        """
+        super().__init__(f"Generation queue full for lane {lane} (estimated wait {retry_after:.1f}s)")
+        self.lane = lane
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        """Value for an HTTP Retry-After header (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def lane_for_agent(agent_key):
+    """Lane of a voice turn, given the agent key the router picked"""
+    return 'emergency' if agent_key == 'emergency' else 'voice'
+
+
+def default_concurrency():
+    """How many generations may run at once when GENERATION_CONCURRENCY is 0"""
+    if Config.AI_MODEL_TYPE == 'openai':
+        return Config.OPENAI_MAX_CONNECTIONS
+    if Config.INFERENCE_BATCHING:
+        # Let the scheduler fill its batch; the gate decides who gets in
+        return Config.INFERENCE_MAX_BATCH_SIZE
+    return 1
+
+
+class LaneStats:
+    """Queue depth and wait times of one lane"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.max_waiting = 0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def snapshot(self):
+        return {
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'running': self.running,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'wait_ms': self.wait_ms.snapshot()
+        }
+
+
+class PriorityGate:
+    """
+    Concurrency limit with one FIFO queue per priority lane
+
+    Up to `capacity` generations run at once. A freed slot is handed
+    directly to the oldest waiter of the highest-priority lane, so a
+    newly arriving chat request cannot overtake a waiting voice turn.
+
+    With admission control, a request that would have to queue is refused
+    (Overloaded) when the queue is full or its estimated wait exceeds the
+    allowed wait, and a queued request that is still waiting when the
+    allowed wait runs out is taken off the queue and refused too.
+    Emergency calls are always admitted.
+    """
+
+    def __init__(self, capacity=None):
+        """
+        Initialize gate
+
+        Args:
+            capacity: Generations allowed to run at once
+        """
+        self.capacity = max(1, capacity or Config.GENERATION_CONCURRENCY or default_concurrency())
+        self.in_flight = 0
+        self._waiting = []  # Heap of (lane rank, arrival number, lane, event)
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()
+        self._lanes = {lane: LaneStats() for lane in LANES}
+
+        self.admission_control = Config.ADMISSION_CONTROL_ENABLED
+        self.max_queue = Config.ADMISSION_MAX_QUEUE
+        self.max_wait = Config.ADMISSION_MAX_WAIT_MS / 1000.0
+        self.service_seconds = None  # Moving average of how long a slot is held
+
+    def acquire(self, lane, max_wait=None):
+        """
+        Block until a generation slot is free for this lane
+
+        Args:
+            lane: One of LANES (unknown lanes are treated as DEFAULT_LANE)
+            max_wait: Optional tighter wait limit for this request in seconds
+                (e.g. what is left of its latency budget)
+
+        Returns:
+            tuple: (lane used, seconds waited)
+
+        Raises:
+            Overloaded: If admission control refuses the request, on arrival
+                or when its allowed wait runs out in the queue
+        """
+        lane = lane if lane in self._lanes else DEFAULT_LANE
+        stats = self._lanes[lane]
+        start = time.monotonic()
+        limit = None
+
+        with self._lock:
+            if self.in_flight < self.capacity and not self._waiting:
+                self.in_flight += 1
+                self._admitted(stats, 0.0)
+                return lane, 0.0
+
+            if self.admission_control and lane != 'emergency':
+                limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+                estimate = self._estimate_wait(lane)
+                if len(self._waiting) >= self.max_queue or estimate > limit:
+                    stats.rejected += 1
+                    raise Overloaded(lane, max(estimate, limit))
+
+            event = threading.Event()
+            entry = (LANES.index(lane), next(self._arrivals), lane, event)
+            heapq.heappush(self._waiting, entry)
+            stats.waiting += 1
+            stats.max_waiting = max(stats.max_waiting, stats.waiting)
+
+        # release() hands over its slot and wakes us; higher lanes may keep
+        # overtaking, so the allowed wait is enforced here too
+        event.wait(limit)
+        waited = time.monotonic() - start
+        with self._lock:
+            # A slot handed over just as the wait ran out is still taken
+            if not event.is_set():
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                stats.waiting -= 1
+                stats.rejected += 1
+                raise Overloaded(lane, self._estimate_wait(lane))
+            self._admitted(stats, waited)
+        return lane, waited
+
+    def release(self, lane, held=None):
+        """
+        Give the slot to the next waiter, or free it
+
+        Args:
+            lane: Lane returned by acquire()
+            held: Seconds the slot was held, feeding the wait estimate
+        """
+        with self._lock:
+            if held is not None:
+                if self.service_seconds is None:
+                    self.service_seconds = held
+                else:
+                    self.service_seconds = 0.8 * self.service_seconds + 0.2 * held
+
+            self._lanes[lane].running -= 1
+            if self._waiting:
+                _, _, next_lane, event = heapq.heappop(self._waiting)
+                self._lanes[next_lane].waiting -= 1
+                event.set()
+            else:
+                self.in_flight -= 1
+
+    def _admitted(self, stats, waited):
+        stats.running += 1
+        stats.admitted += 1
+        stats.wait_ms.observe(waited * 1000)
+
+    def _estimate_wait(self, lane):
+        """
+        Seconds a new request in this lane would wait (call with the lock held)
+
+        Waiters in the same or higher-priority lanes go first; each round of
+        `capacity` slots takes about one average hold time.
+        """
+        if self.service_seconds is None:
+            return 0.0
+        rank = LANES.index(lane)
+        ahead = sum(1 for entry in self._waiting if entry[0] <= rank)
+        return math.ceil((ahead + 1) / self.capacity) * self.service_seconds
+
+    def get_stats(self):
+        """Return capacity, slots in use, admission thresholds and per-lane queue statistics"""
+        with self._lock:
+            lanes = {}
+            for lane, stats in self._lanes.items():
+                lanes[lane] = stats.snapshot()
+                lanes[lane]['estimated_wait_ms'] = round(self._estimate_wait(lane) * 1000, 1) if self.in_flight >= self.capacity else 0.0
+
+            return {
+                'capacity': self.capacity,
+                'in_flight': self.in_flight,
+                'queued': len(self._waiting),
+                'slot_hold_ms': round(self.service_seconds * 1000, 1) if self.service_seconds is not None else None,
+                'admission': {
+                    'enabled': self.admission_control,
+                    'max_queue': self.max_queue,
+                    'max_wait_ms': round(self.max_wait * 1000)
+                },
+                'lanes': lanes
+            }
+
+
+class PriorityGatedConnector(ModelConnector):
+    """Model connector wrapper that runs generation through a PriorityGate"""
+
+    def __init__(self, connector, gate=None):
+        """
+        Initialize wrapper
+
+        Args:
+            connector: The ModelConnector that actually generates
+            gate: PriorityGate to use (a new one by default)
+        """
+        super().__init__()
+        self.connector = connector
+        self.gate = gate or PriorityGate()
+
+    def __getattr__(self, name):
+        # Expose the wrapped connector's attributes (tokenizer, caches, ...)
+        return getattr(self.connector, name)
+
+    def generate_response(self, prompt, conversation_history=None, **kwargs):
+        """
+        Generate response once the request's lane gets a slot
+
+        Raises:
+            Overloaded: If admission control refuses the request
+        """
+        lane, kwargs = self._wait(kwargs)
+        start = time.monotonic()
+        try:
+            return self.connector.generate_response(prompt, conversation_history, **kwargs)
+        finally:
+            self.gate.release(lane, time.monotonic() - start)
+
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """
+        Stream response, holding the lane's slot until the stream ends
+
+        Raises:
+            Overloaded: On first iteration, if admission control refuses the request
+        """
+        lane, kwargs = self._wait(kwargs)
+        start = time.monotonic()
+        try:
+            yield from self.connector.generate_stream(prompt, conversation_history, **kwargs)
+        finally:
+            self.gate.release(lane, time.monotonic() - start)
+
+    def _wait(self, kwargs):
+        """Take the lane out of kwargs, wait for a slot and record the wait as the 'gate' phase"""
+        kwargs = dict(kwargs)
+        timings = kwargs.get('timings') or PhaseTimings()
+        kwargs['timings'] = timings
+
+        # A request that cannot start within its latency budget is refused rather than queued
+        lane, waited = self.gate.acquire(kwargs.pop('lane', DEFAULT_LANE), kwargs.get('latency_budget'))
+        timings.add('gate', waited)
+
+        # Time spent waiting comes out of the request's latency budget
+        if kwargs.get('latency_budget') is not None:
+            kwargs['latency_budget'] -= waited
+        return lane, kwargs
+
+    def release_conversation(self, conversation_id):
+        self.connector.release_conversation(conversation_id)
+
+    def warm_prefix(self, prefix_key, system_message):
+        self.connector.warm_prefix(prefix_key, system_message)
+
+    def get_stats(self):
+        return self.connector.get_stats()
+
+    def get_metrics(self):
+        metrics = self.connector.get_metrics()
+        metrics['lanes'] = self.gate.get_stats()
+        return metrics
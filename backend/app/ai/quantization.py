@@ -0,0 +1,94 @@
+"""
+Model Precision
+CPU serving precision modes for HuggingFace models: fp32, dynamic int8
+quantization of the Linear layers, and bfloat16 where the CPU supports it
+"""
+
+import io
+import os
+
+import torch
+from torch import nn
+from transformers.pytorch_utils import Conv1D
+
+
+PRECISION_MODES = ('fp32', 'int8', 'bf16')
+
+
+def cpu_supports_bf16():
+    """Check for native bfloat16 instructions (AVX512-BF16 or AMX) on Linux"""
+    if not os.path.exists('/proc/cpuinfo'):
+        return False
+
+    with open('/proc/cpuinfo', 'r') as f:
+        for line in f:
+            if line.startswith('flags'):
+                flags = line.split(':', 1)[1].split()
+                return 'avx512_bf16' in flags or 'amx_bf16' in flags
+    return False
+
+
+def resolve_precision(precision, device):
+    """
+    Decide which precision mode can actually be served
+
+    Args:
+        precision: Requested mode (fp32, int8, bf16)
+        device: Device the model runs on
+
+    Returns:
+        tuple: (effective mode, torch dtype to load the weights in)
+    """
+    if device == 'cuda':
+        # GPUs keep serving half precision as before
+        return 'fp16', torch.float16
+
+    if precision == 'bf16':
+        if cpu_supports_bf16():
+            return 'bf16', torch.bfloat16
+        print("[WARNING] bf16 requested but this CPU has no native bf16 support, using fp32")
+        return 'fp32', torch.float32
+
+    if precision == 'int8':
+        # Weights load as fp32 and are quantized after loading
+        return 'int8', torch.float32
+
+    return 'fp32', torch.float32
+
+
+def quantize_dynamic_int8(model):
+    """
+    Apply dynamic int8 quantization to every Linear layer
+
+    GPT-2 style models (DialoGPT) use transformers' Conv1D for their
+    projections, which dynamic quantization does not recognize, so those
+    are converted to equivalent nn.Linear layers first.
+
+    Args:
+        model: fp32 model on CPU
+
+    Returns:
+        Quantized model
+    """
+    _replace_conv1d(model)
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def _replace_conv1d(module):
+    """Swap Conv1D (x @ W + b, W stored as in x out) for nn.Linear in place"""
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            linear.weight = nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = nn.Parameter(child.bias.detach())
+            setattr(module, name, linear)
+        else:
+            _replace_conv1d(child)
+
+
+def model_size_bytes(model):
+    """Serialized size of a model's weights, including packed int8 params"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
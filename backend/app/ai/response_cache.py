@@ -0,0 +1,258 @@
+"""
+Response Cache
+Serves repeated short turns ("yes", "billing", "hello") without running the
+model again, and merges identical concurrent requests into one generation
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import Config
+from app.ai.metrics import PhaseTimings, get_registry
+from app.ai.model_connector import ERROR_RESPONSE, ModelConnector
+
+
+class ResponseCache:
+    """TTL/LRU cache of generated responses with single-flight de-duplication"""
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of cached responses
+            ttl_seconds: How long a cached response stays valid
+        """
+        self.max_entries = max_entries if max_entries is not None else Config.RESPONSE_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.RESPONSE_CACHE_TTL_SECONDS
+        self._entries = OrderedDict()  # key -> (expires_at, response, generation seconds)
+        self._in_flight = {}  # key -> Future of the leader's response
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.seconds_saved = 0.0
+
+    def get_or_generate(self, key, generate, cacheable=None):
+        """
+        Return the cached response for a key, or generate it exactly once
+
+        Concurrent callers with the same key wait for the first caller's
+        generation instead of running the model themselves.
+
+        Args:
+            key: Cache key from make_key
+            generate: Callable producing the response on a miss
+            cacheable: Optional callable; a generated response is only
+                stored if it returns True for it
+
+        Returns:
+            str: Response text
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response, seconds = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.seconds_saved += seconds
+                    return response
+                del self._entries[key]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = Future()
+                self._in_flight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return flight.result()
+
+        try:
+            start = time.monotonic()
+            response = generate()
+            seconds = time.monotonic() - start
+
+            if response != ERROR_RESPONSE and (cacheable is None or cacheable(response)):
+                self._store(key, response, seconds)
+            flight.set_result(response)
+            return response
+
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get(self, key):
+        """Return a fresh cached response or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += entry[2]
+            return entry[1]
+
+    def put(self, key, response, seconds=0.0):
+        """Store a response generated outside get_or_generate (e.g. a stream)"""
+        if response and response != ERROR_RESPONSE:
+            self._store(key, response, seconds)
+
+    def _store(self, key, response, seconds):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def get_stats(self):
+        """Return hit rate and the model time saved"""
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': round((self.hits + self.coalesced) / requests, 3) if requests else 0.0,
+                'compute_seconds_saved': round(self.seconds_saved, 3)
+            }
+
+
+class CachedModelConnector(ModelConnector):
+    """Model connector wrapper that answers repeated requests from a ResponseCache"""
+
+    def __init__(self, connector, cache=None):
+        """
+        Initialize wrapper
+
+        Args:
+            connector: The ModelConnector that actually generates
+            cache: ResponseCache to use (a new one by default)
+        """
+        super().__init__()
+        self.connector = connector
+        self.cache = cache or ResponseCache()
+        self.deterministic = Config.RESPONSE_CACHE_DETERMINISTIC
+
+    def __getattr__(self, name):
+        # Expose the wrapped connector's attributes (tokenizer, caches, ...)
+        return getattr(self.connector, name)
+
+    def generate_response(self, prompt, conversation_history=None, **kwargs):
+        """Generate response, reusing a cached answer when one is valid"""
+        timings = kwargs.pop('timings', None) or PhaseTimings()
+        kwargs = self._decoding_kwargs(kwargs)
+        key = make_key(prompt, conversation_history, kwargs)
+        generated = []
+
+        def generate():
+            generated.append(True)
+            return self.connector.generate_response(prompt, conversation_history, timings=timings, **kwargs)
+
+        # A reply cut short by its latency budget is only valid for that call
+        response = self.cache.get_or_generate(key, generate, cacheable=lambda _: not timings.truncated)
+        if not generated:
+            # Answered from the cache (or by an identical request in flight)
+            timings.cached = True
+            get_registry().record(timings)
+        return response
+
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        """Stream response, replaying a cached answer in one chunk on a hit"""
+        timings = kwargs.pop('timings', None) or PhaseTimings()
+        kwargs = self._decoding_kwargs(kwargs)
+        key = make_key(prompt, conversation_history, kwargs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            timings.cached = True
+            get_registry().record(timings)
+            yield cached
+            return
+
+        self.cache.record_miss()
+        start = time.monotonic()
+        chunks = []
+        for text in self.connector.generate_stream(prompt, conversation_history, timings=timings, **kwargs):
+            chunks.append(text)
+            yield text
+        if not timings.truncated:
+            self.cache.put(key, ''.join(chunks).strip(), time.monotonic() - start)
+
+    def release_conversation(self, conversation_id):
+        self.connector.release_conversation(conversation_id)
+
+    def warm_prefix(self, prefix_key, system_message):
+        self.connector.warm_prefix(prefix_key, system_message)
+
+    def get_stats(self):
+        stats = self.connector.get_stats()
+        stats['response_cache'] = self.cache.get_stats()
+        return stats
+
+    def _decoding_kwargs(self, kwargs):
+        """Switch to greedy decoding so a cached answer is the answer the model would give"""
+        if self.deterministic:
+            return dict(kwargs, do_sample=False)
+        return kwargs
+
+
+def normalize_prompt(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    prompt = ' '.join(prompt.lower().split())
+    return re.sub(r'[\s.,!?;:]+$', '', prompt)
+
+
+def make_key(prompt, conversation_history, kwargs):
+    """
+    Build a cache key from everything that influences the response
+
+    Args:
+        prompt: User's message
+        conversation_history: List of previous messages
+        kwargs: Generation parameters passed to the connector
+
+    Returns:
+        str: Hex digest
+    """
+    recent_history = (conversation_history or [])[-Config.MAX_CONVERSATION_HISTORY:]
+    payload = {
+        'model': Config.AI_MODEL_NAME,
+        'prompt': normalize_prompt(prompt),
+        'history': [(msg.get('role'), msg.get('content')) for msg in recent_history],
+        'system_message': kwargs.get('system_message'),
+        'temperature': kwargs.get('temperature', Config.TEMPERATURE),
+        'top_p': kwargs.get('top_p', Config.TOP_P),
+        'max_tokens': kwargs.get('max_tokens', Config.MAX_LENGTH),
+        'do_sample': kwargs.get('do_sample', True),
+        # Budgets cap reply length, so replies made under different budgets are kept apart
+        'latency_budget': _budget_class(kwargs.get('latency_budget'))
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _budget_class(budget):
+    """Latency budget rounded up to whole seconds, so per-request jitter shares a key"""
+    return math.ceil(budget) if budget is not None else None
@@ -0,0 +1,196 @@
+"""
+Router Registry
+Maps tenants to organization configs so one deployment can serve many
+clients. A tenant is found by API tenant id or by the Twilio number that was
+dialed; its UniversalRouter is built on first use and kept in an LRU bounded
+by estimated memory, shared by every blueprint in the worker.
+"""
+
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+from config import Config
+from app.ai.organization_configs import get_organization_config
+from app.ai.universal_router import UniversalRouter
+
+# Tenant used when a request names none, or calls a number no tenant owns
+DEFAULT_TENANT = 'default'
+
+
+class UnknownTenant(Exception):
+    """Raised when a request names a tenant id that is not configured"""
+
+
+def normalize_phone_number(number):
+    """Strip the formatting Twilio and callers add, keeping a leading '+'"""
+    if not number:
+        return ''
+    digits = ''.join(char for char in number if char.isdigit())
+    return ('+' + digits) if number.strip().startswith('+') else digits
+
+
+def load_tenants(path=None):
+    """
+    Load tenant definitions
+
+    The file maps tenant ids to an organization template, an optional
+    display name, an optional full config overriding the template, and the
+    phone numbers that reach the tenant:
+
+        {"acme": {"organization_type": "software", "organization_name": "Acme",
+                  "phone_numbers": ["+15551234567"]}}
+
+    Args:
+        path: JSON file (default TENANTS_FILE)
+
+    Returns:
+        dict: tenant id -> definition, always including DEFAULT_TENANT
+    """
+    path = path if path is not None else Config.TENANTS_FILE
+    tenants = {}
+    if path:
+        try:
+            with open(path, 'r') as f:
+                tenants = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not load tenants from {path}: {e}")
+
+    # The deployment-wide organization settings remain the fallback tenant
+    tenants.setdefault(DEFAULT_TENANT, {
+        'organization_type': Config.ORGANIZATION_TYPE,
+        'organization_name': Config.ORGANIZATION_NAME
+    })
+    return tenants
+
+
+def build_organization_config(tenant):
+    """Organization config of one tenant definition"""
+    if tenant.get('config'):
+        organization_config = copy.deepcopy(tenant['config'])
+    else:
+        # Copied so a tenant's name never leaks into the shared template
+        organization_config = copy.deepcopy(get_organization_config(tenant.get('organization_type', 'software')))
+    if tenant.get('organization_name'):
+        organization_config['organization_name'] = tenant['organization_name']
+    return organization_config
+
+
+def _router_bytes(router):
+    """Rough memory held by a router's compiled indices"""
+    size = router.automaton.memory_bytes()
+    if router.semantic is not None:
+        size += router.semantic.matrix.nbytes
+    return size
+
+
+class RouterRegistry:
+    """Lazily built, LRU-cached UniversalRouter per tenant"""
+
+    def __init__(self, tenants=None, max_bytes=None):
+        """
+        Initialize registry
+
+        Args:
+            tenants: Tenant definitions (default: loaded from TENANTS_FILE)
+            max_bytes: Memory budget for cached routers (default ROUTER_CACHE_MAX_MB)
+        """
+        self.tenants = tenants if tenants is not None else load_tenants()
+        self.tenants.setdefault(DEFAULT_TENANT, load_tenants('')[DEFAULT_TENANT])
+        self.max_bytes = max_bytes if max_bytes is not None else Config.ROUTER_CACHE_MAX_MB * 1024 * 1024
+
+        self._by_number = {}
+        for tenant_id, tenant in self.tenants.items():
+            for number in tenant.get('phone_numbers', []):
+                self._by_number[normalize_phone_number(number)] = tenant_id
+
+        self._routers = OrderedDict()  # tenant id -> (router, estimated bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def tenant_for_number(self, phone_number):
+        """Tenant that owns a dialed number (DEFAULT_TENANT if none does)"""
+        return self._by_number.get(normalize_phone_number(phone_number), DEFAULT_TENANT)
+
+    def get(self, tenant_id=None):
+        """
+        Get a tenant's router, building it on first use
+
+        Args:
+            tenant_id: Tenant id (None for DEFAULT_TENANT)
+
+        Returns:
+            UniversalRouter
+
+        Raises:
+            UnknownTenant: If the tenant id is not configured
+        """
+        tenant_id = tenant_id or DEFAULT_TENANT
+        if tenant_id not in self.tenants:
+            raise UnknownTenant(f"Unknown tenant: {tenant_id}")
+
+        with self._lock:
+            entry = self._routers.get(tenant_id)
+            if entry is not None:
+                self._routers.move_to_end(tenant_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Built outside the lock so one slow build does not stall other tenants
+        router = UniversalRouter(build_organization_config(self.tenants[tenant_id]))
+        size = _router_bytes(router)
+
+        with self._lock:
+            entry = self._routers.get(tenant_id)
+            if entry is not None:
+                # Another request built it first
+                return entry[0]
+
+            self._routers[tenant_id] = (router, size)
+            self._bytes += size
+            # Always keep the newest router, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._routers) > 1:
+                _, (_, evicted_size) = self._routers.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+        return router
+
+    def for_number(self, phone_number):
+        """Router of the tenant that owns a dialed number"""
+        return self.get(self.tenant_for_number(phone_number))
+
+    def get_stats(self):
+        """Return tenant count, cached routers and hit statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'tenants': len(self.tenants),
+                'phone_numbers': len(self._by_number),
+                'cached_routers': len(self._routers),
+                'estimated_mb': round(self._bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Global instance
+_router_registry = None
+_router_registry_lock = threading.Lock()
+
+
+def get_router_registry():
+    """Get or create the registry shared by all blueprints"""
+    global _router_registry
+    with _router_registry_lock:
+        if _router_registry is None:
+            _router_registry = RouterRegistry()
+    return _router_registry
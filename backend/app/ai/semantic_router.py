@@ -0,0 +1,290 @@
+"""
+Semantic Router
+Scores an utterance against every agent of an organization with one matrix
+multiply. Agents are embedded from their keywords, title, department and
+name; utterances and agents share a hashed bag of words, word pairs and
+character n-grams, so "enrollment" lands near "enroll" and "my chest hurts"
+near "chest pain" without a language model.
+"""
+
+import os
+import re
+import zlib
+
+import numpy as np
+
+from config import Config
+
+# Bump when features or weighting change, so cached matrices are rebuilt
+FORMAT_VERSION = 1
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Function words carry no routing signal and would only add hash collisions
+STOPWORDS = frozenset([
+    'a', 'about', 'am', 'an', 'and', 'are', 'at', 'be', 'can', 'could', 'do', 'for', 'from', 'get',
+    'have', 'hi', 'hello', 'i', "i'd", "i'm", 'in', 'is', 'it', "it's", 'like', 'me', 'my', 'need',
+    'of', 'on', 'or', 'please', 'so', 'some', 'that', 'the', 'this', 'to', 'want', 'was', 'what',
+    'with', 'would', 'you', 'your'
+])
+
+# Messages embedded at a time when scoring a batch
+SCORE_BLOCK = 1024
+
+# Relative weight of each agent field in its embedding
+FIELD_WEIGHTS = {
+    'keyword': 1.0,
+    'title': 0.6,
+    'department': 0.6,
+    'name': 0.3
+}
+
+
+class HashedEmbedder:
+    """Fixed-size embedding from hashed word, word-pair and character n-gram features"""
+
+    def __init__(self, dim=None, ngram=4):
+        """
+        Initialize embedder
+
+        Args:
+            dim: Embedding size (number of hash buckets)
+            ngram: Character n-gram length
+        """
+        self.dim = dim or Config.SEMANTIC_ROUTER_DIM
+        self.ngram = ngram
+        self._word_cache = {}  # word -> hashed features of the word and its n-grams
+
+    def words(self, text):
+        """Content words of a text"""
+        return [word for word in _WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+    def _word_features(self, word):
+        """Weighted features of one word: the word itself and its character n-grams"""
+        features = [('w:' + word, 1.0)]
+        # Character n-grams give partial credit for other forms of a word
+        padded = f"<{word}>"
+        grams = [padded[i:i + self.ngram] for i in range(max(1, len(padded) - self.ngram + 1))]
+        features.extend(('c:' + gram, 1.0 / len(grams)) for gram in grams)
+        return features
+
+    def _hash(self, feature, weight):
+        """Bucket and signed weight of one feature"""
+        digest = zlib.crc32(feature.encode('utf-8'))
+        # The top bit picks a sign so unrelated collisions tend to cancel
+        return digest % self.dim, (weight if digest & 0x80000000 else -weight)
+
+    def _hashed_word(self, word):
+        hashed = self._word_cache.get(word)
+        if hashed is None:
+            if len(self._word_cache) >= 65536:
+                self._word_cache.clear()
+            hashed = self._word_cache[word] = [self._hash(feature, weight) for feature, weight in self._word_features(word)]
+        return hashed
+
+    def embed(self, texts):
+        """
+        Embed texts into L2-normalized rows
+
+        Args:
+            texts: List of strings
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dim)
+        """
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            # Word pairs add word order; they are rare enough not to cache
+            words = self.words(text)
+            hashed = [pair for word in words for pair in self._hashed_word(word)]
+            hashed.extend(self._hash('b:' + first + ' ' + second, 1.0) for first, second in zip(words, words[1:]))
+            rows.extend([row] * len(hashed))
+            for column, value in hashed:
+                columns.append(column)
+                values.append(value)
+
+        # Scatter-add every (row, bucket, value) triple in one call
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), np.array(values, dtype=np.float32))
+        return _normalize(vectors)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _softmax(scores):
+    shifted = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def agent_documents(organization_config):
+    """
+    Texts describing each agent, with their field weights
+
+    Routing keywords from the config's keyword table count toward every
+    agent they point to.
+
+    Returns:
+        dict: agent key -> list of (text, weight)
+    """
+    agents = organization_config.get('agents', {})
+    documents = {agent_key: [] for agent_key in agents}
+
+    for agent_key, agent in agents.items():
+        for keyword in agent.get('keywords', []):
+            documents[agent_key].append((keyword, FIELD_WEIGHTS['keyword']))
+        for field in ('title', 'department', 'name'):
+            if agent.get(field):
+                documents[agent_key].append((agent[field], FIELD_WEIGHTS[field]))
+
+    for keyword, agent_keys in organization_config.get('keywords', {}).items():
+        for agent_key in agent_keys:
+            if agent_key in documents:
+                documents[agent_key].append((keyword, FIELD_WEIGHTS['keyword']))
+
+    return documents
+
+
+class SemanticRouter:
+    """Ranks an organization's agents for utterances with a precomputed agent embedding matrix"""
+
+    def __init__(self, organization_config, config_hash, embedder=None, cache_dir=None):
+        """
+        Initialize router, loading the agent matrix from disk when cached
+
+        Args:
+            organization_config: Organization settings with 'agents' and 'keywords'
+            config_hash: Fingerprint of the config, naming the cache file
+            embedder: HashedEmbedder to use
+            cache_dir: Where matrices are cached (None for SEMANTIC_ROUTER_CACHE_DIR)
+        """
+        self.embedder = embedder or HashedEmbedder()
+        self.cache_dir = cache_dir if cache_dir is not None else Config.SEMANTIC_ROUTER_CACHE_DIR
+        self.cache_path = os.path.join(
+            self.cache_dir, f"{config_hash}-d{self.embedder.dim}-v{FORMAT_VERSION}.npz"
+        ) if self.cache_dir else None
+
+        if not self._load():
+            self._build(organization_config)
+            self._save()
+
+    def _build(self, organization_config):
+        """Embed every agent and fit the confidence temperature"""
+        documents = agent_documents(organization_config)
+        self.agent_keys = [agent_key for agent_key, texts in documents.items() if texts]
+
+        texts = [text for agent_key in self.agent_keys for text, _ in documents[agent_key]]
+        weights = np.array(
+            [weight for agent_key in self.agent_keys for _, weight in documents[agent_key]],
+            dtype=np.float32
+        )
+        labels = np.array(
+            [index for index, agent_key in enumerate(self.agent_keys) for _ in documents[agent_key]]
+        )
+        vectors = self.embedder.embed(texts) * weights[:, None] if texts else np.zeros((0, self.embedder.dim), np.float32)
+
+        sums = np.zeros((len(self.agent_keys), self.embedder.dim), dtype=np.float32)
+        np.add.at(sums, labels, vectors)
+        self.matrix = _normalize(sums)
+        self.temperature = self._fit_temperature(texts, vectors, labels, sums)
+
+    def _fit_temperature(self, texts, vectors, labels, sums):
+        """
+        Pick the softmax temperature that best predicts held-out descriptions
+
+        Each agent text is scored against the agent matrix with its own
+        contribution removed from its agent's row, so confidences reflect
+        how well unseen phrasings are routed rather than memorized ones.
+        """
+        if len(self.agent_keys) < 2 or not texts:
+            return 0.1
+
+        queries = self.embedder.embed(texts)
+        scores = queries @ self.matrix.T
+        own = _normalize(sums[labels] - vectors)
+        scores[np.arange(len(texts)), labels] = np.sum(queries * own, axis=1)
+
+        best_temperature, best_loss = 0.1, None
+        for temperature in np.geomspace(0.01, 1.0, 41):
+            probabilities = _softmax(scores / temperature)
+            loss = -np.mean(np.log(probabilities[np.arange(len(texts)), labels] + 1e-12))
+            if best_loss is None or loss < best_loss:
+                best_temperature, best_loss = float(temperature), loss
+        return best_temperature
+
+    def _load(self):
+        """Load a cached matrix; returns whether it was found"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cached:
+                self.matrix = cached['matrix']
+                self.agent_keys = [str(agent_key) for agent_key in cached['agent_keys']]
+                self.temperature = float(cached['temperature'])
+            return True
+        except Exception as e:
+            print(f"[WARNING] Could not load semantic router cache {self.cache_path}: {e}")
+            return False
+
+    def _save(self):
+        """Write the matrix to the cache, renaming into place so readers never see half a file"""
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            staging = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(staging, 'wb') as f:
+                np.savez(
+                    f,
+                    matrix=self.matrix,
+                    agent_keys=np.array(self.agent_keys, dtype=str),
+                    temperature=np.float64(self.temperature)
+                )
+            os.replace(staging, self.cache_path)
+        except OSError as e:
+            print(f"[WARNING] Could not write semantic router cache {self.cache_path}: {e}")
+
+    def score(self, messages):
+        """
+        Confidence of every agent for every message
+
+        Args:
+            messages: List of user messages
+
+        Returns:
+            np.ndarray: (len(messages), agents) probabilities, rows summing to 1
+        """
+        if not self.agent_keys:
+            return np.zeros((len(messages), 0), dtype=np.float32)
+
+        # Embed in blocks so a large batch never holds every embedding at once
+        scores = np.empty((len(messages), len(self.agent_keys)), dtype=np.float32)
+        for start in range(0, len(messages), SCORE_BLOCK):
+            block = messages[start:start + SCORE_BLOCK]
+            scores[start:start + len(block)] = self.embedder.embed(block) @ self.matrix.T
+        return _softmax(scores / self.temperature)
+
+    def rank(self, messages, top_k=None):
+        """
+        Ranked agents for each message
+
+        Args:
+            messages: List of user messages
+            top_k: Agents to return per message (all by default)
+
+        Returns:
+            list: Per message, a list of {'agent_key', 'confidence'} best first
+        """
+        probabilities = self.score(messages)
+        order = np.argsort(-probabilities, axis=1)[:, :top_k]
+        return [
+            [
+                {'agent_key': self.agent_keys[index], 'confidence': round(float(row[index]), 3)}
+                for index in indices
+            ]
+            for row, indices in zip(probabilities, order)
+        ]
@@ -0,0 +1,75 @@
+"""
+Token Cache
+Caches the token ids of individual conversation messages so a context is
+assembled from cached segments and only the new prompt is tokenized
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import Config
+from app.ai.metrics import track
+
+
+class TokenCache:
+    """LRU of tokenized message segments keyed by role and content hash"""
+
+    def __init__(self, tokenizer, max_entries=None):
+        """
+        Initialize cache
+
+        Args:
+            tokenizer: Tokenizer used to encode segments
+            max_entries: Maximum number of cached segments
+        """
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries if max_entries is not None else Config.TOKEN_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, role, text):
+        """
+        Get the token ids of one rendered message segment
+
+        Args:
+            role: Message role (system, user, assistant)
+            text: Rendered segment text, ending with the EOS token
+
+        Returns:
+            tuple: Token ids without special tokens added
+        """
+        key = (role, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+
+        with self._lock:
+            token_ids = self._entries.get(key)
+            if token_ids is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return token_ids
+            self.misses += 1
+
+        with track('tokenize'):
+            token_ids = tuple(self.tokenizer.encode(text, add_special_tokens=False))
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = token_ids
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return token_ids
+
+    def get_stats(self):
+        """Return cache size and hit statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -4,19 +4,143 @@ Routes callers to appropriate departments/agents based on configurable organizat
 """
 
 import re
+import hashlib
 import json
+import math
 import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+
+from config import Config
+from app.ai.keyword_automaton import KeywordAutomaton
+
+# Well-known organization abbreviations, checked in this order
+KNOWN_UNIVERSITIES = MappingProxyType({
+    'mit': 'MIT',
+    'ucla': 'UCLA',
+    'nyu': 'NYU',
+    'usc': 'USC',
+    'ucsd': 'UCSD',
+    'ucb': 'UC Berkeley',
+    'stanford': 'Stanford',
+    'harvard': 'Harvard',
+    'yale': 'Yale',
+    'princeton': 'Princeton',
+    'columbia': 'Columbia',
+    'cornell': 'Cornell',
+    'duke': 'Duke',
+    'upenn': 'UPenn',
+})
+
+# Organization type indicators, checked in this order (matched as whole words)
+ORG_INDICATORS = MappingProxyType({
+    'university': ('university', 'college', 'institute of technology', 'polytechnic'),
+    'hospital': ('hospital', 'medical center', 'clinic', 'health center', 'healthcare'),
+    'school': ('school', 'academy', 'high school', 'elementary'),
+    'company': ('company', 'corporation', 'inc', 'ltd', 'llc'),
+    'restaurant': ('restaurant', 'cafe', 'bistro', 'diner'),
+    'hotel': ('hotel', 'resort', 'inn', 'motel'),
+    'bank': ('bank', 'credit union', 'financial'),
+    'store': ('store', 'shop', 'mart', 'market'),
+    'government': ('city hall', 'town hall', 'department of', 'dmv', 'government'),
+    'law': ('law firm', 'attorney', 'legal'),
+})
+
+# Department keywords for custom organizations, checked in this order
+DEPARTMENT_KEYWORDS = MappingProxyType({
+    'admissions': ('admission', 'enroll', 'apply', 'application'),
+    'billing': ('billing', 'payment', 'invoice', 'cost', 'fee', 'tuition'),
+    'support': ('support', 'help', 'issue', 'problem', 'technical'),
+    'emergency': ('emergency', 'urgent', 'critical', 'immediate'),
+    'information': ('information', 'info', 'question', 'inquiry'),
+    'appointment': ('appointment', 'schedule', 'book', 'reservation'),
+    'reception': ('reception', 'front desk', 'general'),
+})
+
+# Words that are never an organization name on their own
+NAME_STOPWORDS = frozenset(['the', 'a', 'an', 'to', 'for', 'i', 'want', 'need', 'my'])
+NAME_STOPWORDS_WITH_VERBS = NAME_STOPWORDS | {'call', 'calling', 'contact', 'reach'}
+
+# One alternation for all known organizations; the longest name wins at a position
+KNOWN_UNIVERSITY_PATTERN = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, KNOWN_UNIVERSITIES), key=len, reverse=True)) + r')\b'
+)
+
+# Position of each entry in its table, for picking the first listed of several hits
+_UNIVERSITY_RANK = MappingProxyType({abbrev: rank for rank, abbrev in enumerate(KNOWN_UNIVERSITIES)})
+_ORG_RANK = MappingProxyType({org_type: rank for rank, org_type in enumerate(ORG_INDICATORS)})
+_DEPARTMENT_RANK = MappingProxyType({dept: rank for rank, dept in enumerate(DEPARTMENT_KEYWORDS)})
+
+
+def _name_patterns(indicator):
+    """Patterns that capture the organization name in front of an indicator"""
+    return (
+        # "call [Name] [Indicator]" or "calling [Name] [Indicator]"
+        re.compile(r'(?:call|calling|contact|reach)\s+([a-zA-Z\s&]+?)\s+' + re.escape(indicator), re.IGNORECASE),
+        # "[Name] [Indicator]" - catches things like "MIT for billing"
+        re.compile(r'\b([a-zA-Z\s&\.]+?)\s+(?:for\s+)?' + re.escape(indicator), re.IGNORECASE)
+    )
+
+
+# Name-extraction patterns per organization type, in indicator order
+NAME_PATTERNS = MappingProxyType({
+    org_type: tuple(_name_patterns(indicator) for indicator in indicators)
+    for org_type, indicators in ORG_INDICATORS.items()
+})
+
+
+# Process pool for large routing batches, shared by every router in this process
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+# Routers built inside pool workers, keyed by config fingerprint and routing mode
+_worker_routers = OrderedDict()
+_WORKER_ROUTERS_MAX = 32
+
+
+def config_fingerprint(organization_config):
+    """Stable hash of an organization config's content"""
+    encoded = json.dumps(organization_config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _get_batch_pool(workers):
+    """Get or start the routing process pool"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # Spawned, not forked: the parent may hold model threads and locks
+            _batch_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _batch_pool
+
+
+def _route_chunk(config_hash, routing_mode, organization_config, messages):
+    """Route a chunk of messages inside a pool worker"""
+    key = (config_hash, routing_mode)
+    router = _worker_routers.get(key)
+    if router is None:
+        router = _worker_routers[key] = UniversalRouter(organization_config, routing_mode)
+        # Many tenants may batch through the same pool; keep the recent ones
+        while len(_worker_routers) > _WORKER_ROUTERS_MAX:
+            _worker_routers.popitem(last=False)
+    else:
+        _worker_routers.move_to_end(key)
+    return router.analyze_batch(messages, workers=0)
 
 
 class UniversalRouter:
     """Routes calls to appropriate agents/departments based on organization configuration"""
 
-    def __init__(self, organization_config=None):
+    def __init__(self, organization_config=None, routing_mode=None):
         """
         Initialize router with organization configuration
 
         Args:
             organization_config: Dict with organization settings, or None to load from config
+            routing_mode: 'keyword' or 'semantic' (default ROUTING_MODE)
         """
         if organization_config:
             self.config = organization_config
@@ -27,6 +151,44 @@ class UniversalRouter:
         self.keywords = self.config.get('keywords', {})
         self.organization_name = self.config.get('organization_name', 'Organization')
         self.organization_type = self.config.get('organization_type', 'general')
+        self.config_hash = config_fingerprint(self.config)
+
+        # Every keyword set compiled once, so a message is scanned a single time
+        self.automaton = self._build_automaton()
+        self._keyword_rank = {keyword: rank for rank, keyword in enumerate(self.keywords)}
+
+        # Semantic mode ranks agents by similarity to their descriptions
+        self.routing_mode = routing_mode or Config.ROUTING_MODE
+        self.semantic = None
+        if self.routing_mode == 'semantic':
+            from app.ai.semantic_router import SemanticRouter
+            self.semantic = SemanticRouter(self.config, self.config_hash)
+
+    def _build_automaton(self):
+        """Compile routing keywords, organization indicators and department keywords into one automaton"""
+        automaton = KeywordAutomaton()
+        for keyword in self.keywords:
+            automaton.add(keyword, 'keyword', keyword)
+        for org_type, indicators in ORG_INDICATORS.items():
+            for indicator in indicators:
+                automaton.add(indicator, 'organization', org_type, whole_word=True)
+        for dept, keywords in DEPARTMENT_KEYWORDS.items():
+            for keyword in keywords:
+                automaton.add(keyword, 'department', dept)
+        return automaton.compile()
+
+    def _scan(self, message_lower):
+        """
+        Find all keyword hits in one pass
+
+        Returns:
+            dict: Category -> matched values in first-seen order
+        """
+        hits = {'keyword': [], 'organization': [], 'department': []}
+        for _, _, _, category, value in self.automaton.search(message_lower):
+            if value not in hits[category]:
+                hits[category].append(value)
+        return hits
 
     def _load_default_config(self):
         """Load default organization configuration"""
@@ -65,17 +227,33 @@ class UniversalRouter:
 
         Returns:
             dict: Analysis results with detected keywords and agent recommendation
+                (plus ranked_agents in semantic mode)
+        """
+        ranking = self.semantic.rank([message])[0] if self.semantic else None
+        return self._route(message, ranking)
+
+    def _route(self, message, ranking=None):
+        """
+        Route one message
+
+        Args:
+            message: User's description of their issue/request
+            ranking: Semantic ranking of all agents for the message, if enabled
+
+        Returns:
+            dict: Analysis results
         """
         message_lower = message.lower()
         detected_keywords = []
         potential_agents = set()
+        hits = self._scan(message_lower)
 
         # First, check if user is mentioning a custom organization
-        custom_org = self._detect_custom_organization(message_lower)
+        custom_org = self._detect_custom_organization(message_lower, hits)
 
         if custom_org:
             # User is calling a custom organization, create dynamic agent
-            agent = self._create_dynamic_agent(custom_org, message_lower)
+            agent = self._create_dynamic_agent(custom_org, message_lower, hits)
             return {
                 'detected_keywords': ['custom organization'],
                 'agent_key': 'custom',
@@ -86,11 +264,13 @@ class UniversalRouter:
                 'organization': custom_org
             }
 
-        # Check for keyword matches in predefined agents
-        for keyword, agent_keys in self.keywords.items():
-            if keyword in message_lower:
-                detected_keywords.append(keyword)
-                potential_agents.update(agent_keys)
+        # Keyword matches in predefined agents, in configuration order
+        for keyword in sorted(hits['keyword'], key=self._keyword_rank.get):
+            detected_keywords.append(keyword)
+            potential_agents.update(self.keywords[keyword])
+
+        if ranking is not None:
+            return self._semantic_result(detected_keywords, potential_agents, ranking)
 
         # If no specific keywords, route to general
         if not potential_agents:
@@ -124,6 +304,81 @@ class UniversalRouter:
             'is_custom': False
         }
 
+    def _semantic_result(self, detected_keywords, potential_agents, ranking):
+        """
+        Pick the agent using semantic confidences
+
+        Keyword matches still decide which agents are candidates, and
+        emergency always wins, but ties between matched agents go to the
+        most similar one. Without keyword matches the most similar agent
+        is used if it is confident enough, else the default agent.
+        """
+        confidences = {entry['agent_key']: entry['confidence'] for entry in ranking}
+
+        if 'emergency' in potential_agents:
+            agent_key = 'emergency'
+        elif potential_agents:
+            agent_key = max(potential_agents, key=lambda key: confidences.get(key, 0.0))
+        elif ranking and ranking[0]['confidence'] >= Config.SEMANTIC_MIN_CONFIDENCE:
+            agent_key = ranking[0]['agent_key']
+        else:
+            agent_key = self._default_agent_key()
+            detected_keywords = ['general inquiry']
+
+        agent = self.agents.get(agent_key, self.agents.get('general'))
+
+        return {
+            'detected_keywords': detected_keywords,
+            'agent_key': agent_key,
+            'agent': agent,
+            'confidence': confidences.get(agent_key, 0.0),
+            'routing_reason': self._get_routing_reason(detected_keywords, agent),
+            'is_custom': False,
+            'ranked_agents': ranking[:Config.SEMANTIC_TOP_K]
+        }
+
+    def _default_agent_key(self):
+        """Agent marked as default or 'general', else the first agent"""
+        for agent_key, agent_info in self.agents.items():
+            if agent_info.get('is_default', False) or agent_key == 'general':
+                return agent_key
+        return next(iter(self.agents), 'general')
+
+    def analyze_batch(self, messages, workers=None):
+        """
+        Route many messages, e.g. for re-routing audits and IVR replays
+
+        Repeated messages are routed once. Batches of at least
+        ROUTING_BATCH_PARALLEL_MIN distinct messages are split across a
+        process pool when workers are configured.
+
+        Args:
+            messages: List of user messages
+            workers: Pool processes to use (default ROUTING_BATCH_WORKERS; 0 routes inline)
+
+        Returns:
+            list: analyze_request results, in the order of messages
+        """
+        workers = Config.ROUTING_BATCH_WORKERS if workers is None else workers
+        distinct = list(dict.fromkeys(messages))
+
+        if workers > 0 and len(distinct) >= Config.ROUTING_BATCH_PARALLEL_MIN:
+            # A few chunks per worker keeps the pool busy without much pickling
+            size = math.ceil(len(distinct) / (workers * 4))
+            chunks = [distinct[i:i + size] for i in range(0, len(distinct), size)]
+            pool = _get_batch_pool(workers)
+            futures = [pool.submit(_route_chunk, self.config_hash, self.routing_mode, self.config, chunk) for chunk in chunks]
+            results = [result for future in futures for result in future.result()]
+        elif self.semantic:
+            # One matrix multiply scores the whole batch
+            rankings = self.semantic.rank(distinct)
+            results = [self._route(message, ranking) for message, ranking in zip(distinct, rankings)]
+        else:
+            results = [self.analyze_request(message) for message in distinct]
+
+        routed = dict(zip(distinct, results))
+        return [routed[message] for message in messages]
+
     def _calculate_confidence(self, keywords):
         """Calculate confidence score for routing decision"""
         if not keywords:
@@ -167,69 +422,36 @@ class UniversalRouter:
             'agent_count': len(self.agents)
         }
 
-    def _detect_custom_organization(self, message_lower):
+    def _detect_custom_organization(self, message_lower, hits=None):
         """
         Detect if user is mentioning a custom organization (university, hospital, company, etc.)
 
+        Args:
+            message_lower: Message in lowercase
+            hits: Keyword hits from _scan (scanned here if not given)
+
         Returns:
             dict or None: Organization info if detected, None otherwise
         """
-        # Well-known organization abbreviations
-        known_universities = {
-            'mit': 'MIT',
-            'ucla': 'UCLA',
-            'nyu': 'NYU',
-            'usc': 'USC',
-            'ucsd': 'UCSD',
-            'ucb': 'UC Berkeley',
-            'stanford': 'Stanford',
-            'harvard': 'Harvard',
-            'yale': 'Yale',
-            'princeton': 'Princeton',
-            'columbia': 'Columbia',
-            'cornell': 'Cornell',
-            'duke': 'Duke',
-            'upenn': 'UPenn',
-        }
-
         # Check for known universities first
-        for abbrev, full_name in known_universities.items():
-            if re.search(r'\b' + abbrev + r'\b', message_lower):
-                return {
-                    'name': full_name,
-                    'type': 'university',
-                    'is_custom': True
-                }
+        mentioned = KNOWN_UNIVERSITY_PATTERN.findall(message_lower)
+        if mentioned:
+            return {
+                'name': KNOWN_UNIVERSITIES[min(mentioned, key=_UNIVERSITY_RANK.get)],
+                'type': 'university',
+                'is_custom': True
+            }
 
-        # Organization type indicators
-        org_indicators = {
-            'university': ['university', 'college', 'institute of technology', 'polytechnic'],
-            'hospital': ['hospital', 'medical center', 'clinic', 'health center', 'healthcare'],
-            'school': ['school', 'academy', 'high school', 'elementary'],
-            'company': ['company', 'corporation', 'inc', 'ltd', 'llc'],
-            'restaurant': ['restaurant', 'cafe', 'bistro', 'diner'],
-            'hotel': ['hotel', 'resort', 'inn', 'motel'],
-            'bank': ['bank', 'credit union', 'financial'],
-            'store': ['store', 'shop', 'mart', 'market'],
-            'government': ['city hall', 'town hall', 'department of', 'dmv', 'government'],
-            'law': ['law firm', 'attorney', 'legal'],
-        }
+        if hits is None:
+            hits = self._scan(message_lower)
 
         # Look for organization type
-        detected_type = None
-        for org_type, indicators in org_indicators.items():
-            for indicator in indicators:
-                if indicator in message_lower:
-                    detected_type = org_type
-                    break
-            if detected_type:
-                break
-
-        if not detected_type:
+        if not hits['organization']:
             return None
+        detected_type = min(hits['organization'], key=_ORG_RANK.get)
 
         # Try to extract organization name
-        org_name = self._extract_organization_name(message_lower, detected_type, org_indicators[detected_type])
+        org_name = self._extract_organization_name(message_lower, detected_type)
 
         if org_name:
             return {
@@ -240,44 +462,33 @@ class UniversalRouter:
 
         return None
 
-    def _extract_organization_name(self, message_lower, org_type, indicators):
+    def _extract_organization_name(self, message_lower, org_type):
         """Extract organization name from message"""
-        # Common organization name patterns
-        import re
-
         # Try to find the organization name before the type indicator
-        for indicator in indicators:
-            # Pattern: "call [Name] [Indicator]" or "calling [Name] [Indicator]"
-            # Now works with lowercase input by using word boundaries
-            pattern = r'(?:call|calling|contact|reach)\s+([a-zA-Z\s&]+?)\s+' + re.escape(indicator)
-            match = re.search(pattern, message_lower, re.IGNORECASE)
+        for call_pattern, name_pattern in NAME_PATTERNS[org_type]:
+            match = call_pattern.search(message_lower)
             if match:
                 name = match.group(1).strip()
-                # Filter out common words
-                common_words = ['the', 'a', 'an', 'to', 'for', 'i', 'want', 'need', 'my']
-                if name.lower() not in common_words and len(name) > 1:
+                if name.lower() not in NAME_STOPWORDS and len(name) > 1:
                     return name.title()
 
-            # Pattern: "[Name] [Indicator]" - catches things like "MIT for billing"
-            pattern = r'\b([a-zA-Z\s&\.]+?)\s+(?:for\s+)?' + re.escape(indicator)
-            match = re.search(pattern, message_lower, re.IGNORECASE)
+            match = name_pattern.search(message_lower)
             if match:
                 name = match.group(1).strip()
-                # Filter out common words and action verbs
-                common_words = ['the', 'a', 'an', 'to', 'for', 'i', 'want', 'need', 'my', 'call', 'calling', 'contact', 'reach']
-                if name.lower() not in common_words and len(name) > 1:
+                if name.lower() not in NAME_STOPWORDS_WITH_VERBS and len(name) > 1:
                     return name.upper() if len(name) <= 4 and name.isalpha() else name.title()
 
         # If no name found, return generic name based on type
         return f"{org_type.title()}"
 
-    def _create_dynamic_agent(self, org_info, message_lower):
+    def _create_dynamic_agent(self, org_info, message_lower, hits=None):
         """
         Create a dynamic agent for custom organization
 
         Args:
             org_info: Dict with organization info (name, type)
             message_lower: Original message in lowercase
+            hits: Keyword hits from _scan (scanned here if not given)
 
         Returns:
             dict: Agent configuration
@@ -286,7 +497,7 @@ class UniversalRouter:
         org_type = org_info['type']
 
         # Detect department/inquiry type from message
-        department = self._detect_department(message_lower, org_type)
+        department = self._detect_department(message_lower, org_type, hits)
 
         agent = {
             'name': f"{org_name} {department['title']}",
@@ -300,25 +511,17 @@ class UniversalRouter:
 
         return agent
 
-    def _detect_department(self, message_lower, org_type):
+    def _detect_department(self, message_lower, org_type, hits=None):
         """Detect which department user wants to reach"""
-        # Department keywords
-        dept_keywords = {
-            'admissions': ['admission', 'enroll', 'apply', 'application'],
-            'billing': ['billing', 'payment', 'invoice', 'cost', 'fee', 'tuition'],
-            'support': ['support', 'help', 'issue', 'problem', 'technical'],
-            'emergency': ['emergency', 'urgent', 'critical', 'immediate'],
-            'information': ['information', 'info', 'question', 'inquiry'],
-            'appointment': ['appointment', 'schedule', 'book', 'reservation'],
-            'reception': ['reception', 'front desk', 'general'],
-        }
+        if hits is None:
+            hits = self._scan(message_lower)
 
-        for dept, keywords in dept_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return {
-                    'name': f"{dept.title()} Department",
-                    'title': f"{dept.title()} Specialist"
-                }
+        if hits['department']:
+            dept = min(hits['department'], key=_DEPARTMENT_RANK.get)
+            return {
+                'name': f"{dept.title()} Department",
+                'title': f"{dept.title()} Specialist"
+            }
 
         # Default to reception for the organization type
         return {
@@ -3,12 +3,15 @@ Chat API Routes
 Handles conversation and message processing
 """
 
-from flask import Blueprint, request, jsonify
+import itertools
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.ai.model_connector import get_model
+from app.ai.metrics import PhaseTimings
+from app.ai.priority_gate import Overloaded
 from app.ai.conversation_manager import ConversationManager
 from app.ai.intent_detector import IntentDetector
-from app.ai.universal_router import UniversalRouter
-from app.ai.organization_configs import get_organization_config
+from app.ai.router_registry import UnknownTenant, get_router_registry
 from config import Config
 
 chat_bp = Blueprint('chat', __name__)
@@ -17,12 +20,6 @@ chat_bp = Blueprint('chat', __name__)
 conversation_manager = ConversationManager()
 intent_detector = IntentDetector()
 
-# Initialize router with organization configuration
-org_config = get_organization_config(Config.ORGANIZATION_TYPE)
-if Config.ORGANIZATION_NAME:
-    org_config['organization_name'] = Config.ORGANIZATION_NAME
-universal_router = UniversalRouter(org_config)
-
 # Lazy load model
 _model = None
 
@@ -45,9 +42,13 @@ def chat():
         conversation_history: List of previous messages
         personality: AI personality type
         user_preferences: User preferences dict
+        conversation_id: Optional id used to reuse model state across turns
+        debug: Optional flag adding per-phase timings to the metadata
+            (honored with DEBUG or CHAT_DEBUG_METADATA)
 
     Returns:
-        JSON response with AI message
+        JSON response with AI message, or 503 with Retry-After when the
+        model is overloaded
     """
     try:
         data = request.get_json()
@@ -73,33 +74,30 @@ def chat():
 
         # Generate AI response
         model = get_ai_model()
+        timings = _debug_timings(data)
         ai_response = model.generate_response(
             context['message'],
             context['history'],
-            system_message=context['system_message']
+            system_message=context['system_message'],
+            prefix_key=context['prefix_key'],
+            conversation_id=data.get('conversation_id'),
+            latency_budget=Config.CHAT_LATENCY_BUDGET_MS / 1000,
+            timings=timings,
+            lane='chat'
         )
 
-        # Check if plugin should be invoked
-        plugin_suggestion = None
-        if intent_result['has_intent']:
-            plugin_suggestion = {
-                'intent': intent_result['primary_intent'],
-                'confidence': intent_result['intents'][0]['confidence'],
-                'entities': intent_detector.extract_entities(
-                    message,
-                    intent_result['primary_intent']
-                )
-            }
-
         response = {
             'message': ai_response,
-            'metadata': context['metadata'],
+            'metadata': _with_timings(context['metadata'], timings),
             'intent': intent_result,
-            'plugin_suggestion': plugin_suggestion
+            'plugin_suggestion': _get_plugin_suggestion(message, intent_result)
         }
 
         return jsonify(response), 200
 
+    except Overloaded as e:
+        return _busy_response(e)
+
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         return jsonify({
@@ -108,6 +106,157 @@ def chat():
         }), 500
 
 
+@chat_bp.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Process chat message and stream the AI response as Server-Sent Events
+
+    Request body:
+        Same as /chat
+
+    Returns:
+        text/event-stream with one `token` event per decoded chunk and a
+        final `done` event carrying the full message, metadata, intent
+        and plugin suggestion; 503 with Retry-After when the model is
+        overloaded
+    """
+    try:
+        data = request.get_json()
+
+        if not data or 'message' not in data:
+            return jsonify({'error': 'Message is required'}), 400
+
+        message = data.get('message')
+        conversation_history = data.get('conversation_history', [])
+        personality = data.get('personality', 'assistant')
+        user_preferences = data.get('user_preferences', {})
+
+        context = conversation_manager.process_message(
+            message,
+            conversation_history,
+            personality,
+            user_preferences
+        )
+
+        intent_result = intent_detector.detect(message)
+        model = get_ai_model()
+        timings = _debug_timings(data)
+
+        stream = model.generate_stream(
+            context['message'],
+            context['history'],
+            system_message=context['system_message'],
+            prefix_key=context['prefix_key'],
+            conversation_id=data.get('conversation_id'),
+            latency_budget=Config.CHAT_LATENCY_BUDGET_MS / 1000,
+            timings=timings,
+            lane='chat'
+        )
+        # Admission happens on the first chunk; take it now so a refusal can still be a 503
+        first = list(itertools.islice(stream, 1))
+
+    except Overloaded as e:
+        return _busy_response(e)
+
+    except Exception as e:
+        print(f"Error in chat stream endpoint: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'I apologize, but I encountered an error. Please try again.'
+        }), 500
+
+    def generate_events():
+        chunks = []
+        try:
+            for text in itertools.chain(first, stream):
+                chunks.append(text)
+                yield _sse_event('token', {'token': text})
+
+            yield _sse_event('done', {
+                'message': ''.join(chunks).strip(),
+                'metadata': _with_timings(context['metadata'], timings),
+                'intent': intent_result,
+                'plugin_suggestion': _get_plugin_suggestion(message, intent_result)
+            })
+
+        except Exception as e:
+            print(f"Error in chat stream endpoint: {e}")
+            yield _sse_event('error', {
+                'error': 'Internal server error',
+                'message': 'I apologize, but I encountered an error. Please try again.'
+            })
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _get_plugin_suggestion(message, intent_result):
+    """Build the plugin suggestion for a detected intent, if any"""
+    if not intent_result['has_intent']:
+        return None
+
+    return {
+        'intent': intent_result['primary_intent'],
+        'confidence': intent_result['intents'][0]['confidence'],
+        'entities': intent_detector.extract_entities(
+            message,
+            intent_result['primary_intent']
+        )
+    }
+
+
+def _busy_response(error):
+    """503 telling the client when to retry, for a request refused by admission control"""
+    return jsonify({
+        'error': 'Service busy',
+        'message': "I'm getting a lot of messages right now. Please try again in a moment.",
+        'retry_after': int(error.retry_after_header())
+    }), 503, {'Retry-After': error.retry_after_header()}
+
+
+def _debug_timings(data):
+    """PhaseTimings to fill for a request that asked for debug metadata, else None"""
+    if data.get('debug') and (Config.DEBUG or Config.CHAT_DEBUG_METADATA):
+        return PhaseTimings()
+    return None
+
+
+def _with_timings(metadata, timings):
+    """Add a call's phase timings to the response metadata"""
+    if timings is None:
+        return metadata
+    return dict(metadata, timings=timings.to_dict())
+
+
+def _sse_event(event, payload):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _tenant_router(data=None):
+    """
+    Router of the tenant a request names, by `tenant_id` in the body or
+    query string or the X-Tenant-ID header (the default tenant if none)
+
+    Raises:
+        UnknownTenant: If the tenant id is not configured
+    """
+    tenant_id = (
+        (data or {}).get('tenant_id')
+        or request.args.get('tenant_id')
+        or request.headers.get('X-Tenant-ID')
+    )
+    return get_router_registry().get(tenant_id)
+
+
+def _unknown_tenant_response(error):
+    """404 for a request naming a tenant that is not configured"""
+    return jsonify({'error': str(error)}), 404
+
+
 @chat_bp.route('/route-call', methods=['POST'])
 def route_call():
     """
@@ -115,6 +264,7 @@ def route_call():
 
     Request body:
         message: User's description of their issue/request
+        tenant_id: Optional tenant whose organization routes the call
 
     Returns:
         JSON response with routing information and agent details
@@ -126,6 +276,7 @@ def route_call():
             return jsonify({'error': 'Message is required'}), 400
 
         message = data.get('message')
+        universal_router = _tenant_router(data)
 
         # Analyze request and get routing recommendation
         routing_result = universal_router.analyze_request(message)
@@ -144,6 +295,9 @@ def route_call():
 
         return jsonify(response), 200
 
+    except UnknownTenant as e:
+        return _unknown_tenant_response(e)
+
     except Exception as e:
         print(f"Error in route-call endpoint: {e}")
         import traceback
@@ -154,15 +308,77 @@ def route_call():
         }), 500
 
 
+@chat_bp.route('/route-call/batch', methods=['POST'])
+def route_call_batch():
+    """
+    Route many messages in one request, for re-routing audits and IVR replays
+
+    Request body:
+        messages: List of caller messages
+        tenant_id: Optional tenant whose organization routes the messages
+
+    Returns:
+        JSON response with one routing result per message, in order
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('messages'), list):
+            return jsonify({'error': 'Messages list is required'}), 400
+
+        messages = data['messages']
+        if not all(isinstance(message, str) for message in messages):
+            return jsonify({'error': 'Every message must be a string'}), 400
+        if len(messages) > Config.ROUTING_BATCH_MAX:
+            return jsonify({'error': f'At most {Config.ROUTING_BATCH_MAX} messages per batch'}), 400
+
+        universal_router = _tenant_router(data)
+        routing_results = universal_router.analyze_batch(messages)
+
+        # Greetings depend only on the agent, so look each one up once
+        greetings = {}
+        results = []
+        for routing_result in routing_results:
+            agent = routing_result['agent']
+            greeting = greetings.get(id(agent))
+            if greeting is None:
+                greeting = greetings[id(agent)] = universal_router.get_agent_greeting(agent)
+            results.append({
+                'routing': routing_result,
+                'greeting': greeting,
+                'agent': agent
+            })
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'organization': universal_router.get_organization_info()
+        }), 200
+
+    except UnknownTenant as e:
+        return _unknown_tenant_response(e)
+
+    except Exception as e:
+        print(f"Error in route-call batch endpoint: {e}")
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'Unable to route these messages. Please try again.'
+        }), 500
+
+
 @chat_bp.route('/agents', methods=['GET'])
 def get_agents():
     """
     Get list of all available agents/departments
 
+    Query parameters:
+        tenant_id: Optional tenant (or X-Tenant-ID header)
+
     Returns:
         JSON response with list of agents
     """
     try:
+        universal_router = _tenant_router()
         agents = universal_router.list_all_agents()
         organization = universal_router.get_organization_info()
         return jsonify({
@@ -170,6 +386,9 @@ def get_agents():
             'organization': organization
         }), 200
 
+    except UnknownTenant as e:
+        return _unknown_tenant_response(e)
+
     except Exception as e:
         print(f"Error in agents endpoint: {e}")
         return jsonify({
@@ -183,13 +402,16 @@ def get_organization():
     """
     Get organization information and configuration
 
+    Query parameters:
+        tenant_id: Optional tenant (or X-Tenant-ID header)
+
     Returns:
         JSON response with organization details
     """
     try:
         from app.ai.organization_configs import list_available_configs
 
-        organization = universal_router.get_organization_info()
+        organization = _tenant_router().get_organization_info()
         available_types = list_available_configs()
 
         return jsonify({
@@ -197,6 +419,9 @@ def get_organization():
             'available_types': available_types
         }), 200
 
+    except UnknownTenant as e:
+        return _unknown_tenant_response(e)
+
     except Exception as e:
         print(f"Error in organization endpoint: {e}")
         return jsonify({
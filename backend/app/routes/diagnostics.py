@@ -0,0 +1,57 @@
+"""
+Diagnostics API Routes
+Exposes runtime statistics of the model layer
+"""
+
+from flask import Blueprint, jsonify
+from config import Config
+from app.ai.model_connector import get_model_metrics, get_model_stats
+from app.ai.cpu_topology import get_layout
+from app.ai.router_registry import get_router_registry
+from app.services.twiml_templates import get_twiml_cache
+
+diagnostics_bp = Blueprint('diagnostics', __name__)
+
+
+@diagnostics_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    """Get model load timings and hit rates of the response, token, KV, prefix and TwiML caches and the tenant router registry"""
+    try:
+        stats = get_model_stats()
+        caches = dict(stats or {})
+        load_timings = caches.pop('load_timings', None)
+        caches['twiml'] = get_twiml_cache().get_stats()
+        caches['routers'] = get_router_registry().get_stats()
+
+        return jsonify({
+            'model': Config.AI_MODEL_NAME,
+            'model_loaded': stats is not None,
+            'load_timings': load_timings,
+            'caches': caches
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@diagnostics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Get histograms of per-phase generation time and token counts"""
+    try:
+        return jsonify({
+            'model': Config.AI_MODEL_NAME,
+            'metrics': get_model_metrics()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@diagnostics_bp.route('/topology', methods=['GET'])
+def topology():
+    """Get the CPU thread layout applied to the worker serving this request"""
+    try:
+        return jsonify(get_layout()), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -3,26 +3,28 @@ Twilio Voice API Routes
 Handles voice call webhooks and TwiML generation
 """
 
+import threading
+import time
 from flask import Blueprint, request, jsonify, url_for
 from app.services.twilio_service import get_twilio_service
-from app.ai.model_connector import get_model
+from app.services.twiml_templates import ERROR_TWIML
+from app.ai.model_connector import get_model, release_conversation
+from app.ai.priority_gate import Overloaded, lane_for_agent
 from app.ai.conversation_manager import ConversationManager
-from app.ai.universal_router import UniversalRouter
-from app.ai.organization_configs import get_organization_config
+from app.ai.router_registry import get_router_registry
 from config import Config
 
 voice_bp = Blueprint('voice', __name__)
 
 # Initialize components
 conversation_manager = ConversationManager()
-org_config = get_organization_config(Config.ORGANIZATION_TYPE)
-if Config.ORGANIZATION_NAME:
-    org_config['organization_name'] = Config.ORGANIZATION_NAME
-universal_router = UniversalRouter(org_config)
 
 # Store active call conversations (in production, use Redis or database)
 active_conversations = {}
 
+# Spoken when admission control refuses a turn
+BUSY_APOLOGY = "I'm sorry, I'm helping a lot of callers right now. Could you say that again in a moment?"
+
 
 @voice_bp.route('/token', methods=['POST'])
 def get_voice_token():
@@ -73,19 +75,25 @@ def handle_incoming_call():
 
         print(f"Incoming call from {from_number} to {to_number}, SID: {call_sid}")
 
+        # The dialed number picks the tenant whose organization answers
+        registry = get_router_registry()
+        tenant_id = registry.tenant_for_number(to_number)
+        universal_router = registry.get(tenant_id)
+
         # Initialize conversation for this call
         active_conversations[call_sid] = {
             'history': [],
             'from_number': from_number,
+            'tenant_id': tenant_id,
             'agent': None
         }
 
         twilio_service = get_twilio_service()
         if not twilio_service:
-            return twilio_service.generate_twiml_error(), 200, {'Content-Type': 'text/xml'}
+            return ERROR_TWIML, 200, {'Content-Type': 'text/xml'}
 
         # Generate greeting TwiML
-        org_name = org_config.get('organization_name', 'our company')
+        org_name = universal_router.config.get('organization_name', 'our company')
         greeting = f"Hello! Welcome to {org_name}. I'm your AI assistant."
 
         gather_url = url_for('voice.handle_speech', _external=True)
@@ -97,8 +105,7 @@ def handle_incoming_call():
         print(f"Error handling incoming call: {e}")
         import traceback
         traceback.print_exc()
-        twilio_service = get_twilio_service()
-        return twilio_service.generate_twiml_error(), 200, {'Content-Type': 'text/xml'}
+        return ERROR_TWIML, 200, {'Content-Type': 'text/xml'}
 
 
 @voice_bp.route('/speech', methods=['POST'])
@@ -107,6 +114,9 @@ def handle_speech():
     Handle speech input from user
     Twilio webhook - returns TwiML with AI response
     """
+    # Twilio gives up on slow webhooks, so the reply runs against a deadline
+    received_at = time.monotonic()
+
     try:
         call_sid = request.form.get('CallSid')
         speech_result = request.form.get('SpeechResult', '')
@@ -117,24 +127,39 @@ def handle_speech():
             twilio_service = get_twilio_service()
             twiml = twilio_service.generate_twiml_response(
                 "I'm sorry, I didn't catch that. Could you please repeat?",
-                gather_url=url_for('voice.handle_speech', _external=True)
+                gather_url=url_for('voice.handle_speech', _external=True),
+                cache=True
             )
             return twiml, 200, {'Content-Type': 'text/xml'}
 
         # Get conversation history
         conversation = active_conversations.get(call_sid, {
             'history': [],
+            'tenant_id': get_router_registry().tenant_for_number(request.form.get('To')),
             'agent': None
         })
 
         # First message - route the call
         if not conversation.get('agent'):
+            universal_router = get_router_registry().get(conversation.get('tenant_id'))
             routing_result = universal_router.analyze_request(speech_result)
             conversation['agent'] = routing_result['agent']
+            conversation['agent_key'] = routing_result['agent_key']
             conversation['department'] = routing_result['department']
 
             # Get agent greeting
             agent_greeting = universal_router.get_agent_greeting(routing_result['agent'])
+            conversation['agent_greeting'] = agent_greeting
+
+            # Pre-compute the agent's prompt prefix while the greeting is spoken
+            prefix_key, system_message = conversation_manager.get_system_prompt(
+                'assistant', {}, routing_result['agent'], agent_greeting
+            )
+            threading.Thread(
+                target=_warm_agent_prefix,
+                args=(prefix_key, system_message),
+                daemon=True
+            ).start()
 
             # Add to history
             conversation['history'].append({
@@ -152,7 +177,8 @@ def handle_speech():
             twilio_service = get_twilio_service()
             twiml = twilio_service.generate_twiml_response(
                 agent_greeting,
-                gather_url=url_for('voice.handle_speech', _external=True)
+                gather_url=url_for('voice.handle_speech', _external=True),
+                cache=True
             )
 
             return twiml, 200, {'Content-Type': 'text/xml'}
@@ -169,14 +195,32 @@ def handle_speech():
             speech_result,
             conversation['history'],
             'assistant',
-            {}
+            {},
+            agent=conversation.get('agent'),
+            agent_greeting=conversation.get('agent_greeting')
         )
 
-        ai_response = model.generate_response(
-            context['message'],
-            context['history'],
-            system_message=context['system_message']
-        )
+        try:
+            ai_response = model.generate_response(
+                context['message'],
+                context['history'],
+                system_message=context['system_message'],
+                prefix_key=context['prefix_key'],
+                conversation_id=call_sid,
+                latency_budget=Config.VOICE_LATENCY_BUDGET_MS / 1000 - (time.monotonic() - received_at),
+                # Live callers go ahead of web chat, emergency calls ahead of everyone
+                lane=lane_for_agent(conversation.get('agent_key'))
+            )
+        except Overloaded:
+            # The reply could not start in time: keep the caller on the line and ask again
+            conversation['history'].pop()
+            twilio_service = get_twilio_service()
+            twiml = twilio_service.generate_twiml_response(
+                BUSY_APOLOGY,
+                gather_url=url_for('voice.handle_speech', _external=True),
+                cache=True
+            )
+            return twiml, 200, {'Content-Type': 'text/xml'}
 
         conversation['history'].append({
             'role': 'assistant',
@@ -198,8 +242,15 @@ def handle_speech():
         print(f"Error handling speech: {e}")
         import traceback
         traceback.print_exc()
-        twilio_service = get_twilio_service()
-        return twilio_service.generate_twiml_error(), 200, {'Content-Type': 'text/xml'}
+        return ERROR_TWIML, 200, {'Content-Type': 'text/xml'}
+
+
+def _warm_agent_prefix(prefix_key, system_message):
+    """Load the agent's system prompt into the model's prefix cache"""
+    try:
+        get_model().warm_prefix(prefix_key, system_message)
+    except Exception as e:
+        print(f"Error warming agent prefix: {e}")
 
 
 @voice_bp.route('/status', methods=['POST'])
@@ -219,6 +270,7 @@ def handle_call_status():
             if call_sid in active_conversations:
                 del active_conversations[call_sid]
                 print(f"Cleaned up conversation for call {call_sid}")
+            release_conversation(call_sid)
 
         return '', 200
 
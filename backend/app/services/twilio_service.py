@@ -4,8 +4,8 @@ Handles real-time voice calls using Twilio
 """
 
 from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse, Gather, Say
 from config import Config
+from app.services.twiml_templates import ERROR_TWIML, get_twiml_cache, render_greeting, render_response
 
 
 class TwilioService:
@@ -46,6 +46,9 @@ class TwilioService:
         """
         Generate TwiML for initial greeting and gather user input
 
+        The greeting is the same for every call to an organization, so the
+        rendered TwiML is cached.
+
         Args:
             greeting_text: Text to speak to user
             gather_url: URL to send speech-to-text results
@@ -53,73 +56,35 @@ class TwilioService:
         Returns:
             TwiML XML string
         """
-        response = VoiceResponse()
-
-        # Say greeting
-        response.say(greeting_text, voice='Polly.Joanna', language='en-US')
-
-        # Gather speech input
-        gather = Gather(
-            input='speech',
-            action=gather_url,
-            method='POST',
-            speech_timeout='auto',
-            language='en-US',
-            hints='help, support, sales, billing, technical'
+        return get_twiml_cache().get(
+            ('greeting', greeting_text, gather_url),
+            lambda: render_greeting(greeting_text, gather_url)
         )
-        gather.say('Please tell me how I can help you today.', voice='Polly.Joanna')
-
-        response.append(gather)
-
-        # If no input, redirect
-        response.say('I did not receive any input. Goodbye.', voice='Polly.Joanna')
-        response.hangup()
-
-        return str(response)
 
-    def generate_twiml_response(self, ai_response, gather_url=None):
+    def generate_twiml_response(self, ai_response, gather_url=None, cache=False):
         """
         Generate TwiML for AI response
 
         Args:
             ai_response: Text response from AI
             gather_url: URL to gather next user input (if continuing conversation)
+            cache: Whether the text repeats across calls (agent greetings,
+                fixed prompts) and its TwiML should be cached
 
         Returns:
             TwiML XML string
         """
-        response = VoiceResponse()
-
-        # Say AI response
-        response.say(ai_response, voice='Polly.Joanna', language='en-US')
-
-        if gather_url:
-            # Continue conversation - gather more input
-            gather = Gather(
-                input='speech',
-                action=gather_url,
-                method='POST',
-                speech_timeout='auto',
-                language='en-US'
-            )
-            gather.pause(length=1)
-            response.append(gather)
-        else:
-            # End conversation
-            response.say('Thank you for calling. Goodbye!', voice='Polly.Joanna')
-            response.hangup()
+        if not cache:
+            return render_response(ai_response, gather_url)
 
-        return str(response)
+        return get_twiml_cache().get(
+            ('response', ai_response, gather_url),
+            lambda: render_response(ai_response, gather_url)
+        )
 
     def generate_twiml_error(self):
         """Generate TwiML for error handling"""
-        response = VoiceResponse()
-        response.say(
-            'I apologize, but I encountered an error. Please try again later.',
-            voice='Polly.Joanna'
-        )
-        response.hangup()
-        return str(response)
+        return ERROR_TWIML
 
     def get_call_status(self, call_sid):
         """
@@ -0,0 +1,171 @@
+"""
+TwiML Templates
+Renders the voice webhook responses from precompiled XML templates instead
+of building and serializing a VoiceResponse tree on every request. Output is
+byte-for-byte what the twilio builder produces for the same arguments.
+"""
+
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from config import Config
+
+VOICE = 'Polly.Joanna'
+GREETING_PROMPT = 'Please tell me how I can help you today.'
+GREETING_HINTS = 'help, support, sales, billing, technical'
+NO_INPUT_GOODBYE = 'I did not receive any input. Goodbye.'
+GOODBYE = 'Thank you for calling. Goodbye!'
+ERROR_MESSAGE = 'I apologize, but I encountered an error. Please try again later.'
+
+# Same escaping as xml.etree.ElementTree, which the twilio builder serializes with
+_ATTRIBUTE_ENTITIES = {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}
+
+
+def escape_text(text):
+    """Escape element text"""
+    return escape(text)
+
+
+def escape_attribute(value):
+    """Escape a double-quoted attribute value"""
+    return escape(value, _ATTRIBUTE_ENTITIES)
+
+
+_HEADER = '<?xml version="1.0" encoding="UTF-8"?><Response>'
+_FOOTER = '</Response>'
+_SAY_OPEN = f'<Say language="en-US" voice="{VOICE}">'
+# ElementTree writes an element without text as an empty tag
+_SAY_EMPTY = f'<Say language="en-US" voice="{VOICE}" />'
+
+# Each template is split around its dynamic parts, which are escaped and joined in
+_GREETING = (
+    _HEADER,
+    '<Gather action="',
+    f'" hints="{escape_attribute(GREETING_HINTS)}" input="speech" language="en-US" method="POST" speechTimeout="auto">'
+    f'<Say voice="{VOICE}">{escape_text(GREETING_PROMPT)}</Say></Gather>'
+    f'<Say voice="{VOICE}">{escape_text(NO_INPUT_GOODBYE)}</Say><Hangup /></Response>'
+)
+_RESPONSE_GATHER = (
+    _HEADER,
+    '<Gather action="',
+    '" input="speech" language="en-US" method="POST" speechTimeout="auto"><Pause length="1" /></Gather>' + _FOOTER
+)
+_RESPONSE_GOODBYE = (
+    _HEADER,
+    f'<Say voice="{VOICE}">{escape_text(GOODBYE)}</Say><Hangup />' + _FOOTER
+)
+
+# Fully static, so rendered once
+ERROR_TWIML = f'{_HEADER}<Say voice="{VOICE}">{escape_text(ERROR_MESSAGE)}</Say><Hangup />{_FOOTER}'
+
+
+def _say(text):
+    """The spoken reply element"""
+    if not text:
+        return _SAY_EMPTY
+    return _SAY_OPEN + escape_text(text) + '</Say>'
+
+
+def render_greeting(greeting_text, gather_url):
+    """
+    Render the greeting that opens a call and gathers the caller's request
+
+    Args:
+        greeting_text: Text to speak to user
+        gather_url: URL to send speech-to-text results
+
+    Returns:
+        TwiML XML string
+    """
+    head, middle, tail = _GREETING
+    return head + _say(greeting_text) + middle + escape_attribute(gather_url) + tail
+
+
+def render_response(text, gather_url=None):
+    """
+    Render a spoken reply, then either gather the next turn or hang up
+
+    Args:
+        text: Text to speak to user
+        gather_url: URL to gather next user input (if continuing conversation)
+
+    Returns:
+        TwiML XML string
+    """
+    if gather_url:
+        head, middle, tail = _RESPONSE_GATHER
+        return head + _say(text) + middle + escape_attribute(gather_url) + tail
+
+    head, tail = _RESPONSE_GOODBYE
+    return head + _say(text) + tail
+
+
+class TwimlCache:
+    """LRU of rendered TwiML for texts that repeat across calls (greetings, fixed prompts)"""
+
+    def __init__(self, max_entries=None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of cached responses
+        """
+        self.max_entries = max_entries if max_entries is not None else Config.TWIML_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """
+        Get the TwiML for a key, rendering and storing it on a miss
+
+        Args:
+            key: Hashable tuple of the render arguments
+            render: Callable producing the TwiML on a miss
+
+        Returns:
+            TwiML XML string
+        """
+        with self._lock:
+            twiml = self._entries.get(key)
+            if twiml is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return twiml
+            self.misses += 1
+
+        twiml = render()
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = twiml
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return twiml
+
+    def get_stats(self):
+        """Return cache size and hit statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Global instance
+_twiml_cache = None
+
+
+def get_twiml_cache():
+    """Get or create the shared TwiML cache"""
+    global _twiml_cache
+    if _twiml_cache is None:
+        _twiml_cache = TwimlCache()
+    return _twiml_cache
@@ -0,0 +1,129 @@
+"""
+Assisted Decoding Benchmark
+Compares plain greedy decoding of the configured model with assisted
+generation using a small draft model: tokens/sec, latency and whether
+both paths produce the same tokens
+
+Usage (from backend/):
+    python -m benchmarks.assisted_decoding
+    python -m benchmarks.assisted_decoding --draft microsoft/DialoGPT-small --runs 5 --output assisted.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.precision_report import PROMPTS, _percentile
+
+
+def run_path(connector, draft_model, runs, min_new_tokens):
+    """Time greedy generation of every prompt with or without the draft model"""
+    import torch
+    from config import Config
+
+    latencies = []
+    outputs = []
+    new_tokens = 0
+    assistant = {'assistant_model': draft_model} if draft_model is not None else {}
+
+    for prompt in PROMPTS:
+        inputs = connector._encode(prompt, None)
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            with torch.no_grad():
+                generated = connector.model.generate(
+                    inputs,
+                    max_new_tokens=Config.MAX_LENGTH,
+                    min_new_tokens=min_new_tokens,
+                    do_sample=False,
+                    pad_token_id=connector.tokenizer.pad_token_id,
+                    eos_token_id=connector.tokenizer.eos_token_id,
+                    **assistant
+                )
+            latencies.append(time.perf_counter() - start)
+
+        output_ids = generated[0][inputs.shape[1]:]
+        outputs.append(output_ids.tolist())
+        new_tokens += len(output_ids) * runs
+
+    total_seconds = sum(latencies)
+    return {
+        'path': 'assisted' if draft_model is not None else 'plain',
+        'latency_mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'tokens_per_second': round(new_tokens / total_seconds, 2) if total_seconds else 0.0,
+        'outputs': outputs
+    }
+
+
+def print_table(results):
+    """Print a readable summary"""
+    columns = [
+        ('path', 'Path'),
+        ('latency_p50_ms', 'p50 ms'),
+        ('latency_p95_ms', 'p95 ms'),
+        ('tokens_per_second', 'Tok/s'),
+        ('speedup', 'Speedup'),
+        ('exact_match_rate', 'Exact')
+    ]
+    rows = [[str(result.get(key, '-')) for key, _ in columns] for result in results]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+
+    print('  '.join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare plain and assisted greedy decoding')
+    parser.add_argument('--draft', default=None, help='Draft model (default: DRAFT_MODEL_NAME or microsoft/DialoGPT-small)')
+    parser.add_argument('--runs', type=int, default=3, help='Timed generations per prompt')
+    parser.add_argument('--min-new-tokens', type=int, default=0, help='Force at least this many new tokens per reply')
+    parser.add_argument('--output', help='Write the full JSON report to this file')
+    args = parser.parse_args()
+
+    from config import Config
+
+    draft_name = args.draft or Config.DRAFT_MODEL_NAME or 'microsoft/DialoGPT-small'
+    os.environ['DRAFT_MODEL_NAME'] = draft_name
+    Config.DRAFT_MODEL_NAME = draft_name
+    Config.INFERENCE_BATCHING = False
+
+    from app.ai.model_connector import HuggingFaceConnector
+
+    connector = HuggingFaceConnector()
+    if connector.draft_model is None:
+        print("Assisted generation needs a causal model; nothing to compare", file=sys.stderr)
+        sys.exit(1)
+
+    print("Running plain decoding...", file=sys.stderr)
+    plain = run_path(connector, None, args.runs, args.min_new_tokens)
+    print("Running assisted decoding...", file=sys.stderr)
+    assisted = run_path(connector, connector.draft_model, args.runs, args.min_new_tokens)
+
+    matches = sum(ids == ref_ids for ids, ref_ids in zip(assisted['outputs'], plain['outputs']))
+    for result in (plain, assisted):
+        result['speedup'] = round(plain['latency_mean_ms'] / result['latency_mean_ms'], 2)
+    plain['exact_match_rate'] = 1.0
+    assisted['exact_match_rate'] = round(matches / len(PROMPTS), 3)
+
+    print_table([plain, assisted])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'model': Config.AI_MODEL_NAME,
+                'draft_model': draft_name,
+                'results': [plain, assisted]
+            }, f, indent=2)
+        print(f"\nFull report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+"""
+Inference Benchmark Suite
+Drives HuggingFaceConnector over a matrix of history lengths, prompt
+lengths, concurrent batch sizes and MAX_LENGTH values, for a causal and a
+seq2seq model, and reports time-to-first-token, tokens/sec, p50/p95/p99
+latency and peak RSS
+
+Two paths are measured: 'direct' times encode and decode alone, 'serving'
+sends the same requests through the connector stack /api/chat uses
+(prompt building, history fitting, latency deadline, priority gate and
+response cache, as configured in .env).
+
+By default it builds tiny randomly initialized GPT-2 and BART models with
+a locally trained tokenizer, so it runs offline in a few minutes. Real
+models can be passed instead.
+
+Usage (from backend/):
+    python -m benchmarks.inference_suite --output baseline.json
+    python -m benchmarks.inference_suite --baseline baseline.json
+    python -m benchmarks.inference_suite --causal-model microsoft/DialoGPT-small --seq2seq-model none
+    python -m benchmarks.inference_suite --paths serving
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.precision_report import _memory_mb, _percentile
+
+HISTORY_LENGTHS = [0, 4, 10]
+PROMPT_WORDS = [4, 48]
+BATCH_SIZES = [1, 4]
+MAX_LENGTHS = [16, 48]
+PATHS = ['direct', 'serving']
+
+CORPUS = (
+    "User: Hello, I need some help with my account. Assistant: Of course, I can help with that. "
+    "User: I was charged twice on my last bill. Assistant: I'm sorry to hear that, let me check. "
+    "User: Can I book an appointment for next Tuesday? Assistant: Yes, what time works for you? "
+    "User: My internet has been down since this morning. Assistant: Let's run a quick test. "
+)
+WORDS = CORPUS.replace('User:', '').replace('Assistant:', '').split()
+
+
+def build_tiny_models(directory):
+    """
+    Create tiny random GPT-2 (causal) and BART (seq2seq) models offline
+
+    The models are built to never emit EOS, so every generation runs to
+    MAX_LENGTH on every decode path (including the batching scheduler,
+    which samples on its own) and runs stay comparable.
+
+    Returns:
+        tuple: (causal model path, seq2seq model path)
+    """
+    import torch
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import (BartConfig, BartForConditionalGeneration, BartTokenizerFast,
+                              GPT2Config, GPT2LMHeadModel, GPT2TokenizerFast)
+
+    causal_dir = os.path.join(directory, 'tiny-gpt2')
+    seq2seq_dir = os.path.join(directory, 'tiny-bart')
+    if os.path.exists(os.path.join(causal_dir, 'config.json')) and os.path.exists(os.path.join(seq2seq_dir, 'config.json')):
+        return causal_dir, seq2seq_dir
+
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(
+        [CORPUS] * 20,
+        vocab_size=512,
+        min_frequency=1,
+        special_tokens=['<|endoftext|>', '<s>', '<pad>', '</s>', '<unk>', '<mask>']
+    )
+    torch.manual_seed(0)
+
+    os.makedirs(causal_dir, exist_ok=True)
+    bpe.save_model(causal_dir)
+    tokenizer = GPT2TokenizerFast(
+        vocab_file=os.path.join(causal_dir, 'vocab.json'),
+        merges_file=os.path.join(causal_dir, 'merges.txt'),
+        eos_token='<|endoftext|>', bos_token='<|endoftext|>', unk_token='<|endoftext|>'
+    )
+    tokenizer.save_pretrained(causal_dir)
+    model = GPT2LMHeadModel(GPT2Config(
+        n_layer=2, n_head=2, n_embd=64, n_positions=1024, vocab_size=len(tokenizer),
+        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id, tie_word_embeddings=False
+    ))
+    with torch.no_grad():
+        # A zero output row scores 0 while the other random logits spread around it
+        model.lm_head.weight[tokenizer.eos_token_id] = 0
+    model.save_pretrained(causal_dir)
+
+    os.makedirs(seq2seq_dir, exist_ok=True)
+    bpe.save_model(seq2seq_dir)
+    tokenizer = BartTokenizerFast(
+        vocab_file=os.path.join(seq2seq_dir, 'vocab.json'),
+        merges_file=os.path.join(seq2seq_dir, 'merges.txt')
+    )
+    tokenizer.save_pretrained(seq2seq_dir)
+    model = BartForConditionalGeneration(BartConfig(
+        vocab_size=len(tokenizer), d_model=64, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=128, decoder_ffn_dim=128,
+        max_position_embeddings=1024, pad_token_id=tokenizer.pad_token_id, bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id, decoder_start_token_id=tokenizer.eos_token_id,
+        forced_bos_token_id=None, forced_eos_token_id=None
+    ))
+    with torch.no_grad():
+        model.final_logits_bias[0, tokenizer.eos_token_id] = -1e4
+    model.save_pretrained(seq2seq_dir)
+
+    return causal_dir, seq2seq_dir
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter so each scenario reports its own peak (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _make_prompt(words):
+    return ' '.join(WORDS[i % len(WORDS)] for i in range(words))
+
+
+def _make_history(messages):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': _make_prompt(12 + i % 5)}
+        for i in range(messages)
+    ]
+
+
+class TokenTimer:
+    """
+    Streamer recording when the first new token arrives and how many follow
+
+    transformers streamers receive the prompt (or decoder start) ids first,
+    so the first put() is skipped.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.tokens = 0
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += value.numel()
+
+    def end(self):
+        pass
+
+
+def _timed_request(connector, prompt, history, results):
+    """
+    Run one request through generate_response's encode and decode path,
+    recording time to first token, latency and new token count
+    """
+    timer = TokenTimer()
+    inputs = connector._encode(prompt, history)
+    connector._generate_ids(inputs, streamer=timer, do_sample=False)
+    latency = time.perf_counter() - timer.start
+
+    first = timer.first_token_at - timer.start if timer.first_token_at is not None else latency
+    results.append((first, latency, timer.tokens, False))
+
+
+def _serving_request(serving, prompt, history, results):
+    """
+    Run one request the way /api/chat does, through the configured
+    connector stack, recording time to first token, latency and new token count
+    """
+    from config import Config
+    from app.ai.metrics import PhaseTimings
+    from app.ai.priority_gate import Overloaded
+
+    connector, conversation_manager = serving
+    timings = PhaseTimings()
+    try:
+        context = conversation_manager.process_message(prompt, history)
+        connector.generate_response(
+            context['message'],
+            context['history'],
+            system_message=context['system_message'],
+            prefix_key=context['prefix_key'],
+            latency_budget=Config.CHAT_LATENCY_BUDGET_MS / 1000,
+            timings=timings,
+            lane='chat',
+            do_sample=False
+        )
+    except Overloaded:
+        results.append(None)
+        return
+    latency = time.monotonic() - timings.started
+
+    # Cache hits produce no tokens, so their first token is the reply itself
+    first = timings.first_token_at - timings.started if timings.first_token_at is not None else latency
+    results.append((first, latency, timings.output_tokens, timings.cached))
+
+
+def _unwrap(connector):
+    """The HuggingFaceConnector inside the gate and cache wrappers"""
+    while hasattr(connector, 'connector'):
+        connector = connector.connector
+    return connector
+
+
+def run_model(model_name, runs, matrix, paths=None):
+    """Run the scenario matrix for one model and return per-scenario results"""
+    from config import Config
+    from app.ai.conversation_manager import ConversationManager
+    from app.ai.model_connector import get_local_model_connector
+
+    start = time.perf_counter()
+    serving_connector = get_local_model_connector()
+    load_seconds = time.perf_counter() - start
+    connector = _unwrap(serving_connector)
+    serving = (serving_connector, ConversationManager())
+
+    scenarios = []
+    for path, (history_length, prompt_words, batch_size, max_length) in itertools.product(paths or PATHS, matrix):
+        Config.MAX_LENGTH = max_length
+        prompt = _make_prompt(prompt_words)
+        history = _make_history(history_length)
+        per_peak = _reset_peak_rss()
+        target, subject = (_serving_request, serving) if path == 'serving' else (_timed_request, connector)
+
+        results = []
+        wall_seconds = 0.0
+        for _ in range(runs):
+            threads = [
+                threading.Thread(target=target, args=(subject, prompt, history, results))
+                for _ in range(batch_size)
+            ]
+            wall_start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_seconds += time.perf_counter() - wall_start
+
+        rejected = results.count(None)
+        results = [r for r in results if r is not None]
+        ttfts = [r[0] for r in results] or [0.0]
+        latencies = [r[1] for r in results] or [0.0]
+        tokens = sum(r[2] for r in results)
+        _, peak_rss = _memory_mb()
+
+        kind = 'seq2seq' if connector.is_seq2seq else 'causal'
+        # Direct keys keep their original form so older baselines still match
+        prefix = f"{kind}/serving" if path == 'serving' else kind
+        scenarios.append({
+            'key': f"{prefix}/h{history_length}/p{prompt_words}/b{batch_size}/m{max_length}",
+            'model_kind': kind,
+            'path': path,
+            'history': history_length,
+            'prompt_words': prompt_words,
+            'batch_size': batch_size,
+            'max_length': max_length,
+            'requests': len(results),
+            'cached': sum(1 for r in results if r[3]),
+            'rejected': rejected,
+            'ttft_p50_ms': round(_percentile(ttfts, 50) * 1000, 2),
+            'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+            'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+            'latency_p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+            'latency_mean_ms': round(statistics.mean(latencies) * 1000, 2),
+            'tokens_per_second': round(tokens / wall_seconds, 2) if wall_seconds else 0.0,
+            'peak_rss_mb': round(peak_rss, 1),
+            'peak_rss_scope': 'scenario' if per_peak else 'process'
+        })
+
+    return {
+        'model': model_name,
+        'load_seconds': round(load_seconds, 3),
+        'batching': Config.INFERENCE_BATCHING,
+        'scenarios': scenarios
+    }
+
+
+def compare_to_baseline(scenarios, baseline, threshold):
+    """
+    Flag scenarios that got slower than the baseline
+
+    Args:
+        scenarios: Current scenario results
+        baseline: Scenario results loaded from a previous run
+        threshold: Allowed relative slowdown (0.1 = 10%)
+
+    Returns:
+        int: Number of regressions found
+    """
+    previous = {scenario['key']: scenario for scenario in baseline}
+    regressions = 0
+
+    for scenario in scenarios:
+        old = previous.get(scenario['key'])
+        if old is None:
+            scenario['vs_baseline'] = 'new'
+            continue
+
+        throughput = scenario['tokens_per_second'] / old['tokens_per_second'] if old['tokens_per_second'] else 1.0
+        p95 = scenario['latency_p95_ms'] / old['latency_p95_ms'] if old['latency_p95_ms'] else 1.0
+        scenario['throughput_ratio'] = round(throughput, 3)
+        scenario['p95_ratio'] = round(p95, 3)
+
+        if throughput < 1 - threshold or p95 > 1 + threshold:
+            scenario['vs_baseline'] = 'REGRESSION'
+            regressions += 1
+        else:
+            scenario['vs_baseline'] = 'ok'
+
+    return regressions
+
+
+def print_table(scenarios):
+    """Print a readable summary"""
+    columns = [
+        ('key', 'Scenario'),
+        ('ttft_p50_ms', 'TTFT ms'),
+        ('latency_p50_ms', 'p50 ms'),
+        ('latency_p95_ms', 'p95 ms'),
+        ('latency_p99_ms', 'p99 ms'),
+        ('tokens_per_second', 'Tok/s'),
+        ('cached', 'Cached'),
+        ('peak_rss_mb', 'Peak RSS MB'),
+        ('vs_baseline', 'Baseline')
+    ]
+    rows = [[str(scenario.get(key, '-')) for key, _ in columns] for scenario in scenarios]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+
+    print('  '.join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def _parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HuggingFaceConnector over a scenario matrix')
+    parser.add_argument('--causal-model', default=None, help="Causal model (default: tiny random GPT-2; 'none' to skip)")
+    parser.add_argument('--seq2seq-model', default=None, help="Seq2seq model (default: tiny random BART; 'none' to skip)")
+    parser.add_argument('--model-dir', default=os.path.join(tempfile.gettempdir(), 'ai-dialer-bench-models'),
+                        help='Where the tiny models are built')
+    parser.add_argument('--history', default=','.join(map(str, HISTORY_LENGTHS)), help='History lengths in messages')
+    parser.add_argument('--prompt-words', default=','.join(map(str, PROMPT_WORDS)), help='Prompt lengths in words')
+    parser.add_argument('--batch-sizes', default=','.join(map(str, BATCH_SIZES)), help='Concurrent requests per step')
+    parser.add_argument('--max-lengths', default=','.join(map(str, MAX_LENGTHS)), help='MAX_LENGTH values')
+    parser.add_argument('--paths', default=','.join(PATHS), help="Request paths: 'direct' (encode and decode only) and/or 'serving'")
+    parser.add_argument('--runs', type=int, default=3, help='Repetitions per scenario')
+    parser.add_argument('--output', help='Write the JSON report (usable as a later --baseline)')
+    parser.add_argument('--baseline', help='Compare against a previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown vs baseline (0.1 = 10%%)')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--matrix', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_model(args.worker, args.runs, json.loads(args.matrix), args.paths.split(','))))
+        return
+
+    matrix = list(itertools.product(
+        _parse_list(args.history),
+        _parse_list(args.prompt_words),
+        _parse_list(args.batch_sizes),
+        _parse_list(args.max_lengths)
+    ))
+
+    models = [args.causal_model, args.seq2seq_model]
+    if None in models:
+        tiny_causal, tiny_seq2seq = build_tiny_models(args.model_dir)
+        models = [args.causal_model or tiny_causal, args.seq2seq_model or tiny_seq2seq]
+    models = [model for model in models if model.lower() != 'none']
+
+    paths = [path for path in args.paths.split(',') if path]
+    reports = []
+    for model in models:
+        print(f"Running {model} ({len(matrix) * len(paths)} scenarios)...", file=sys.stderr)
+        # One process per model keeps memory numbers and Config state separate
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.inference_suite', '--worker', model,
+             '--runs', str(args.runs), '--paths', args.paths, '--matrix', json.dumps(matrix)],
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, AI_MODEL_NAME=model, AI_MODEL_TYPE='huggingface', HF_HUB_OFFLINE='1')
+        )
+        if completed.returncode != 0:
+            print(f"[WARNING] {model} failed:\n{completed.stderr}", file=sys.stderr)
+            continue
+        reports.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    scenarios = [scenario for report in reports for scenario in report['scenarios']]
+    if not scenarios:
+        print("No benchmark completed", file=sys.stderr)
+        sys.exit(1)
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(
+            scenarios,
+            [scenario for report in baseline['models'] for scenario in report['scenarios']],
+            args.threshold
+        )
+
+    print_table(scenarios)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'models': reports}, f, indent=2)
+        print(f"\nFull report written to {args.output}")
+
+    if regressions:
+        print(f"\n{regressions} scenario(s) regressed by more than {args.threshold:.0%} against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
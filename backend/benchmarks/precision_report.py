@@ -0,0 +1,217 @@
+"""
+Precision Report
+Compares CPU serving precisions (fp32, int8, bf16) of the configured model
+on a fixed prompt set: latency, memory and output similarity against fp32
+
+Each mode runs in its own process so memory numbers are not mixed up.
+
+Usage (from backend/):
+    python -m benchmarks.precision_report
+    python -m benchmarks.precision_report --modes fp32,int8 --runs 5 --output report.json
+"""
+
+import argparse
+import difflib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+PROMPTS = [
+    "Hello, I need some help with my account.",
+    "I was charged twice on my last bill.",
+    "Can I book an appointment for next Tuesday?",
+    "My internet has been down since this morning.",
+    "What are your opening hours?",
+    "I want to speak to someone about a refund.",
+    "Yes",
+    "No, that's not what I meant.",
+]
+
+
+def _memory_mb():
+    """Current and peak resident memory of this process"""
+    current = peak = None
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return current, peak
+
+
+def run_mode(mode, runs):
+    """Load the model in one precision mode and time greedy generation"""
+    os.environ['MODEL_PRECISION'] = mode
+
+    import torch
+    from config import Config
+    from app.ai.model_connector import HuggingFaceConnector
+    from app.ai.quantization import model_size_bytes
+
+    Config.MODEL_PRECISION = mode
+
+    start = time.perf_counter()
+    connector = HuggingFaceConnector()
+    load_seconds = time.perf_counter() - start
+    rss_after_load, _ = _memory_mb()
+
+    latencies = []
+    outputs = []
+    texts = []
+    new_tokens = 0
+
+    for prompt in PROMPTS:
+        inputs = connector._encode(prompt, None)
+        prompt_latencies = []
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            with torch.no_grad():
+                generated = connector.model.generate(
+                    inputs,
+                    max_new_tokens=Config.MAX_LENGTH,
+                    do_sample=False,
+                    pad_token_id=connector.tokenizer.pad_token_id,
+                    eos_token_id=connector.tokenizer.eos_token_id
+                )
+            prompt_latencies.append(time.perf_counter() - start)
+
+        output_ids = generated[0] if connector.is_seq2seq else generated[0][inputs.shape[1]:]
+        outputs.append(output_ids.tolist())
+        texts.append(connector.tokenizer.decode(output_ids, skip_special_tokens=True).strip())
+        new_tokens += len(output_ids) * runs
+        latencies.extend(prompt_latencies)
+
+    _, peak_rss = _memory_mb()
+    total_seconds = sum(latencies)
+
+    return {
+        'mode': mode,
+        'effective_mode': connector.precision,
+        'load_seconds': round(load_seconds, 3),
+        'model_size_mb': round(model_size_bytes(connector.model) / (1024 * 1024), 2),
+        'rss_after_load_mb': round(rss_after_load, 1) if rss_after_load else None,
+        'peak_rss_mb': round(peak_rss, 1),
+        'latency_mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'tokens_per_second': round(new_tokens / total_seconds, 2) if total_seconds else 0.0,
+        'outputs': outputs,
+        'texts': texts
+    }
+
+
+def compare_to_reference(result, reference):
+    """Output similarity of one mode against the fp32 reference"""
+    exact = 0
+    first_token = 0
+    token_agreement = []
+    text_similarity = []
+
+    for ids, ref_ids, text, ref_text in zip(result['outputs'], reference['outputs'], result['texts'], reference['texts']):
+        exact += ids == ref_ids
+        first_token += bool(ids) and bool(ref_ids) and ids[0] == ref_ids[0]
+
+        # Fraction of the reference reproduced before the first divergence
+        matched = 0
+        for token, ref_token in zip(ids, ref_ids):
+            if token != ref_token:
+                break
+            matched += 1
+        token_agreement.append(matched / max(len(ref_ids), 1))
+        text_similarity.append(difflib.SequenceMatcher(None, text, ref_text).ratio())
+
+    count = len(reference['outputs'])
+    return {
+        'exact_match_rate': round(exact / count, 3),
+        'first_token_agreement': round(first_token / count, 3),
+        'prefix_token_agreement': round(statistics.mean(token_agreement), 3),
+        'text_similarity': round(statistics.mean(text_similarity), 3)
+    }
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def print_table(results):
+    """Print a readable summary"""
+    columns = [
+        ('mode', 'Mode'),
+        ('effective_mode', 'Served as'),
+        ('model_size_mb', 'Size MB'),
+        ('peak_rss_mb', 'Peak RSS MB'),
+        ('latency_p50_ms', 'p50 ms'),
+        ('latency_p95_ms', 'p95 ms'),
+        ('tokens_per_second', 'Tok/s'),
+        ('speedup', 'Speedup'),
+        ('exact_match_rate', 'Exact'),
+        ('text_similarity', 'Text sim')
+    ]
+    rows = [[str(result.get(key, '-')) for key, _ in columns] for result in results]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+
+    print('  '.join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare CPU precision modes against fp32')
+    parser.add_argument('--modes', default='fp32,int8,bf16', help='Comma-separated modes; fp32 is always included')
+    parser.add_argument('--runs', type=int, default=3, help='Timed generations per prompt')
+    parser.add_argument('--output', help='Write the full JSON report to this file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.worker, args.runs)))
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    if 'fp32' not in modes:
+        modes.insert(0, 'fp32')
+
+    results = []
+    for mode in modes:
+        print(f"Running {mode}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.precision_report', '--worker', mode, '--runs', str(args.runs)],
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode != 0:
+            print(f"[WARNING] {mode} failed:\n{completed.stderr}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    reference = next((result for result in results if result['mode'] == 'fp32'), None)
+    if reference is None:
+        print("fp32 reference run failed, nothing to compare against", file=sys.stderr)
+        sys.exit(1)
+
+    for result in results:
+        result.update(compare_to_reference(result, reference))
+        result['speedup'] = round(reference['latency_mean_ms'] / result['latency_mean_ms'], 2)
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nFull report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
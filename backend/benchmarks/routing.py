@@ -0,0 +1,177 @@
+"""
+Routing Benchmark
+Measures UniversalRouter.analyze_request throughput (routes/sec) for every
+organization template on utterances that take each routing path: agent
+keywords, known universities, custom organizations and no match
+
+Usage (from backend/):
+    # Before a change: save a baseline
+    python -m benchmarks.routing --output routing_before.json
+    # After: compare (exits 1 if any scenario is >10% slower)
+    python -m benchmarks.routing --baseline routing_before.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.precision_report import _percentile
+
+UTTERANCES = {
+    'keywords': [
+        "I have chest pain and it's urgent",
+        "I need help with my invoice and a refund",
+        "I want to enroll my daughter, what's the admission process",
+        "I'd like to make a reservation for a party of six",
+        "My husband was arrested and needs a criminal defense lawyer",
+        "Can I schedule a visit to see an inmate this weekend"
+    ],
+    'known_org': [
+        "I'm trying to reach MIT about my tuition payment",
+        "calling stanford admissions about my application",
+        "I need the columbia billing office",
+        "can you connect me to someone at ucla"
+    ],
+    'custom_org': [
+        "please call riverside medical center about my appointment",
+        "I need to contact acme corporation support",
+        "reach the first national bank for a payment issue",
+        "call lakeside high school about enrollment"
+    ],
+    'no_match': [
+        "hello",
+        "yes",
+        "I'm not sure who I should talk to about this",
+        "could you tell me more about what you do"
+    ]
+}
+
+
+def run(org_types, iterations):
+    """
+    Time analyze_request for each organization template and utterance kind
+
+    Returns:
+        list: Scenario results
+    """
+    from app.ai.organization_configs import get_organization_config
+    from app.ai.universal_router import UniversalRouter
+
+    scenarios = []
+    for org_type in org_types:
+        start = time.perf_counter()
+        router = UniversalRouter(get_organization_config(org_type))
+        init_ms = (time.perf_counter() - start) * 1000
+
+        for kind, messages in UTTERANCES.items():
+            for message in messages:
+                router.analyze_request(message)  # Warm up
+
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                for message in messages:
+                    router.analyze_request(message)
+                samples.append((time.perf_counter() - start) / len(messages))
+
+            scenarios.append({
+                'key': f"{org_type}/{kind}",
+                'init_ms': round(init_ms, 3),
+                'us_p50': round(_percentile(samples, 50) * 1e6, 2),
+                'us_p95': round(_percentile(samples, 95) * 1e6, 2),
+                'routes_per_second': round(1 / statistics.mean(samples))
+            })
+
+    return scenarios
+
+
+def compare_to_baseline(scenarios, baseline, threshold):
+    """
+    Flag scenarios whose throughput dropped below the baseline
+
+    Args:
+        scenarios: Current scenario results
+        baseline: Scenario results loaded from a previous run
+        threshold: Allowed relative slowdown (0.1 = 10%)
+
+    Returns:
+        int: Number of regressions found
+    """
+    previous = {scenario['key']: scenario for scenario in baseline}
+    regressions = 0
+
+    for scenario in scenarios:
+        old = previous.get(scenario['key'])
+        if old is None:
+            scenario['vs_baseline'] = 'new'
+            continue
+
+        speedup = scenario['routes_per_second'] / old['routes_per_second'] if old['routes_per_second'] else 1.0
+        scenario['speedup'] = round(speedup, 2)
+
+        if speedup < 1 - threshold:
+            scenario['vs_baseline'] = 'REGRESSION'
+            regressions += 1
+        else:
+            scenario['vs_baseline'] = 'ok'
+
+    return regressions
+
+
+def print_table(scenarios):
+    """Print a readable summary"""
+    columns = [
+        ('key', 'Scenario'),
+        ('us_p50', 'p50 us'),
+        ('us_p95', 'p95 us'),
+        ('routes_per_second', 'Routes/s'),
+        ('speedup', 'Speedup'),
+        ('vs_baseline', 'Baseline')
+    ]
+    rows = [[str(scenario.get(key, '-')) for key, _ in columns] for scenario in scenarios]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+
+    print('  '.join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    from app.ai.organization_configs import list_available_configs
+
+    parser = argparse.ArgumentParser(description='Benchmark UniversalRouter.analyze_request')
+    parser.add_argument('--orgs', default=','.join(list_available_configs()), help='Organization templates to route for')
+    parser.add_argument('--iterations', type=int, default=2000, help='Timed passes over each utterance group')
+    parser.add_argument('--output', help='Write the JSON report (usable as a later --baseline)')
+    parser.add_argument('--baseline', help='Compare against a previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown vs baseline (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    org_types = [org_type.strip() for org_type in args.orgs.split(',') if org_type.strip()]
+    scenarios = run(org_types, args.iterations)
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(scenarios, baseline['scenarios'], args.threshold)
+
+    print_table(scenarios)
+    total = statistics.mean(scenario['routes_per_second'] for scenario in scenarios)
+    print(f"\nMean throughput: {round(total)} routes/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'scenarios': scenarios}, f, indent=2)
+        print(f"\nFull report written to {args.output}")
+
+    if regressions:
+        print(f"\n{regressions} scenario(s) regressed by more than {args.threshold:.0%} against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+TwiML Rendering Benchmark
+Compares building voice webhook TwiML with the twilio VoiceResponse builder
+against the precompiled templates and the TwiML cache, and checks that every
+path produces identical XML
+
+Usage (from backend/):
+    python -m benchmarks.twiml_rendering
+    python -m benchmarks.twiml_rendering --iterations 50000 --output twiml.json
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from app.services.twiml_templates import (
+    ERROR_MESSAGE, ERROR_TWIML, GOODBYE, GREETING_HINTS, GREETING_PROMPT, NO_INPUT_GOODBYE, VOICE,
+    TwimlCache, render_greeting, render_response
+)
+
+GATHER_URL = 'https://example.ngrok.io/api/voice/speech?tenant=acme&lang=en'
+GREETING = "Hello! Welcome to Smith & Sons <Billing>. I'm your AI assistant."
+AI_RESPONSES = [
+    "Sure, I can help with that.",
+    "Your balance is $42 & your next bill is due on the 3rd.",
+    'Please say "agent" to reach a person, or press <0>.',
+    "Line one\nline two\twith a tab",
+    "Ünïcödé réply — with dashes",
+    ""
+]
+
+
+def builder_greeting(greeting_text, gather_url):
+    """The VoiceResponse construction TwilioService used before templates"""
+    from twilio.twiml.voice_response import Gather, VoiceResponse
+
+    response = VoiceResponse()
+    response.say(greeting_text, voice=VOICE, language='en-US')
+    gather = Gather(
+        input='speech',
+        action=gather_url,
+        method='POST',
+        speech_timeout='auto',
+        language='en-US',
+        hints=GREETING_HINTS
+    )
+    gather.say(GREETING_PROMPT, voice=VOICE)
+    response.append(gather)
+    response.say(NO_INPUT_GOODBYE, voice=VOICE)
+    response.hangup()
+    return str(response)
+
+
+def builder_response(ai_response, gather_url=None):
+    """The VoiceResponse construction TwilioService used before templates"""
+    from twilio.twiml.voice_response import Gather, VoiceResponse
+
+    response = VoiceResponse()
+    response.say(ai_response, voice=VOICE, language='en-US')
+    if gather_url:
+        gather = Gather(
+            input='speech',
+            action=gather_url,
+            method='POST',
+            speech_timeout='auto',
+            language='en-US'
+        )
+        gather.pause(length=1)
+        response.append(gather)
+    else:
+        response.say(GOODBYE, voice=VOICE)
+        response.hangup()
+    return str(response)
+
+
+def builder_error():
+    """The VoiceResponse construction TwilioService used before templates"""
+    from twilio.twiml.voice_response import VoiceResponse
+
+    response = VoiceResponse()
+    response.say(ERROR_MESSAGE, voice=VOICE)
+    response.hangup()
+    return str(response)
+
+
+def check_equivalence():
+    """Return the cases where a template differs from the builder"""
+    mismatches = []
+    cases = [
+        ('greeting', GREETING, GATHER_URL, builder_greeting, render_greeting),
+        ('greeting', '', GATHER_URL, builder_greeting, render_greeting)
+    ]
+    for text in AI_RESPONSES:
+        cases.append(('response', text, GATHER_URL, builder_response, render_response))
+        cases.append(('goodbye', text, None, builder_response, render_response))
+
+    for name, text, url, build, render in cases:
+        if build(text, url) != render(text, url):
+            mismatches.append({'case': name, 'text': text})
+    if builder_error() != ERROR_TWIML:
+        mismatches.append({'case': 'error', 'text': ERROR_MESSAGE})
+    return mismatches
+
+
+def time_calls(func, iterations):
+    """Microseconds per call of func()"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations):
+    """Time each TwiML kind through the builder, the templates and the cache"""
+    cache = TwimlCache(max_entries=64)
+    reply = AI_RESPONSES[1]
+
+    scenarios = [
+        ('greeting', 'builder', lambda: builder_greeting(GREETING, GATHER_URL)),
+        ('greeting', 'template', lambda: render_greeting(GREETING, GATHER_URL)),
+        ('greeting', 'cached', lambda: cache.get(
+            ('greeting', GREETING, GATHER_URL), lambda: render_greeting(GREETING, GATHER_URL))),
+        ('ai response', 'builder', lambda: builder_response(reply, GATHER_URL)),
+        ('ai response', 'template', lambda: render_response(reply, GATHER_URL)),
+        ('error', 'builder', builder_error),
+        ('error', 'constant', lambda: ERROR_TWIML)
+    ]
+
+    results = []
+    baselines = {}
+    for kind, path, func in scenarios:
+        func()  # Warm imports and caches
+        micros = time_calls(func, iterations)
+        if path == 'builder':
+            baselines[kind] = micros
+        results.append({
+            'twiml': kind,
+            'path': path,
+            'us_per_call': round(micros, 3),
+            'calls_per_second': round(1e6 / micros) if micros else None,
+            'speedup': round(baselines[kind] / micros, 1) if micros else None
+        })
+    return results
+
+
+def print_table(results):
+    """Print a readable summary"""
+    columns = [
+        ('twiml', 'TwiML'),
+        ('path', 'Path'),
+        ('us_per_call', 'us/call'),
+        ('calls_per_second', 'Calls/s'),
+        ('speedup', 'Speedup')
+    ]
+    rows = [[str(result.get(key, '-')) for key, _ in columns] for result in results]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title) in enumerate(columns)]
+
+    print('  '.join(title.ljust(width) for (_, title), width in zip(columns, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare TwiML builder, templates and cache')
+    parser.add_argument('--iterations', type=int, default=20000, help='Calls timed per scenario')
+    parser.add_argument('--output', help='Write the full JSON report to this file')
+    args = parser.parse_args()
+
+    mismatches = check_equivalence()
+    if mismatches:
+        print(f"Templates differ from the builder: {mismatches}", file=sys.stderr)
+        sys.exit(1)
+
+    results = run(args.iterations)
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'iterations': args.iterations, 'results': results}, f, indent=2)
+        print(f"\nFull report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
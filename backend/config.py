@@ -20,13 +20,84 @@ class Config:
     MAX_LENGTH = int(os.getenv('MAX_LENGTH', '100'))
     TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
     TOP_P = float(os.getenv('TOP_P', '0.9'))
+    MODEL_PRECISION = os.getenv('MODEL_PRECISION', 'fp32')  # fp32, int8, bf16 (CPU serving; CUDA always uses fp16)
+    MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'eager')  # eager, compile (torch.compile), onnx (ONNX Runtime CPU)
+    ONNX_CACHE_DIR = os.getenv('ONNX_CACHE_DIR', 'model_cache/onnx')  # Exported models are reused on later starts
+
+    # Startup: load the model when a worker boots and run a short warmup generation
+    MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'True') == 'True'
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'True') == 'True'
+    MODEL_WARMUP_TOKENS = int(os.getenv('MODEL_WARMUP_TOKENS', '4'))
+
+    # Assisted generation: a small draft model with the same tokenizer proposes tokens
+    DRAFT_MODEL_NAME = os.getenv('DRAFT_MODEL_NAME', None)  # e.g., microsoft/DialoGPT-small
+    DRAFT_NUM_TOKENS = int(os.getenv('DRAFT_NUM_TOKENS', '5'))
+
+    # Latency budgets: generation stops (at a sentence end where possible) when they run out
+    VOICE_LATENCY_BUDGET_MS = int(os.getenv('VOICE_LATENCY_BUDGET_MS', '4000'))  # Twilio drops slow webhooks
+    CHAT_LATENCY_BUDGET_MS = int(os.getenv('CHAT_LATENCY_BUDGET_MS', '20000'))
+    SOFT_DEADLINE_FRACTION = float(os.getenv('SOFT_DEADLINE_FRACTION', '0.7'))  # After this share, stop at the next sentence end
+
+    # Per-phase generation timings in /api/chat responses that send "debug": true (always allowed with DEBUG)
+    CHAT_DEBUG_METADATA = os.getenv('CHAT_DEBUG_METADATA', 'False') == 'True'
+
+    # CPU topology for gunicorn workers (split cores instead of oversubscribing them)
+    CPU_TOPOLOGY_ENABLED = os.getenv('CPU_TOPOLOGY_ENABLED', 'True') == 'True'
+    CPU_THREADS_PER_WORKER = int(os.getenv('CPU_THREADS_PER_WORKER', '0'))  # 0 = available cores / workers
+    CPU_INTEROP_THREADS = int(os.getenv('CPU_INTEROP_THREADS', '1'))
+    CPU_PIN_WORKERS = os.getenv('CPU_PIN_WORKERS', 'False') == 'True'  # Pin each worker to its own core set
+
+    # Inference scheduler (continuous batching across concurrent requests)
+    INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'False') == 'True'
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '8'))
+    INFERENCE_MAX_WAIT_MS = int(os.getenv('INFERENCE_MAX_WAIT_MS', '10'))
+
+    # Priority lanes in front of generation: emergency calls, then voice, then chat
+    PRIORITY_GATE_ENABLED = os.getenv('PRIORITY_GATE_ENABLED', 'False') == 'True'
+    GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '0'))  # 0 = 1, batch size with INFERENCE_BATCHING, or OpenAI connections
+
+    # Admission control: refuse requests that would queue too long (503 / apology TwiML)
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'False') == 'True'
+    ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '32'))
+    ADMISSION_MAX_WAIT_MS = int(os.getenv('ADMISSION_MAX_WAIT_MS', '5000'))  # Voice turns are also capped by their latency budget
+
+    # Per-conversation KV cache reuse across turns (causal models only)
+    KV_CACHE_ENABLED = os.getenv('KV_CACHE_ENABLED', 'False') == 'True'
+    KV_CACHE_MAX_MB = int(os.getenv('KV_CACHE_MAX_MB', '512'))
+    KV_CACHE_WINDOW_STEP = int(os.getenv('KV_CACHE_WINDOW_STEP', '4'))  # History window slides in steps of N messages
+
+    # Shared system-prompt prefix cache (causal models only)
+    PREFIX_CACHE_ENABLED = os.getenv('PREFIX_CACHE_ENABLED', 'False') == 'True'
+    PREFIX_CACHE_MAX_MB = int(os.getenv('PREFIX_CACHE_MAX_MB', '128'))
+
+    # Shared inference server: one process owns the model, web workers connect over a Unix socket
+    INFERENCE_SERVER_SOCKET = os.getenv('INFERENCE_SERVER_SOCKET', None)  # e.g., /tmp/ai-dialer-inference.sock
+    INFERENCE_SERVER_TIMEOUT = float(os.getenv('INFERENCE_SERVER_TIMEOUT', '120'))
+
+    # Response cache for repeated turns ("yes", "billing", "hello")
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'False') == 'True'
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1024'))
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))
+    RESPONSE_CACHE_DETERMINISTIC = os.getenv('RESPONSE_CACHE_DETERMINISTIC', 'True') == 'True'  # Greedy decoding while caching
 
     # OpenAI (optional)
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', None)
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', None)  # OpenAI-compatible server, e.g., http://localhost:8080/v1
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '3'))
+    OPENAI_READ_TIMEOUT = float(os.getenv('OPENAI_READ_TIMEOUT', '10'))
+    OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+    OPENAI_RETRY_BACKOFF_MS = int(os.getenv('OPENAI_RETRY_BACKOFF_MS', '200'))
+    OPENAI_HEDGE_ENABLED = os.getenv('OPENAI_HEDGE_ENABLED', 'False') == 'True'
+    OPENAI_HEDGE_PERCENTILE = float(os.getenv('OPENAI_HEDGE_PERCENTILE', '95'))  # Send a second request once the first is slower than this
 
     # Conversation
     MAX_CONVERSATION_HISTORY = int(os.getenv('MAX_CONVERSATION_HISTORY', '10'))
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '4096'))  # Tokenized messages kept; 0 disables
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1000'))  # Max prompt tokens per request (HuggingFace; seq2seq models stop at 512)
+    CONTEXT_SUMMARY_ENABLED = os.getenv('CONTEXT_SUMMARY_ENABLED', 'False') == 'True'  # Summarize turns that no longer fit
+    CONTEXT_SUMMARY_MAX_WORDS = int(os.getenv('CONTEXT_SUMMARY_MAX_WORDS', '40'))
 
     # Storage
     STORAGE_TYPE = os.getenv('STORAGE_TYPE', 'local')  # local, supabase
@@ -42,11 +113,28 @@ class Config:
     ORGANIZATION_TYPE = os.getenv('ORGANIZATION_TYPE', 'software')  # hospital, school, software, jail, law_firm, restaurant
     ORGANIZATION_NAME = os.getenv('ORGANIZATION_NAME', None)  # Custom organization name
 
+    # Multi-tenant routing: JSON file mapping tenant ids and dialed numbers to organization configs
+    TENANTS_FILE = os.getenv('TENANTS_FILE', None)  # Unset: every request uses ORGANIZATION_TYPE/ORGANIZATION_NAME
+    ROUTER_CACHE_MAX_MB = int(os.getenv('ROUTER_CACHE_MAX_MB', '64'))  # Compiled tenant routers kept per worker
+
+    # Routing: keyword (substring rules) or semantic (agents ranked by similarity, with calibrated confidences)
+    ROUTING_MODE = os.getenv('ROUTING_MODE', 'keyword')
+    SEMANTIC_ROUTER_DIM = int(os.getenv('SEMANTIC_ROUTER_DIM', '4096'))  # Hashed embedding size
+    SEMANTIC_ROUTER_CACHE_DIR = os.getenv('SEMANTIC_ROUTER_CACHE_DIR', 'model_cache/semantic_router')  # Agent matrices, per config hash
+    SEMANTIC_MIN_CONFIDENCE = float(os.getenv('SEMANTIC_MIN_CONFIDENCE', '0.5'))  # Below this, unmatched messages go to the default agent
+    SEMANTIC_TOP_K = int(os.getenv('SEMANTIC_TOP_K', '3'))  # Ranked agents returned with each routing result
+
+    # Batch routing (/api/route-call/batch)
+    ROUTING_BATCH_MAX = int(os.getenv('ROUTING_BATCH_MAX', '50000'))  # Messages per request
+    ROUTING_BATCH_WORKERS = int(os.getenv('ROUTING_BATCH_WORKERS', '0'))  # Process pool size; 0 routes in the request worker
+    ROUTING_BATCH_PARALLEL_MIN = int(os.getenv('ROUTING_BATCH_PARALLEL_MIN', '5000'))  # Distinct messages before using the pool
+
     # Twilio Configuration
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', None)
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', None)
     TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER', None)
     TWILIO_TWIML_APP_SID = os.getenv('TWILIO_TWIML_APP_SID', None)
+    TWIML_CACHE_SIZE = int(os.getenv('TWIML_CACHE_SIZE', '256'))  # Rendered greetings and fixed prompts kept; 0 disables
 
     # Public URL (for tunneling services like ngrok or localtunnel)
     PUBLIC_URL = os.getenv('PUBLIC_URL', None)  # e.g., https://lemon-beds-shout.loca.lt
@@ -56,9 +144,15 @@ class Config:
         """Validate required configuration"""
         errors = []
 
-        if Config.AI_MODEL_TYPE == 'openai' and not Config.OPENAI_API_KEY:
+        if Config.AI_MODEL_TYPE == 'openai' and not Config.OPENAI_API_KEY and not Config.OPENAI_BASE_URL:
             errors.append("OPENAI_API_KEY is required when using OpenAI model")
 
+        if Config.MODEL_PRECISION not in ('fp32', 'int8', 'bf16'):
+            errors.append("MODEL_PRECISION must be one of: fp32, int8, bf16")
+
+        if Config.MODEL_BACKEND not in ('eager', 'compile', 'onnx'):
+            errors.append("MODEL_BACKEND must be one of: eager, compile, onnx")
+
         if Config.STORAGE_TYPE == 'supabase':
             if not Config.SUPABASE_URL:
                 errors.append("SUPABASE_URL is required when using Supabase storage")
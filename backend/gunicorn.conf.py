@@ -0,0 +1,80 @@
+"""
+Gunicorn Configuration
+Server hooks used by the Procfile / render.yaml start command
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from config import Config
+
+# Spawned inference server process, if any
+_inference_server = None
+
+
+def on_starting(server):
+    """Start the shared inference server before any worker is forked"""
+    global _inference_server
+    if not Config.INFERENCE_SERVER_SOCKET:
+        return
+
+    server.log.info(f"Starting inference server on {Config.INFERENCE_SERVER_SOCKET}")
+    _inference_server = subprocess.Popen(
+        [sys.executable, '-m', 'app.ai.inference_server'],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+    # The socket is bound before the model loads, so this only waits for imports
+    deadline = time.monotonic() + 60
+    while not os.path.exists(Config.INFERENCE_SERVER_SOCKET) and time.monotonic() < deadline:
+        if _inference_server.poll() is not None:
+            raise RuntimeError("Inference server exited during startup")
+        time.sleep(0.1)
+
+
+def pre_fork(server, worker):
+    """Give each worker a CPU slot, reusing the slots of workers that exited"""
+    taken = {getattr(other, 'cpu_slot', None) for other in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+
+
+def post_fork(server, worker):
+    """Limit the worker's torch threads (and optionally cores) to its share of the CPU"""
+    if not Config.CPU_TOPOLOGY_ENABLED or Config.INFERENCE_SERVER_SOCKET:
+        # With the inference server, workers do no model work; the server uses every core
+        return
+
+    from app.ai.cpu_topology import apply_layout
+    layout = apply_layout(worker.cpu_slot, server.cfg.workers)
+    server.log.info(
+        f"Worker {worker.pid} slot {layout['slot']}: {layout['intra_op_threads']} intra-op / "
+        f"{layout['inter_op_threads']} inter-op threads"
+        + (f", pinned to cores {layout['cores']}" if layout['pinned'] else "")
+    )
+
+
+def post_worker_init(worker):
+    """Load the model in the background as soon as a worker boots"""
+    if not Config.MODEL_PRELOAD or Config.INFERENCE_SERVER_SOCKET:
+        # With the inference server the model is loaded (and warmed up) there
+        return
+
+    def preload():
+        try:
+            from app.ai.model_connector import get_model
+            get_model()
+        except Exception as e:
+            worker.log.warning(f"Could not pre-load model: {e}")
+
+    # Requests arriving before loading finishes wait for it in get_model()
+    threading.Thread(target=preload, name='model-preload', daemon=True).start()
+
+
+def on_exit(server):
+    """Stop the inference server together with the gunicorn master"""
+    if _inference_server is not None and _inference_server.poll() is None:
+        _inference_server.terminate()
+        _inference_server.wait(timeout=10)
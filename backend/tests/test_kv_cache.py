@@ -0,0 +1,70 @@
+"""
+KV cache reuse across turns, on the tiny offline GPT-2 of the inference suite
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import os
+import tempfile
+import unittest
+
+from benchmarks.inference_suite import build_tiny_models
+from config import Config
+
+SYSTEM_MESSAGE = "You are a helpful assistant for billing questions."
+
+
+class KVCacheReuseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        causal_dir, _ = build_tiny_models(os.path.join(tempfile.gettempdir(), 'ai-dialer-bench-models'))
+
+        cls._saved = {
+            name: getattr(Config, name)
+            for name in ('AI_MODEL_NAME', 'MODEL_BACKEND', 'MODEL_PRECISION', 'MODEL_WARMUP', 'KV_CACHE_ENABLED',
+                         'PREFIX_CACHE_ENABLED', 'INFERENCE_BATCHING', 'DRAFT_MODEL_NAME', 'MAX_LENGTH')
+        }
+        Config.AI_MODEL_NAME = causal_dir
+        Config.MODEL_BACKEND = 'eager'
+        Config.MODEL_PRECISION = 'fp32'
+        Config.MODEL_WARMUP = False
+        Config.KV_CACHE_ENABLED = True
+        Config.PREFIX_CACHE_ENABLED = False
+        Config.INFERENCE_BATCHING = False
+        Config.DRAFT_MODEL_NAME = None
+        Config.MAX_LENGTH = 8
+
+        from app.ai.model_connector import HuggingFaceConnector
+        cls.connector = HuggingFaceConnector()
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, value in cls._saved.items():
+            setattr(Config, name, value)
+
+    def test_second_turn_reuses_first_turn_states(self):
+        """Without the prefix cache, turn 2 still extends turn 1 and hits the KV cache"""
+        kv_cache = self.connector.kv_cache
+        first = "I was charged twice on my last bill"
+
+        reply = self.connector.generate_response(
+            first, [], system_message=SYSTEM_MESSAGE, conversation_id='call-1', do_sample=False
+        )
+        self.assertEqual(kv_cache.get_stats()['hits'], 0)
+
+        history = [{'role': 'user', 'content': first}, {'role': 'assistant', 'content': reply}]
+        self.connector.generate_response(
+            "Can you check my account", history, system_message=SYSTEM_MESSAGE, conversation_id='call-1', do_sample=False
+        )
+
+        stats = kv_cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        # At least the system prompt and the first user turn were not prefilled again
+        system_tokens = len(self.connector.token_cache.encode('system', self.connector._build_prefix(SYSTEM_MESSAGE)))
+        self.assertGreater(stats['reused_tokens'], system_tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
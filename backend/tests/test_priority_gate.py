@@ -0,0 +1,65 @@
+"""
+Priority gate queueing and admission control (no model needed)
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import threading
+import time
+import unittest
+
+from app.ai.priority_gate import Overloaded, PriorityGate
+
+
+def _gate():
+    gate = PriorityGate(capacity=1)
+    gate.admission_control = True
+    gate.max_queue = 8
+    gate.max_wait = 5.0
+    return gate
+
+
+class PriorityGateTest(unittest.TestCase):
+
+    def test_queued_request_is_refused_when_its_wait_runs_out(self):
+        gate = _gate()
+        gate.acquire('voice')
+
+        start = time.monotonic()
+        with self.assertRaises(Overloaded):
+            gate.acquire('chat', max_wait=0.2)
+        self.assertLess(time.monotonic() - start, 2.0)
+
+        stats = gate.get_stats()
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['lanes']['chat']['waiting'], 0)
+        self.assertEqual(stats['lanes']['chat']['rejected'], 1)
+
+        # The slot is still the voice turn's, and freeing it leaves the gate idle
+        gate.release('voice')
+        self.assertEqual(gate.get_stats()['in_flight'], 0)
+
+    def test_released_slot_goes_to_the_highest_lane(self):
+        gate = _gate()
+        gate.acquire('chat')
+        order = []
+
+        def wait_for_slot(lane):
+            gate.acquire(lane)
+            order.append(lane)
+            gate.release(lane)
+
+        threads = [threading.Thread(target=wait_for_slot, args=(lane,)) for lane in ('chat', 'voice')]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        gate.release('chat')
+        for thread in threads:
+            thread.join(2.0)
+
+        self.assertEqual(order, ['voice', 'chat'])
+
+
+if __name__ == '__main__':
+    unittest.main()
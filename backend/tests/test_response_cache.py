@@ -0,0 +1,56 @@
+"""
+Response cache behavior with a stub connector (no model needed)
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from app.ai.model_connector import ModelConnector
+from app.ai.response_cache import CachedModelConnector, ResponseCache
+
+
+class StubConnector(ModelConnector):
+    """Counts generations and reports budget truncation like HuggingFaceConnector"""
+
+    def __init__(self, truncated=False):
+        super().__init__()
+        self.truncated = truncated
+        self.calls = 0
+
+    def generate_response(self, prompt, conversation_history=None, **kwargs):
+        self.calls += 1
+        kwargs['timings'].truncated = self.truncated
+        return f"reply {self.calls}"
+
+    def generate_stream(self, prompt, conversation_history=None, **kwargs):
+        self.calls += 1
+        kwargs['timings'].truncated = self.truncated
+        yield f"reply {self.calls}"
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_complete_reply_is_reused(self):
+        connector = CachedModelConnector(StubConnector(), ResponseCache(max_entries=8, ttl_seconds=60))
+        self.assertEqual(connector.generate_response("billing", latency_budget=4.0), "reply 1")
+        self.assertEqual(connector.generate_response("billing", latency_budget=4.0), "reply 1")
+        self.assertEqual(connector.connector.calls, 1)
+
+    def test_truncated_reply_is_not_stored(self):
+        connector = CachedModelConnector(StubConnector(truncated=True), ResponseCache(max_entries=8, ttl_seconds=60))
+        connector.generate_response("billing", latency_budget=4.0)
+        self.assertEqual(connector.generate_response("billing", latency_budget=4.0), "reply 2")
+        self.assertEqual(''.join(connector.generate_stream("billing", latency_budget=4.0)), "reply 3")
+        self.assertEqual(''.join(connector.generate_stream("billing", latency_budget=4.0)), "reply 4")
+
+    def test_budget_classes_are_cached_apart(self):
+        connector = CachedModelConnector(StubConnector(), ResponseCache(max_entries=8, ttl_seconds=60))
+        connector.generate_response("billing", latency_budget=3.96)
+        self.assertEqual(connector.generate_response("billing", latency_budget=3.91), "reply 1")
+        self.assertEqual(connector.generate_response("billing", latency_budget=20.0), "reply 2")
+
+
+if __name__ == '__main__':
+    unittest.main()
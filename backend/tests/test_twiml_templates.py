@@ -0,0 +1,29 @@
+"""
+TwiML templates against the twilio VoiceResponse builder they replace
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from benchmarks.twiml_rendering import builder_greeting, builder_response, check_equivalence
+from app.services.twiml_templates import render_greeting, render_response
+
+GATHER_URL = 'https://example.ngrok.io/api/voice/speech'
+
+
+class TwimlTemplatesTest(unittest.TestCase):
+
+    def test_matches_builder(self):
+        self.assertEqual(check_equivalence(), [])
+
+    def test_empty_text_is_an_empty_tag(self):
+        self.assertEqual(render_greeting('', GATHER_URL), builder_greeting('', GATHER_URL))
+        self.assertEqual(render_response('', GATHER_URL), builder_response('', GATHER_URL))
+        self.assertEqual(render_response(''), builder_response(''))
+        self.assertIn('<Say language="en-US" voice="Polly.Joanna" />', render_response(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,8 @@ function CallScreen({ agentInfo, isRouting, onBack }) {
   const [inputText, setInputText] = useState('')
   const [isProcessing, setIsProcessing] = useState(false)
   const [interimTranscript, setInterimTranscript] = useState('')
+  // Lets the backend reuse model state between turns of this conversation
+  const conversationIdRef = useRef(`web-${Date.now()}-${Math.random().toString(36).slice(2)}`)
 
   const sttEngineRef = useRef(null)
   const ttsEngineRef = useRef(null)
@@ -122,7 +124,8 @@ function CallScreen({ agentInfo, isRouting, onBack }) {
         state.conversation,
         {
           personality: state.aiPersonality,
-          userPreferences: state.userPreferences
+          userPreferences: state.userPreferences,
+          conversationId: conversationIdRef.current
         }
       )
 
@@ -54,7 +54,8 @@ export const api = {
       message,
       conversation_history: conversationHistory,
       personality: options.personality || 'assistant',
-      user_preferences: options.userPreferences || {}
+      user_preferences: options.userPreferences || {},
+      conversation_id: options.conversationId
     })
     return response.data
   },